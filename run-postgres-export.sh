@@ -3,6 +3,8 @@
 # Script to manually trigger PostgreSQL export
 # This runs the same export that would happen at 4 AM UTC via the cron job
 
+REPO_DIR="$(cd "$(dirname "$0")" && pwd)"
+
 echo "🚀 Starting manual PostgreSQL export..."
 echo ""
 
@@ -26,26 +28,17 @@ echo "  - Auto-discover all HYROX events with charity tickets"
 echo "  - Perform comprehensive ticket scraping for accurate counts"
 echo "  - Export data to PostgreSQL database"
 echo ""
-echo "⏳ This may take 2-5 minutes depending on the number of events..."
+echo "The export runs as a job: events are scraped and committed in chunks,"
+echo "so a slow or failing event doesn't lose the rest of the export."
 echo ""
 
-# Trigger the export
-response=$(curl -X POST \
-  "http://localhost:8787/api/dashboard/export-to-sheets?source=vivenu&format=postgres" \
-  -H "Content-Type: application/json" \
-  --max-time 600 \
-  -s)
+# Submit the job and process it chunk by chunk, printing progress
+python3 "$REPO_DIR/vivenu-event-monitor/scripts/python/export_job.py" --worker-url http://localhost:8787 "$@"
+status=$?
 
-# Check if successful
-if echo "$response" | grep -q '"status":"success"'; then
+if [ $status -eq 0 ]; then
     echo "✅ Export completed successfully!"
-    echo ""
-    echo "Response:"
-    echo "$response" | python3 -m json.tool 2>/dev/null || echo "$response"
 else
-    echo "❌ Export failed or timed out"
-    echo ""
-    echo "Response:"
-    echo "$response"
-    exit 1
-fi
\ No newline at end of file
+    echo "❌ Export finished with failures or was interrupted (see above)"
+    exit $status
+fi
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+HYROX Availability Engine - Streaming per-ticket-type availability in Python
+
+Computes the same capacity / sold / available / percent_sold numbers as the
+worker's AvailabilityService + TicketScraper (src/services/), without keeping
+tickets in memory:
+
+    - Ticket types come from /events/{id}?include=tickets (capacity = `amount`),
+      minus secondary types (same indicators as TicketScraper.isSecondaryTicket)
+    - /tickets pages are streamed and each page only bumps a counter per
+      ticketName, so memory stays flat however large the event is
+    - sold for a ticket type = tickets whose ticketName equals its name,
+      all statuses, exactly like getSoldCountForTicketType
+
+Many events run in parallel, each on its own thread; requests go through the
+shared rate limiter. Results are written in the same format as
+paris_test_results.json / frankfurt_test_results.json.
+
+Parity: --parity FILE compares against a saved results file, --worker-url URL
+against /api/availability/{eventId} from the worker. The worker serves
+tickets and results cached in KV for up to 5 minutes, so that is not a
+same-data comparison: sales since its last scrape show up as differences
+unless --tolerance covers them. The offline parity test against TicketScraper
+is tests/test_availability_parity.py (npm run test:python). Any difference
+beyond --tolerance fails.
+
+--record appends each result to the snapshot store (snapshot_store.py) so
+later runs can be diffed against it.
+
+Usage:
+    python availability_engine.py [REGION[:EVENT_ID] ...] [--concurrency N] [--page-size N]
+                                  [--output-dir DIR] [--parity FILE] [--worker-url URL]
+                                  [--tolerance N] [--record] [--quiet]
+                                  [--hedge [--hedge-percentile P] [--hedge-budget F]]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Iterator, Tuple, Callable
+
+import requests
+from dotenv import load_dotenv
+
+from rate_limiter import acquire
+from metadata_cache import get_event
+from data_fields_matrix import configured_regions, base_url_for
+from snapshot_store import SnapshotStore
+from hedged_requests import HedgedGetter, add_hedge_arguments, from_args as hedger_from_args
+from streaming_json import RowStream, CHUNK_SIZE
+
+load_dotenv()
+
+# Keep in sync with TicketScraper.isSecondaryTicket (src/services/ticket-scraper.ts)
+SECONDARY_INDICATORS = [
+    'ATHLETE 2',
+    'TEAM MEMBER',
+    'TEAM MEMBERS',
+    'Sportograf Photo Package',
+    'Photo Package',
+    'Volunteering',
+    'ATHLETE2',
+    'ATHLETEN 2',
+    'SPECTATOR',
+]
+
+DEFAULT_PAGE_SIZE = 1000  # Same as TicketScraper.scrapeAllTickets
+MIN_PAGE_SIZE = 10
+MAX_RETRIES = 3
+DEFAULT_CONCURRENCY = 4
+
+
+def is_secondary_ticket(ticket_name: str) -> bool:
+    name = (ticket_name or '').upper()
+    return any(indicator.upper() in name for indicator in SECONDARY_INDICATORS)
+
+
+def js_round2(value: float) -> float:
+    """Math.round(value * 100) / 100, which rounds halves up unlike round()"""
+    return math.floor(value * 100 + 0.5) / 100
+
+
+def exponential_backoff(attempt: int, base_delay: float = 1, max_delay: float = 30) -> float:
+    delay = min(base_delay * (2 ** attempt), max_delay)
+    return delay + delay * 0.2 * random.random()
+
+
+def stream_tickets(base_url: str, api_key: str, event_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                   stats: Optional[Dict[str, Any]] = None, quiet: bool = False,
+                   hedger: Optional[HedgedGetter] = None,
+                   on_page: Optional[Callable[[], None]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield an event's tickets one at a time as /tickets pages are decoded, with the
+    scraper's 503 backoff and page shrinking. No page is held in memory.
+
+    stats (if given) gets expected_total, api_calls, fetched and complete filled in.
+    hedger (if given) sends a duplicate request for pages slower than the learned percentile.
+    on_page (if given) is called after each complete page.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(expected_total=None, api_calls=0, fetched=0, complete=False)
+    url = f"{base_url}/tickets"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    skip = 0
+
+    while True:
+        params = {"event": event_id, "top": page_size, "skip": skip}
+        page_count = 0  # Tickets of this page already yielded
+        success = False
+        for attempt in range(MAX_RETRIES):
+            stats["api_calls"] += 1
+            # A retry resumes after the tickets already handed on
+            params["skip"] = skip + page_count
+            try:
+                acquire(api_key, url)
+                if hedger:
+                    response = hedger.get(url, acquire=lambda: acquire(api_key, url),
+                                          headers=headers, params=params, timeout=30, stream=True)
+                else:
+                    response = requests.get(url, headers=headers, params=params, timeout=30, stream=True)
+                if response.status_code == 503:
+                    if attempt < MAX_RETRIES - 1:
+                        time.sleep(exponential_backoff(attempt))
+                        if attempt > 0 and page_size > MIN_PAGE_SIZE:
+                            page_size = max(MIN_PAGE_SIZE, page_size // 2)
+                            params["top"] = page_size
+                        continue
+                    break
+                response.raise_for_status()
+                stream = RowStream(response.iter_content(CHUNK_SIZE))
+                for ticket in stream:
+                    page_count += 1
+                    stats["fetched"] += 1
+                    yield ticket
+                if stats["expected_total"] is None:
+                    stats["expected_total"] = stream.meta.get("total", 0)
+                success = True
+                break
+            except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+                if not quiet:
+                    print(f"   🔄 {event_id}: request error (attempt {attempt + 1}/{MAX_RETRIES}, "
+                          f"{page_count} tickets of this page kept): {e}")
+                if attempt < MAX_RETRIES - 1:
+                    time.sleep(exponential_backoff(attempt))
+
+        if not success:
+            print(f"   ❌ {event_id}: page failed at skip={skip + page_count}, stopping with {stats['fetched']:,} tickets")
+            return
+
+        if page_count == 0:
+            stats["complete"] = True
+            return
+        if on_page:
+            on_page()
+        if stats["fetched"] >= stats["expected_total"]:
+            stats["complete"] = True
+            return
+        skip += page_count
+
+
+def availability_row(ticket_type: Dict[str, Any], sold: int) -> Dict[str, Any]:
+    capacity = ticket_type.get('amount') or 0
+    return {
+        "id": ticket_type.get('_id'),
+        "name": ticket_type.get('name'),
+        "capacity": capacity,
+        "sold": sold,
+        "available": max(0, capacity - sold),
+        "percent_sold": js_round2(sold / capacity * 100) if capacity > 0 else 0,
+        "is_secondary": False,
+    }
+
+
+def build_results(event_data: Dict[str, Any], counts: Counter) -> Dict[str, Any]:
+    """Join ticketName counts against the event's primary ticket types"""
+    primary_types = [t for t in event_data.get('tickets', []) if not is_secondary_ticket(t.get('name'))]
+    ticket_types = [availability_row(t, counts.get(t.get('name'), 0)) for t in primary_types]
+
+    total_capacity = sum(t["capacity"] for t in ticket_types)
+    total_sold = sum(t["sold"] for t in ticket_types)
+    results = {
+        "ticket_types": ticket_types,
+        "totals": {
+            "capacity": total_capacity,
+            "sold": total_sold,
+            "available": max(0, total_capacity - total_sold),
+            "percent_sold": js_round2(total_sold / total_capacity * 100) if total_capacity > 0 else 0,
+        },
+    }
+
+    charity = [t for t in ticket_types if 'CHARITY' in (t["name"] or '').upper()]
+    if len(charity) == 1:
+        results["charity_validation"] = charity[0]
+    elif charity:
+        capacity = sum(t["capacity"] for t in charity)
+        sold = sum(t["sold"] for t in charity)
+        results["charity_validation"] = {
+            "id": ",".join(t["id"] for t in charity),
+            "name": " + ".join(t["name"] for t in charity),
+            "capacity": capacity,
+            "sold": sold,
+            "available": max(0, capacity - sold),
+            "percent_sold": js_round2(sold / capacity * 100) if capacity > 0 else 0,
+            "is_secondary": False,
+        }
+    return results
+
+
+def calculate_event(region: str, event_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                    quiet: bool = False, hedger: Optional[HedgedGetter] = None) -> Dict[str, Any]:
+    """Availability for one event; raises RequestException if the event can't be loaded"""
+    api_key = os.getenv(f"{region}_API")
+    base_url = base_url_for(region)
+    start = time.time()
+
+    # Capacities can change during a sale, so always read them fresh
+    event_data = get_event(base_url, event_id, api_key, include_tickets=True, refresh=True)
+
+    counts = Counter()
+    stats: Dict[str, Any] = {}
+
+    def progress():
+        print(f"   📊 {region}: {stats['fetched']:,}/{stats['expected_total']:,} tickets")
+
+    # Counted as each ticket is decoded, so peak memory is one ticket plus the counters
+    for ticket in stream_tickets(base_url, api_key, event_id, page_size, stats, quiet, hedger,
+                                 on_page=None if quiet else progress):
+        counts[ticket.get('ticketName')] += 1
+
+    results = build_results(event_data, counts)
+    results["scraping_stats"] = {
+        "total_tickets_scraped": stats["fetched"],
+        "api_calls": stats["api_calls"],
+        "elapsed_seconds": round(time.time() - start, 6),
+    }
+    if not stats["complete"]:
+        results["scraping_stats"]["incomplete"] = True
+    results["event"] = {"id": event_id, "name": event_data.get('name'), "region": region}
+    return results
+
+
+def from_worker(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a worker /api/availability/{eventId} response to the results format"""
+    def row(t):
+        return {"id": t.get("id"), "name": t.get("name"), "capacity": t.get("capacity", 0),
+                "sold": t.get("sold", 0), "available": t.get("available", 0),
+                "percent_sold": t.get("percentSold", 0), "is_secondary": False}
+
+    totals = payload.get("totals", {})
+    return {
+        "ticket_types": [row(t) for t in payload.get("ticketTypes", [])],
+        "totals": {"capacity": totals.get("capacity", 0), "sold": totals.get("sold", 0),
+                   "available": totals.get("available", 0), "percent_sold": totals.get("percentSold", 0)},
+    }
+
+
+def fetch_worker_results(worker_url: str, region: str, event_id: str) -> Dict[str, Any]:
+    response = requests.get(f"{worker_url.rstrip('/')}/api/availability/{event_id}",
+                            params={"region": region}, timeout=120)
+    response.raise_for_status()
+    return from_worker(response.json())
+
+
+def parity_report(engine: Dict[str, Any], reference: Dict[str, Any], tolerance: int = 0) -> List[str]:
+    """Differences between two results dicts; an empty list means parity"""
+    problems = []
+    fields = ("capacity", "sold", "available")
+
+    ours = {t["id"]: t for t in engine["ticket_types"]}
+    theirs = {t["id"]: t for t in reference.get("ticket_types", [])}
+    for type_id in sorted(set(ours) | set(theirs)):
+        if type_id not in ours:
+            problems.append(f"{theirs[type_id]['name']}: only in reference")
+            continue
+        if type_id not in theirs:
+            problems.append(f"{ours[type_id]['name']}: only in engine")
+            continue
+        for field in fields:
+            if abs(ours[type_id][field] - theirs[type_id][field]) > tolerance:
+                problems.append(f"{ours[type_id]['name']}: {field} {ours[type_id][field]} vs {theirs[type_id][field]}")
+
+    for field in fields:
+        ours_total = engine["totals"][field]
+        theirs_total = reference.get("totals", {}).get(field)
+        if theirs_total is not None and abs(ours_total - theirs_total) > tolerance * max(1, len(theirs)):
+            problems.append(f"totals: {field} {ours_total} vs {theirs_total}")
+    return problems
+
+
+def parse_targets(targets: List[str]) -> List[Tuple[str, str]]:
+    """REGION or REGION:EVENT_ID arguments -> (region, event_id) pairs"""
+    configured = configured_regions()
+    if not targets:
+        return list(configured.items())
+    pairs = []
+    for target in targets:
+        region, _, event_id = target.partition(":")
+        region = region.upper()
+        event_id = event_id or configured.get(region)
+        if not event_id:
+            raise ValueError(f"No event ID for {region}. Use {region}:EVENT_ID or set {region}_EVENT in .env")
+        if not os.getenv(f"{region}_API"):
+            raise ValueError(f"No API key found for region {region}")
+        pairs.append((region, event_id))
+    return pairs
+
+
+def print_results(results: Dict[str, Any]):
+    event = results["event"]
+    print(f"\n📅 {event['name']} ({event['region']}, {event['id']})")
+    print(f"{'Ticket type':<45} {'Capacity':>9} {'Sold':>7} {'Available':>10} {'Sold %':>8}")
+    for t in results["ticket_types"]:
+        print(f"{t['name'][:45]:<45} {t['capacity']:>9,} {t['sold']:>7,} {t['available']:>10,} {t['percent_sold']:>7.2f}%")
+    totals = results["totals"]
+    print(f"{'TOTAL':<45} {totals['capacity']:>9,} {totals['sold']:>7,} {totals['available']:>10,} {totals['percent_sold']:>7.2f}%")
+    stats = results["scraping_stats"]
+    print(f"   {stats['total_tickets_scraped']:,} tickets streamed in {stats['api_calls']} call(s), "
+          f"{stats['elapsed_seconds']:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming availability calculator (TicketScraper semantics)')
+    parser.add_argument('targets', nargs='*', help='REGION or REGION:EVENT_ID (default: every region in .env)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Events calculated in parallel (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'Tickets per /tickets page (default: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--output-dir', default='.', help='Where <region>_availability_results.json files go')
+    parser.add_argument('--parity', help='Compare against a saved results file (single event only)')
+    parser.add_argument('--worker-url', help='Compare against the worker /api/availability endpoint')
+    parser.add_argument('--tolerance', type=int, default=0, help='Allowed difference per ticket type (default: 0)')
+    parser.add_argument('--record', action='store_true', help='Append results to the snapshot store')
+    parser.add_argument('--quiet', action='store_true', help='Only print results')
+    add_hedge_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        targets = parse_targets(args.targets)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not targets:
+        print("❌ No regions configured. Set <REGION>_API and <REGION>_EVENT in .env")
+        sys.exit(1)
+    if args.parity and len(targets) != 1:
+        print("❌ --parity compares one event; pass a single REGION[:EVENT_ID]")
+        sys.exit(1)
+
+    print(f"🎫 Calculating availability for {len(targets)} event(s), {args.concurrency} at a time")
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    failed = False
+    store = SnapshotStore() if args.record else None
+    # One hedger for every event so the latency percentile is learned across all of them
+    hedger = hedger_from_args(args, max_workers=2 * args.concurrency + 2)
+    if args.worker_url:
+        print("ℹ️  The worker answers from its 5-minute KV cache; recent sales can differ (see --tolerance)")
+
+    def run(region: str, event_id: str):
+        results = calculate_event(region, event_id, args.page_size, args.quiet, hedger)
+        reference = fetch_worker_results(args.worker_url, region, event_id) if args.worker_url else None
+        return results, reference
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = {pool.submit(run, region, event_id): (region, event_id) for region, event_id in targets}
+        for future in as_completed(futures):
+            region, event_id = futures[future]
+            try:
+                results, worker_reference = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"❌ {region} {event_id}: {e}")
+                failed = True
+                continue
+
+            print_results(results)
+            path = output_dir / f"{region.lower()}_availability_results.json"
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"   💾 Saved to {path}")
+            if results["scraping_stats"].get("incomplete"):
+                print(f"   ⚠️ Scrape incomplete - numbers are a lower bound")
+                failed = True
+            elif store:
+                seq = store.record(event_id, results, region)
+                changed = store.diff(event_id) if seq > 0 else []
+                print(f"   🗂️ Snapshot #{seq} recorded, {len(changed)} ticket type(s) changed since the last one")
+
+            references = []
+            if args.parity:
+                with open(args.parity, 'r') as f:
+                    references.append((args.parity, json.load(f)))
+            if worker_reference:
+                references.append((args.worker_url, worker_reference))
+            for source, reference in references:
+                problems = parity_report(results, reference, args.tolerance)
+                if problems:
+                    failed = True
+                    print(f"   ❌ Parity with {source}: {len(problems)} difference(s)")
+                    for problem in problems:
+                        print(f"      - {problem}")
+                else:
+                    print(f"   ✅ Parity with {source}")
+
+    if hedger:
+        print(f"\n🪂 Hedging: {hedger.report()}")
+        hedger.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+HYROX Availability Watch - Continuous, change-only availability polling
+
+Tracks live sales for a set of events and prints only the ticket types whose
+sold count changed. API usage follows activity instead of event count:
+
+    - Baseline: one count-only request (top=1, ticketTypeId) per primary
+      ticket type, capacities from /events/{id}?include=tickets, plus the
+      IDs created in the overlap window so the first poll doesn't recount them
+    - Each poll is a single count-only request for the event. If the total
+      hasn't moved nothing else is fetched.
+    - If it moved, only tickets created since the last poll (created-range
+      query, with an overlap window deduplicated by _id) are fetched and
+      counted per ticketName. If those don't add up to the change in total
+      the event's per-type counts are re-baselined.
+    - Every event has its own poll interval: the interval aims for about
+      --target-change new tickets per poll from the event's recent sales
+      velocity, backs off towards --max-interval while nothing sells, and
+      drops to --min-interval when a ticket type is close to selling out.
+
+Counting follows availability_engine.py (worker TicketScraper semantics):
+secondary types are skipped and all ticket statuses count as sold. Vivenu
+has no conditional GETs for /tickets, so count-only requests stand in for
+them. Requests go through the shared rate limiter.
+
+Usage:
+    python availability_watch.py [REGION[:EVENT_ID] ...] [--min-interval S] [--max-interval S]
+                                 [--target-change N] [--jsonl FILE] [--record] [--once]
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Any, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from rate_limiter import acquire
+from metadata_cache import get_event
+from ticket_merkle import range_params
+from data_fields_matrix import base_url_for
+from availability_engine import is_secondary_ticket, build_results, parse_targets
+from snapshot_store import SnapshotStore
+
+load_dotenv()
+
+DEFAULT_MIN_INTERVAL = 15
+DEFAULT_MAX_INTERVAL = 900
+DEFAULT_TARGET_CHANGE = 5
+OVERLAP_SECONDS = 120
+VELOCITY_SMOOTHING = 0.3
+BACKOFF_FACTOR = 1.5
+PAGE_SIZE = 1000
+
+
+def iso_utc(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+
+
+class EventWatch:
+    """Sold counts and polling state for one event"""
+
+    def __init__(self, region: str, event_id: str, min_interval: float, max_interval: float, target_change: float):
+        self.region = region
+        self.event_id = event_id
+        self.api_key = os.getenv(f"{region}_API")
+        self.base_url = base_url_for(region)
+        self.headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_change = target_change
+
+        self.event_data: Dict[str, Any] = {}
+        self.counts: Counter = Counter()
+        self.total: Optional[int] = None
+        self.velocity = 0.0  # tickets per minute, smoothed
+        self.interval = min_interval
+        self.last_poll: Optional[float] = None
+        self.watermark: Optional[datetime] = None
+        self.recent_ids: Dict[str, str] = {}
+        self.api_calls = 0
+
+    @property
+    def name(self) -> str:
+        return self.event_data.get('name', self.event_id)
+
+    def primary_types(self) -> List[Dict[str, Any]]:
+        return [t for t in self.event_data.get('tickets', []) if not is_secondary_ticket(t.get('name'))]
+
+    def _get(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        url = f"{self.base_url}/tickets"
+        acquire(self.api_key, url)
+        self.api_calls += 1
+        response = requests.get(url, headers=self.headers, params={"event": self.event_id, **params}, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def count(self, extra_params: Optional[Dict[str, Any]] = None) -> int:
+        return self._get({"top": 1, **(extra_params or {})}).get("total", 0)
+
+    def baseline(self):
+        """Per-type sold counts from count-only requests"""
+        self.event_data = get_event(self.base_url, self.event_id, self.api_key, include_tickets=True)
+        started = datetime.now(timezone.utc)
+        self.total = self.count()
+        self.counts = Counter({t.get('name'): self.count({"ticketTypeId": t['_id']}) for t in self.primary_types()})
+        self.watermark = started
+        # The next poll re-reads the overlap window; tickets in it are already in these counts
+        self.recent_ids = {t['_id']: t.get('createdAt', '') for t in self._created_since(started) if t.get('_id')}
+
+    def _created_since(self, watermark: datetime) -> List[Dict[str, Any]]:
+        """Every ticket created since the overlap window before watermark"""
+        since = iso_utc(watermark - timedelta(seconds=OVERLAP_SECONDS))
+        tickets, skip = [], 0
+        while True:
+            rows = self._get({"top": PAGE_SIZE, "skip": skip, **range_params(since, None)}).get("rows", [])
+            tickets.extend(rows)
+            if len(rows) < PAGE_SIZE:
+                return tickets
+            skip += len(rows)
+
+    def new_tickets(self) -> List[Dict[str, Any]]:
+        """Tickets created since the last poll that haven't been counted yet"""
+        return [t for t in self._created_since(self.watermark) if t.get('_id') not in self.recent_ids]
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """One poll; returns the ticket types whose sold count changed"""
+        now = time.time()
+        if self.total is None:
+            self.baseline()
+            self.last_poll = now
+            return []
+
+        started = datetime.now(timezone.utc)
+        # Capacities may change mid-sale; the metadata cache refetches them every few minutes
+        self.event_data = get_event(self.base_url, self.event_id, self.api_key, include_tickets=True)
+        total = self.count()
+        delta = total - self.total
+        before = Counter(self.counts)
+
+        if delta:
+            fresh = self.new_tickets()
+            if len(fresh) == delta:
+                self.counts.update(t.get('ticketName') for t in fresh)
+                for ticket in fresh:
+                    self.recent_ids[ticket['_id']] = ticket.get('createdAt', '')
+                cutoff = iso_utc(started - timedelta(seconds=2 * OVERLAP_SECONDS))
+                self.recent_ids = {k: v for k, v in self.recent_ids.items() if v >= cutoff}
+                self.watermark = started
+                self.total = total
+            else:
+                # Deletions or clock skew: counts no longer reconcile, start over
+                self.baseline()
+
+        self._adapt(delta, now)
+        return self._changes(before)
+
+    def _adapt(self, delta: int, now: float):
+        minutes = max((now - self.last_poll) / 60, 1 / 60)
+        self.last_poll = now
+        self.velocity = VELOCITY_SMOOTHING * (max(delta, 0) / minutes) + (1 - VELOCITY_SMOOTHING) * self.velocity
+
+        if delta <= 0 and self.velocity < 0.01:
+            interval = self.interval * BACKOFF_FACTOR
+        elif self.velocity > 0:
+            interval = self.target_change / self.velocity * 60
+        else:
+            interval = self.interval
+        if self.near_sellout():
+            interval = self.min_interval
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def near_sellout(self) -> bool:
+        """A ticket type would sell out within about two polls at the current velocity"""
+        horizon = max(self.target_change, self.velocity * self.interval / 60 * 2)
+        for ticket_type in self.primary_types():
+            capacity = ticket_type.get('amount') or 0
+            remaining = capacity - self.counts.get(ticket_type.get('name'), 0)
+            if capacity and 0 < remaining <= horizon:
+                return True
+        return False
+
+    def _changes(self, before: Counter) -> List[Dict[str, Any]]:
+        changes = []
+        for ticket_type in self.primary_types():
+            name = ticket_type.get('name')
+            if self.counts.get(name, 0) == before.get(name, 0):
+                continue
+            capacity = ticket_type.get('amount') or 0
+            sold = self.counts.get(name, 0)
+            changes.append({
+                "region": self.region,
+                "event_id": self.event_id,
+                "ticket_type_id": ticket_type.get('_id'),
+                "ticket_type": name,
+                "sold_before": before.get(name, 0),
+                "sold": sold,
+                "capacity": capacity,
+                "available": max(0, capacity - sold),
+            })
+        return changes
+
+    def results(self) -> Dict[str, Any]:
+        return build_results(self.event_data, self.counts)
+
+
+def emit(changes: List[Dict[str, Any]], watch: EventWatch, jsonl: Optional[str]):
+    stamp = datetime.now().strftime('%H:%M:%S')
+    for change in changes:
+        print(f"[{stamp}] {watch.region:<10} {change['ticket_type'][:45]:<45} "
+              f"{change['sold_before']:>6,} → {change['sold']:<6,} ({change['sold'] - change['sold_before']:+d}), "
+              f"{change['available']:,} left")
+    if jsonl and changes:
+        with open(jsonl, 'a') as f:
+            for change in changes:
+                f.write(json.dumps({"at": datetime.now(timezone.utc).isoformat(), **change}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Change-only availability polling with adaptive intervals')
+    parser.add_argument('targets', nargs='*', help='REGION or REGION:EVENT_ID (default: every region in .env)')
+    parser.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL,
+                        help=f'Fastest poll per event in seconds (default: {DEFAULT_MIN_INTERVAL})')
+    parser.add_argument('--max-interval', type=float, default=DEFAULT_MAX_INTERVAL,
+                        help=f'Slowest poll per event in seconds (default: {DEFAULT_MAX_INTERVAL})')
+    parser.add_argument('--target-change', type=float, default=DEFAULT_TARGET_CHANGE,
+                        help=f'New tickets to aim for per poll (default: {DEFAULT_TARGET_CHANGE})')
+    parser.add_argument('--jsonl', help='Append every change as a JSON line to this file')
+    parser.add_argument('--record', action='store_true', help='Record a snapshot (snapshot_store.py) on every change')
+    parser.add_argument('--once', action='store_true', help='Baseline, poll every event once and exit')
+    args = parser.parse_args()
+
+    try:
+        targets = parse_targets(args.targets)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not targets:
+        print("❌ No regions configured. Set <REGION>_API and <REGION>_EVENT in .env")
+        sys.exit(1)
+
+    store = SnapshotStore() if args.record else None
+    watches = [EventWatch(region, event_id, args.min_interval, args.max_interval, args.target_change)
+               for region, event_id in targets]
+    queue = [(time.time(), i) for i in range(len(watches))]
+    heapq.heapify(queue)
+    started = time.time()
+    print(f"👀 Watching {len(watches)} event(s), polling every {args.min_interval:g}-{args.max_interval:g}s (Ctrl+C to stop)")
+
+    try:
+        while queue:
+            due, i = heapq.heappop(queue)
+            if due > time.time():
+                time.sleep(due - time.time())
+            watch = watches[i]
+            first = watch.total is None
+            try:
+                changes = watch.poll()
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ {watch.region} {watch.event_id}: {e}")
+                heapq.heappush(queue, (time.time() + watch.interval, i))
+                continue
+
+            if first:
+                print(f"📌 {watch.region}: {watch.name} - {watch.total:,} tickets, "
+                      f"{len(watch.primary_types())} primary type(s), {watch.api_calls} baseline call(s)")
+                heapq.heappush(queue, (time.time() + watch.interval, i))
+                continue
+
+            emit(changes, watch, args.jsonl)
+            if changes and store:
+                store.record(watch.event_id, watch.results(), watch.region)
+            if not args.once:
+                heapq.heappush(queue, (time.time() + watch.interval, i))
+    except KeyboardInterrupt:
+        print("\n⏹️ Stopped")
+
+    minutes = max((time.time() - started) / 60, 1 / 60)
+    print(f"\n📊 API calls per event ({minutes:.1f} min):")
+    for watch in watches:
+        print(f"  {watch.region:<10} {watch.name[:40]:<40} {watch.api_calls:>6} call(s), "
+              f"{watch.velocity:.1f} tickets/min, next poll in {watch.interval:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
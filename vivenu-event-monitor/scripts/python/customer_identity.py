@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+HYROX Customer Identity - Cross-event customer index over ticket_index.db
+
+ticket_index.db already holds every ticket historical_sync.py fetched, for
+every event and region. This adds a customer_identities table next to it
+with one row per ticket:
+
+    - email normalized (case, whitespace, +tags, Gmail dots) and hashed
+    - name normalized (accents, punctuation, case, token order) and hashed
+    - identity = the email hash, or the name hash when a ticket has no email
+
+customer_identities stores only hashes (salted with CUSTOMER_HASH_SALT if
+set), but it sits next to the `tickets` table, which keeps each ticket's
+plaintext email and name. Result labels are read from there: a masked email,
+or the holder's name when a ticket has no email. The table is filled
+incrementally: every command first hashes tickets that are new or re-indexed
+since the last run.
+
+Like historical_sync.py, queries count only VALID and DETAILSREQUIRED
+tickets; --all-statuses includes cancelled, invalid and other tickets too.
+
+Queries load the few needed columns once and answer with in-memory hash
+joins / hash aggregates keyed on the identity hash:
+
+    repeat-donors   identities with charity tickets at 2+ events
+    duplicates      identities with 2+ tickets of the same type at one event
+    totals          per-athlete tickets, events, regions and spend
+    lookup EMAIL    every ticket for one customer, across events
+
+Usage:
+    python customer_identity.py build
+    python customer_identity.py repeat-donors [--min-events N] [--region R] [--all-statuses]
+    python customer_identity.py duplicates [--event EVENT_ID] [--all-types] [--all-statuses]
+    python customer_identity.py totals [--top N] [--charity] [--all-statuses]
+    python customer_identity.py lookup <EMAIL>
+"""
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import unicodedata
+from pathlib import Path
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from ticket_index import DEFAULT_DB_PATH
+
+load_dotenv()
+
+HASH_SALT = os.getenv("CUSTOMER_HASH_SALT", "")
+GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+# Statuses historical_sync.py sends; refunded, cancelled or invalid tickets aren't purchases to count
+COUNTED_STATUSES = ("VALID", "DETAILSREQUIRED")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customer_identities (
+    ticket_id TEXT PRIMARY KEY,
+    identity TEXT NOT NULL,
+    email_hash TEXT,
+    name_hash TEXT,
+    event_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    ticket_name TEXT,
+    is_charity INTEGER NOT NULL,
+    status TEXT,
+    real_price REAL,
+    created_at TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_identities_identity ON customer_identities (identity);
+CREATE INDEX IF NOT EXISTS idx_identities_email ON customer_identities (email_hash);
+CREATE INDEX IF NOT EXISTS idx_identities_event ON customer_identities (event_id);
+"""
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    email = email.strip().lower()
+    if "@" not in email:
+        return None
+    local, _, domain = email.rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local = local.replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}" if local else None
+
+
+def normalize_name(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    tokens = re.sub(r"[^a-z ]+", " ", ascii_name.lower()).split()
+    # Sorted tokens: "Smith John" and "John Smith" are the same person
+    return " ".join(sorted(tokens)) or None
+
+
+def identity_hash(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return hashlib.sha256(f"{HASH_SALT}{value}".encode("utf-8")).hexdigest()[:32]
+
+
+class IdentityIndex:
+    """Hashed customer identities for every ticket in the ticket index"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def build(self) -> int:
+        """Hash tickets that are new or re-indexed since the last build; returns how many"""
+        rows = self.conn.execute("""
+            SELECT t.ticket_id, t.email, t.name, t.event_id, t.region, t.ticket_name, t.status,
+                   json_extract(t.raw, '$.realPrice') AS real_price, t.created_at, t.indexed_at
+            FROM tickets t
+            LEFT JOIN customer_identities c ON c.ticket_id = t.ticket_id
+            WHERE c.ticket_id IS NULL OR c.indexed_at <> t.indexed_at
+        """).fetchall()
+
+        records = []
+        for row in rows:
+            email_hash = identity_hash(normalize_email(row["email"]))
+            name_hash = identity_hash(normalize_name(row["name"]))
+            identity = email_hash or name_hash
+            if identity is None:
+                continue
+            records.append((
+                row["ticket_id"], identity, email_hash, name_hash, row["event_id"], row["region"],
+                row["ticket_name"], int("CHARITY" in (row["ticket_name"] or "").upper()), row["status"],
+                row["real_price"], row["created_at"], row["indexed_at"]
+            ))
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO customer_identities (
+                    ticket_id, identity, email_hash, name_hash, event_id, region, ticket_name,
+                    is_charity, status, real_price, created_at, indexed_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ticket_id) DO UPDATE SET
+                    identity = excluded.identity,
+                    email_hash = excluded.email_hash,
+                    name_hash = excluded.name_hash,
+                    event_id = excluded.event_id,
+                    region = excluded.region,
+                    ticket_name = excluded.ticket_name,
+                    is_charity = excluded.is_charity,
+                    status = excluded.status,
+                    real_price = excluded.real_price,
+                    created_at = excluded.created_at,
+                    indexed_at = excluded.indexed_at
+            """, records)
+        return len(records)
+
+    def _rows(self, charity_only: bool = False, region: Optional[str] = None,
+              event_id: Optional[str] = None, all_statuses: bool = False) -> List[Tuple]:
+        query = """
+            SELECT identity, ticket_id, event_id, region, ticket_name, is_charity, real_price
+            FROM customer_identities WHERE 1 = 1
+        """
+        params: List[Any] = []
+        if not all_statuses:
+            query += f" AND status IN ({', '.join('?' for _ in COUNTED_STATUSES)})"
+            params.extend(COUNTED_STATUSES)
+        if charity_only:
+            query += " AND is_charity = 1"
+        if region:
+            query += " AND region = ?"
+            params.append(region.upper())
+        if event_id:
+            query += " AND event_id = ?"
+            params.append(event_id)
+        return self.conn.execute(query, params).fetchall()
+
+    def repeat_donors(self, min_events: int = 2, region: Optional[str] = None,
+                      all_statuses: bool = False) -> List[Dict[str, Any]]:
+        """Identities with charity tickets at min_events or more distinct events"""
+        events = defaultdict(set)
+        regions = defaultdict(set)
+        tickets = defaultdict(int)
+        for identity, _, event_id, ticket_region, _, _, _ in self._rows(charity_only=True, region=region,
+                                                                        all_statuses=all_statuses):
+            events[identity].add(event_id)
+            regions[identity].add(ticket_region)
+            tickets[identity] += 1
+        donors = [{"identity": identity, "events": len(event_ids), "regions": sorted(regions[identity]),
+                   "charity_tickets": tickets[identity]}
+                  for identity, event_ids in events.items() if len(event_ids) >= min_events]
+        return sorted(donors, key=lambda d: (-d["events"], -d["charity_tickets"]))
+
+    def duplicates(self, event_id: Optional[str] = None, charity_only: bool = True,
+                   all_statuses: bool = False) -> List[Dict[str, Any]]:
+        """Same identity buying the same ticket type more than once at one event"""
+        groups = defaultdict(list)
+        for identity, ticket_id, ticket_event, _, ticket_name, _, _ in self._rows(charity_only, event_id=event_id,
+                                                                                  all_statuses=all_statuses):
+            groups[(identity, ticket_event, ticket_name)].append(ticket_id)
+        found = [{"identity": identity, "event_id": ticket_event, "ticket_name": ticket_name, "ticket_ids": ids}
+                 for (identity, ticket_event, ticket_name), ids in groups.items() if len(ids) > 1]
+        return sorted(found, key=lambda d: -len(d["ticket_ids"]))
+
+    def totals(self, charity_only: bool = False, all_statuses: bool = False) -> List[Dict[str, Any]]:
+        """Per-identity ticket count, events, regions and spend"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for identity, _, event_id, region, _, is_charity, price in self._rows(charity_only, all_statuses=all_statuses):
+            entry = totals.get(identity)
+            if entry is None:
+                entry = totals[identity] = {"identity": identity, "tickets": 0, "charity_tickets": 0,
+                                            "events": set(), "regions": set(), "spend": 0.0}
+            entry["tickets"] += 1
+            entry["charity_tickets"] += is_charity
+            entry["events"].add(event_id)
+            entry["regions"].add(region)
+            entry["spend"] += price or 0
+        result = []
+        for entry in totals.values():
+            entry["events"] = len(entry["events"])
+            entry["regions"] = sorted(entry["regions"])
+            result.append(entry)
+        return sorted(result, key=lambda e: (-e["tickets"], -e["spend"]))
+
+    def display_names(self, identities: List[str]) -> Dict[str, str]:
+        """Readable labels for a page of results: masked email, or the plaintext name from `tickets`"""
+        labels: Dict[str, str] = {}
+        for identity in identities:
+            row = self.conn.execute("""
+                SELECT t.email, t.name FROM customer_identities c
+                JOIN tickets t ON t.ticket_id = c.ticket_id
+                WHERE c.identity = ? LIMIT 1
+            """, (identity,)).fetchone()
+            if row:
+                labels[identity] = mask_email(row["email"]) if row["email"] else (row["name"] or identity[:12])
+        return labels
+
+    def lookup(self, email: str) -> List[sqlite3.Row]:
+        email_hash = identity_hash(normalize_email(email))
+        return self.conn.execute("""
+            SELECT c.region, c.event_id, c.ticket_name, c.status, c.created_at, c.ticket_id
+            FROM customer_identities c WHERE c.identity = ? ORDER BY c.created_at
+        """, (email_hash,)).fetchall()
+
+
+def mask_email(email: str) -> str:
+    local, _, domain = email.partition("@")
+    return f"{local[:2]}***@{domain}" if domain else email[:2] + "***"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-event customer identity queries')
+    parser.add_argument('--db', default=str(DEFAULT_DB_PATH), help=f'Ticket index (default: {DEFAULT_DB_PATH})')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help='Hash new and re-indexed tickets')
+
+    repeat_parser = sub.add_parser('repeat-donors', help='Charity buyers at several events')
+    repeat_parser.add_argument('--min-events', type=int, default=2)
+    repeat_parser.add_argument('--region')
+    repeat_parser.add_argument('--top', type=int, default=50)
+    repeat_parser.add_argument('--all-statuses', action='store_true', help='Count every ticket status, not just valid ones')
+
+    duplicates_parser = sub.add_parser('duplicates', help='Same customer, same ticket type, same event')
+    duplicates_parser.add_argument('--event')
+    duplicates_parser.add_argument('--all-types', action='store_true', help='Not just charity ticket types')
+    duplicates_parser.add_argument('--top', type=int, default=50)
+    duplicates_parser.add_argument('--all-statuses', action='store_true', help='Count every ticket status, not just valid ones')
+
+    totals_parser = sub.add_parser('totals', help='Per-athlete totals')
+    totals_parser.add_argument('--charity', action='store_true', help='Only charity tickets')
+    totals_parser.add_argument('--top', type=int, default=50)
+    totals_parser.add_argument('--all-statuses', action='store_true', help='Count every ticket status, not just valid ones')
+
+    lookup_parser = sub.add_parser('lookup', help='Every ticket for one email')
+    lookup_parser.add_argument('email')
+
+    args = parser.parse_args()
+    if not Path(args.db).exists():
+        print(f"❌ No ticket index at {args.db}. Run historical_sync.py first.")
+        sys.exit(1)
+
+    index = IdentityIndex(Path(args.db))
+    started = time.time()
+    hashed = index.build()
+    if args.command == 'build' or hashed:
+        print(f"🔐 Hashed {hashed:,} new or updated ticket(s) in {time.time() - started:.2f}s")
+    if args.command == 'build':
+        return
+
+    started = time.time()
+    if args.command == 'repeat-donors':
+        donors = index.repeat_donors(args.min_events, args.region, args.all_statuses)
+        labels = index.display_names([d["identity"] for d in donors[:args.top]])
+        print(f"\n🔁 {len(donors):,} customer(s) with charity tickets at {args.min_events}+ events")
+        for donor in donors[:args.top]:
+            print(f"  {labels.get(donor['identity'], donor['identity'][:12]):<32} {donor['events']} events, "
+                  f"{donor['charity_tickets']} charity ticket(s), {', '.join(donor['regions'])}")
+
+    elif args.command == 'duplicates':
+        found = index.duplicates(args.event, charity_only=not args.all_types, all_statuses=args.all_statuses)
+        labels = index.display_names([d["identity"] for d in found[:args.top]])
+        print(f"\n👯 {len(found):,} duplicate purchase group(s)")
+        for group in found[:args.top]:
+            print(f"  {labels.get(group['identity'], group['identity'][:12]):<32} {len(group['ticket_ids'])}x "
+                  f"{group['ticket_name']} ({group['event_id']})")
+
+    elif args.command == 'totals':
+        totals = index.totals(args.charity, args.all_statuses)
+        labels = index.display_names([t["identity"] for t in totals[:args.top]])
+        print(f"\n🏃 {len(totals):,} athlete(s)")
+        print(f"  {'Athlete':<32} {'Tickets':>8} {'Charity':>8} {'Events':>7} {'Spend':>10}  Regions")
+        for entry in totals[:args.top]:
+            print(f"  {labels.get(entry['identity'], entry['identity'][:12]):<32} {entry['tickets']:>8} "
+                  f"{entry['charity_tickets']:>8} {entry['events']:>7} {entry['spend']:>10.2f}  {', '.join(entry['regions'])}")
+
+    elif args.command == 'lookup':
+        rows = index.lookup(args.email)
+        if not rows:
+            print(f"No tickets for {args.email}")
+        for row in rows:
+            print(f"  {row['created_at'] or '':<25} {row['region']:<10} {row['event_id']}  "
+                  f"{row['ticket_name']} [{row['status']}] {row['ticket_id']}")
+
+    print(f"\n⏱️ {time.time() - started:.2f}s")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+HYROX Data Fields Matrix - Resolve checkout fields for every charity ticket type
+
+test_data_fields.py probes one hard-coded event and ticket type. This script
+discovers every configured region (<REGION>_API plus <REGION>_EVENT in .env),
+loads each event's ticket types, picks the charity ones, and resolves data
+fields for every combination at once:
+
+    - event level, CHECKOUT scope
+    - each charity ticket type x CHECKOUT / CUSTOMER / TICKET scope
+
+The resolve calls run on a bounded thread pool and go through
+metadata_cache.py, so results are cached per seller, event, ticket type and
+scope and a second run (or test_data_fields.py) is served from disk. The
+output is one matrix of which fields exist where.
+
+Usage:
+    python data_fields_matrix.py [REGION ...] [--concurrency N] [--scopes CHECKOUT,TICKET]
+                                 [--output data_fields_matrix.json] [--csv PATH] [--refresh]
+"""
+
+import os
+import csv
+import sys
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+from metadata_cache import get_event, resolve_data_fields, shared_cache
+
+env_path = Path(__file__).parent / '.env'
+load_dotenv(env_path)
+
+SCOPES = ["CHECKOUT", "CUSTOMER", "TICKET"]
+EVENT_LEVEL = "(event)"
+DEFAULT_CONCURRENCY = 8
+
+
+def base_url_for(region: str) -> str:
+    return "https://vivenu.dev/api" if region in ["DEV", "TEST"] else "https://vivenu.com/api"
+
+
+def configured_regions() -> Dict[str, str]:
+    """Region -> event ID for every region with both an API key and an event in .env"""
+    regions = {}
+    for key, value in os.environ.items():
+        if not key.endswith("_EVENT") or not value or value.startswith("your_"):
+            continue
+        region = key[:-len("_EVENT")]
+        if os.getenv(f"{region}_API"):
+            regions[region] = value
+    return dict(sorted(regions.items()))
+
+
+def charity_ticket_types(event_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [t for t in event_data.get('tickets', []) if 'CHARITY' in (t.get('name') or '').upper()]
+
+
+def build_jobs(regions: Dict[str, str], scopes: List[str], refresh: bool) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """One resolve job per event-level/ticket-type/scope cell, plus any discovery errors"""
+    jobs, errors = [], []
+    for region, event_id in regions.items():
+        api_key = os.getenv(f"{region}_API")
+        base_url = base_url_for(region)
+        try:
+            event_data = get_event(base_url, event_id, api_key, include_tickets=True, refresh=refresh)
+        except requests.exceptions.RequestException as e:
+            errors.append(f"{region}: could not load event {event_id}: {e}")
+            continue
+
+        seller_id = event_data.get('sellerId')
+        common = {
+            "region": region,
+            "base_url": base_url,
+            "api_key": api_key,
+            "event_id": event_id,
+            "event_name": event_data.get('name', event_id),
+            "seller_id": seller_id,
+        }
+        if "CHECKOUT" in scopes:
+            jobs.append({**common, "ticket_type_id": None, "ticket_type": EVENT_LEVEL, "scope": "CHECKOUT"})
+
+        ticket_types = charity_ticket_types(event_data)
+        if not ticket_types:
+            errors.append(f"{region}: no charity ticket types in {common['event_name']}")
+        for ticket_type in ticket_types:
+            for scope in scopes:
+                jobs.append({**common, "ticket_type_id": ticket_type['_id'],
+                             "ticket_type": ticket_type.get('name', ticket_type['_id']), "scope": scope})
+    return jobs, errors
+
+
+def resolve_job(job: Dict[str, Any], refresh: bool) -> Dict[str, Any]:
+    params = {"sellerId": job["seller_id"], "scope": job["scope"], "eventId": job["event_id"]}
+    if job["ticket_type_id"]:
+        params["ticketTypeId"] = job["ticket_type_id"]
+
+    row = {k: job[k] for k in ("region", "event_id", "event_name", "ticket_type_id", "ticket_type", "scope")}
+    try:
+        fields = resolve_data_fields(job["base_url"], job["api_key"], params, refresh=refresh) or []
+        row["fields"] = [{"slug": f.get('slug') or f.get('name') or f.get('_id'), "name": f.get('name'),
+                          "type": f.get('type'), "_id": f.get('_id')} for f in fields]
+        row["error"] = None
+    except requests.exceptions.HTTPError as e:
+        row["fields"] = []
+        row["error"] = f"HTTP {e.response.status_code}"
+    except requests.exceptions.RequestException as e:
+        row["fields"] = []
+        row["error"] = str(e)
+    return row
+
+
+def resolve_all(jobs: List[Dict[str, Any]], concurrency: int, refresh: bool) -> List[Dict[str, Any]]:
+    rows = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(resolve_job, job, refresh) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            rows.append(future.result())
+            print(f"\r  Resolved {done}/{len(jobs)}", end="", flush=True)
+    print()
+    # Stable order: region, event, event level first, ticket type, scope
+    scope_order = {scope: i for i, scope in enumerate(SCOPES)}
+    rows.sort(key=lambda r: (r["region"], r["event_id"], r["ticket_type"] != EVENT_LEVEL,
+                             r["ticket_type"], scope_order.get(r["scope"], len(SCOPES))))
+    return rows
+
+
+def field_columns(rows: List[Dict[str, Any]]) -> List[str]:
+    columns = []
+    for row in rows:
+        for field in row["fields"]:
+            if field["slug"] not in columns:
+                columns.append(field["slug"])
+    return columns
+
+
+def print_matrix(rows: List[Dict[str, Any]], columns: List[str]):
+    print(f"\n{'='*80}")
+    print("📋 DATA FIELDS MATRIX")
+    print(f"{'='*80}")
+    if not columns:
+        print("No data fields configured for any charity ticket type")
+    for i, column in enumerate(columns, 1):
+        print(f"  F{i}: {column}")
+
+    header = f"{'Region':<12} {'Ticket type':<40} {'Scope':<9} " + " ".join(f"F{i:<3}" for i in range(1, len(columns) + 1))
+    current_event = None
+    for row in rows:
+        if row["event_id"] != current_event:
+            current_event = row["event_id"]
+            print(f"\n📅 {row['event_name']} ({row['event_id']})")
+            print(header)
+        present = {f["slug"] for f in row["fields"]}
+        cells = " ".join(f"{'✓' if c in present else '·':<4}" for c in columns)
+        suffix = f"  ❌ {row['error']}" if row["error"] else ""
+        print(f"{row['region']:<12} {row['ticket_type'][:40]:<40} {row['scope']:<9} {cells}{suffix}")
+
+
+def write_csv(rows: List[Dict[str, Any]], columns: List[str], path: str):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["region", "event_id", "event_name", "ticket_type_id", "ticket_type", "scope", "error"] + columns)
+        for row in rows:
+            present = {field["slug"] for field in row["fields"]}
+            writer.writerow([row["region"], row["event_id"], row["event_name"], row["ticket_type_id"] or "",
+                             row["ticket_type"], row["scope"], row["error"] or ""]
+                            + [1 if c in present else 0 for c in columns])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resolve data fields for every charity ticket type and scope')
+    parser.add_argument('regions', nargs='*', help='Regions to include (default: every region configured in .env)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Parallel resolve calls (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--scopes', default=",".join(SCOPES), help='Comma-separated scopes (default: all)')
+    parser.add_argument('--output', default='data_fields_matrix.json', help='JSON output file')
+    parser.add_argument('--csv', help='Also write the matrix as CSV')
+    parser.add_argument('--refresh', action='store_true', help='Bypass the metadata cache')
+    args = parser.parse_args()
+
+    scopes = [s.strip().upper() for s in args.scopes.split(",") if s.strip()]
+    unknown = [s for s in scopes if s not in SCOPES]
+    if unknown:
+        print(f"❌ Unknown scope(s): {', '.join(unknown)} (expected {', '.join(SCOPES)})")
+        sys.exit(1)
+
+    regions = configured_regions()
+    if args.regions:
+        wanted = [r.upper() for r in args.regions]
+        missing = [r for r in wanted if r not in regions]
+        if missing:
+            print(f"❌ No <REGION>_API/<REGION>_EVENT configured for: {', '.join(missing)}")
+            sys.exit(1)
+        regions = {r: regions[r] for r in wanted}
+    if not regions:
+        print("❌ No regions configured. Set <REGION>_API and <REGION>_EVENT in .env")
+        sys.exit(1)
+
+    print(f"🔎 Discovering charity ticket types in {len(regions)} region(s): {', '.join(regions)}")
+    jobs, errors = build_jobs(regions, scopes, args.refresh)
+    for error in errors:
+        print(f"  ⚠️ {error}")
+    print(f"📡 Resolving {len(jobs)} combination(s) with {args.concurrency} worker(s)")
+    rows = resolve_all(jobs, args.concurrency, args.refresh)
+    columns = field_columns(rows)
+
+    print_matrix(rows, columns)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            "generated_at": datetime.now().isoformat(),
+            "regions": regions,
+            "scopes": scopes,
+            "fields": columns,
+            "rows": rows,
+            "errors": errors,
+        }, f, indent=2)
+    print(f"\n💾 Matrix saved to {args.output}")
+    if args.csv:
+        write_csv(rows, columns, args.csv)
+        print(f"💾 CSV saved to {args.csv}")
+
+    failed = sum(1 for row in rows if row["error"])
+    print(f"📦 Metadata cache: {shared_cache().summary()}")
+    if failed:
+        print(f"⚠️ {failed} combination(s) failed to resolve")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+HYROX Dead-Letter Queue - Failed webhook sends and batched retries
+
+historical_sync.py records every webhook it fails to deliver here instead of
+appending the full response to the progress file. Each entry keeps the ticket
+payload, the error class, the last error (truncated) and the attempt count,
+so a worker outage can be recovered by replaying just the failed tickets.
+
+Usage:
+    python dead_letters.py <REGION> list [--event EVENT_ID]
+    python dead_letters.py <REGION> stats
+    python dead_letters.py <REGION> retry [--event EVENT_ID] [--concurrency N] [--tries N] [--max-attempts N]
+                                          [--project] [--gzip]
+
+Retries are shaped like live sends: pass the same --project / --gzip as the
+original run (or set WEBHOOK_PROJECTION / WEBHOOK_GZIP in .env).
+"""
+
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+from ticket_index import TicketIndex, DEFAULT_DB_PATH as TICKET_INDEX_PATH
+
+DEFAULT_DB_PATH = Path("dead_letters.db")
+
+# Longest error text kept per entry - full worker responses are not needed to retry
+MAX_ERROR_LENGTH = 500
+
+# Failures worth backing off and retrying within one pass; 4xx won't fix itself
+RETRYABLE_CLASSES = {"http_5xx", "http_429", "timeout", "connection"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dead_letters (
+    region TEXT NOT NULL,
+    ticket_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    error_class TEXT NOT NULL,
+    status_code INTEGER,
+    last_error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    first_failed_at TEXT NOT NULL,
+    last_failed_at TEXT NOT NULL,
+    ticket TEXT,
+    PRIMARY KEY (region, ticket_id)
+);
+CREATE INDEX IF NOT EXISTS idx_dead_letters_event ON dead_letters (region, event_id);
+"""
+
+
+def classify_failure(status_code: Optional[int], error: Optional[BaseException] = None) -> str:
+    """Bucket a failed send into an error class"""
+    if status_code is not None:
+        if status_code == 429:
+            return "http_429"
+        if status_code >= 500:
+            return "http_5xx"
+        if status_code >= 400:
+            return "http_4xx"
+        return f"http_{status_code}"
+    name = type(error).__name__ if error else ""
+    if "Timeout" in name:
+        return "timeout"
+    if "Connection" in name:
+        return "connection"
+    return "error"
+
+
+class DeadLetterQueue:
+    """SQLite-backed store of failed webhook sends, keyed by region and ticket"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_failure(self, region: str, ticket: Dict[str, Any], error_class: str,
+                       status_code: Optional[int], error: str, event_id: Optional[str] = None,
+                       attempts: int = 1):
+        """Add a failed ticket or bump the attempt count of an existing entry"""
+        now = datetime.utcnow().isoformat()
+        ticket_json = json.dumps(ticket, separators=(',', ':')) if ticket else None
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO dead_letters (
+                    region, ticket_id, event_id, error_class, status_code, last_error,
+                    attempts, first_failed_at, last_failed_at, ticket
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (region, ticket_id) DO UPDATE SET
+                    error_class = excluded.error_class,
+                    status_code = excluded.status_code,
+                    last_error = excluded.last_error,
+                    attempts = dead_letters.attempts + excluded.attempts,
+                    last_failed_at = excluded.last_failed_at,
+                    ticket = COALESCE(excluded.ticket, dead_letters.ticket)
+            """, (
+                region.upper(),
+                ticket.get('_id', ''),
+                event_id or ticket.get('eventId', ''),
+                error_class,
+                status_code,
+                (error or '')[:MAX_ERROR_LENGTH],
+                attempts,
+                now,
+                now,
+                ticket_json
+            ))
+
+    def record_legacy(self, region: str, errors: List[Dict[str, Any]]) -> int:
+        """Import old progress["errors"] entries, which carry no ticket payload"""
+        with self.conn:
+            for entry in errors:
+                timestamp = entry.get("timestamp") or datetime.utcnow().isoformat()
+                self.conn.execute("""
+                    INSERT INTO dead_letters (
+                        region, ticket_id, event_id, error_class, status_code, last_error,
+                        attempts, first_failed_at, last_failed_at, ticket
+                    )
+                    VALUES (?, ?, '', 'legacy', NULL, ?, 1, ?, ?, NULL)
+                    ON CONFLICT (region, ticket_id) DO NOTHING
+                """, (region.upper(), entry.get("ticket_id", ""),
+                      str(entry.get("error", ""))[:MAX_ERROR_LENGTH], timestamp, timestamp))
+        return len(errors)
+
+    def remove(self, region: str, ticket_id: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM dead_letters WHERE region = ? AND ticket_id = ?",
+                              (region.upper(), ticket_id))
+
+    def remove_many(self, region: str, ticket_ids: Iterable[str]) -> int:
+        """Delete entries for many sent tickets in one transaction"""
+        with self.conn:
+            cursor = self.conn.executemany("DELETE FROM dead_letters WHERE region = ? AND ticket_id = ?",
+                                           ((region.upper(), ticket_id) for ticket_id in ticket_ids))
+        return cursor.rowcount
+
+    def pending(self, region: str, event_id: Optional[str] = None,
+                max_attempts: Optional[int] = None) -> List[sqlite3.Row]:
+        query = "SELECT * FROM dead_letters WHERE region = ?"
+        params: List[Any] = [region.upper()]
+        if event_id:
+            query += " AND event_id = ?"
+            params.append(event_id)
+        if max_attempts:
+            query += " AND attempts < ?"
+            params.append(max_attempts)
+        return self.conn.execute(query + " ORDER BY first_failed_at", params).fetchall()
+
+    def count(self, region: str) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM dead_letters WHERE region = ?",
+                                 (region.upper(),)).fetchone()[0]
+
+    def stats(self, region: str) -> List[sqlite3.Row]:
+        return self.conn.execute("""
+            SELECT event_id, error_class, COUNT(*) AS tickets, MAX(attempts) AS max_attempts,
+                   MAX(last_failed_at) AS last_failed_at
+            FROM dead_letters
+            WHERE region = ?
+            GROUP BY event_id, error_class
+            ORDER BY event_id, error_class
+        """, (region.upper(),)).fetchall()
+
+
+def backoff_delay(attempt: int, base_delay: float = 1, max_delay: float = 30) -> float:
+    """Exponential backoff with 20% jitter, as in get_tickets_for_event"""
+    delay = min(base_delay * (2 ** attempt), max_delay)
+    return delay + delay * 0.2 * random.random()
+
+
+def resolve_ticket(entry: sqlite3.Row) -> Optional[Dict[str, Any]]:
+    """Ticket payload of an entry, falling back to the local ticket index for legacy entries"""
+    if entry["ticket"]:
+        return json.loads(entry["ticket"])
+    if not TICKET_INDEX_PATH.exists():
+        return None
+    with TicketIndex(TICKET_INDEX_PATH) as index:
+        raw = index.raw_ticket(entry["ticket_id"])
+    return json.loads(raw) if raw else None
+
+
+def retry_entry(sync, ticket: Dict[str, Any], tries: int) -> Tuple[bool, Optional[int], str, str, int]:
+    """Replay one ticket with backoff. Runs in a worker thread, so only talks HTTP."""
+    # Same projection as send_webhook, so a retry matches the live send
+    payload, full_size = sync.build_webhook_payload(sync.transform_to_webhook(ticket))
+    ok, status_code, detail, error_class = False, None, "", "error"
+    attempts = 0
+    for attempt in range(tries):
+        attempts += 1
+        ok, status_code, detail, error_class = sync.deliver_webhook(payload, quiet=True, full_size=full_size)
+        if ok or error_class not in RETRYABLE_CLASSES:
+            break
+        if attempt < tries - 1:
+            time.sleep(backoff_delay(attempt))
+    return ok, status_code, detail, error_class, attempts
+
+
+def retry_dead_letters(sync, event_id: Optional[str] = None, concurrency: int = 4,
+                       tries: int = 3, max_attempts: Optional[int] = None) -> Dict[str, int]:
+    """Replay pending dead letters concurrently and update the progress file once at the end"""
+    queue = sync.dead_letters
+    entries = queue.pending(sync.region, event_id=event_id, max_attempts=max_attempts)
+    results = {"retried": 0, "sent": 0, "failed": 0, "missing_payload": 0}
+    if not entries:
+        print("✅ No dead letters to retry")
+        return results
+
+    print(f"🔁 Retrying {len(entries)} dead letter(s) with concurrency {concurrency}, {tries} tries each")
+
+    jobs = []
+    for entry in entries:
+        ticket = resolve_ticket(entry)
+        if ticket is None:
+            results["missing_payload"] += 1
+            print(f"  ⚠️ No payload for {entry['ticket_id']} - rerun the event sync to recover it")
+            continue
+        jobs.append((entry, ticket))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(retry_entry, sync, ticket, tries): (entry, ticket) for entry, ticket in jobs}
+        for future in as_completed(futures):
+            entry, ticket = futures[future]
+            ok, status_code, detail, error_class, attempts = future.result()
+            results["retried"] += 1
+            label = f"{ticket.get('ticketName', 'Unknown')} - {ticket.get('name', 'Unknown')}"
+
+            if ok:
+                results["sent"] += 1
+                queue.remove(sync.region, entry["ticket_id"])
+                sync.mark_ticket_sent(entry["event_id"] or ticket.get('eventId', ''), entry["ticket_id"])
+                print(f"  ✓ Sent {label} after {attempts} attempt(s)")
+            else:
+                results["failed"] += 1
+                queue.record_failure(sync.region, ticket, error_class, status_code, detail,
+                                     event_id=entry["event_id"] or None, attempts=attempts)
+                print(f"  ✗ Still failing {label}: {error_class} {status_code or ''}")
+
+    for touched_event in {entry["event_id"] for entry, _ in jobs if entry["event_id"]}:
+        sync.update_event_status(touched_event)
+    sync.save_progress()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HYROX webhook dead-letter queue')
+    parser.add_argument('region', help='Region code (e.g., PARIS, FRANKFURT)')
+    parser.add_argument('command', choices=['list', 'stats', 'retry'])
+    parser.add_argument('--event', help='Only entries for this event ID')
+    parser.add_argument('--concurrency', type=int, default=4, help='Parallel retries (default: 4)')
+    parser.add_argument('--tries', type=int, default=3, help='Send attempts per ticket in this pass (default: 3)')
+    parser.add_argument('--max-attempts', type=int, help='Skip entries that already failed this many times')
+    parser.add_argument('--project', action='store_true', help='Send only the ticket fields in webhook_fields.json, as the original run did')
+    parser.add_argument('--gzip', action='store_true', help='Gzip webhook bodies, as the original run did')
+    args = parser.parse_args()
+
+    region = args.region.upper()
+
+    if args.command == 'retry':
+        from historical_sync import HistoricalSync
+        sync = HistoricalSync(region)
+        if args.project or args.gzip:
+            from webhook_payload import WebhookPayloads
+            sync.payloads = WebhookPayloads(project=args.project or sync.payloads.fields is not None,
+                                            compress=args.gzip or sync.payloads.compress)
+        results = retry_dead_letters(sync, event_id=args.event, concurrency=args.concurrency,
+                                     tries=args.tries, max_attempts=args.max_attempts)
+        print(f"\n{'='*60}")
+        print(f"Retried: {results['retried']}  Sent: {results['sent']}  Still failing: {results['failed']}")
+        sync.payloads.print_report()
+        if results["missing_payload"]:
+            print(f"Missing payload: {results['missing_payload']}")
+        print(f"Remaining dead letters: {sync.dead_letters.count(region)}")
+        print(f"{'='*60}")
+        sys.exit(0 if results["failed"] == 0 else 1)
+
+    queue = DeadLetterQueue()
+    if args.command == 'stats':
+        rows = queue.stats(region)
+        if not rows:
+            print(f"✅ No dead letters for {region}")
+            return
+        print(f"{'Event':<26} {'Error class':<12} {'Tickets':>8} {'Max tries':>10}  Last failure")
+        for row in rows:
+            print(f"{row['event_id']:<26} {row['error_class']:<12} {row['tickets']:>8} "
+                  f"{row['max_attempts']:>10}  {row['last_failed_at']}")
+        return
+
+    for row in queue.pending(region, event_id=args.event):
+        print(f"{row['ticket_id']}  {row['event_id']}  {row['error_class']:<10} "
+              f"attempts={row['attempts']}  last={row['last_failed_at']}  {row['last_error'][:80]}")
+
+
+if __name__ == "__main__":
+    main()
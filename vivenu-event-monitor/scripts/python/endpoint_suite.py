@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Vivenu Event Monitor - Endpoint Regression Suite
+
+Non-interactive runner for the whole endpoint catalogue (health, status,
+poll/manual, the /test/* probes and the availability APIs) meant to gate
+deploys. Every enabled endpoint is called `repeat` times in parallel and its
+median latency is checked against:
+
+    - budget_ms from endpoint_suite.json
+    - its baseline: the median of the last `baseline_runs` passing runs in the
+      results history for the same base URL, plus regression_tolerance
+      (and at least regression_min_ms, so fast endpoints don't flap)
+
+Each run is appended to the history file (JSON lines). Exit code is 1 if any
+endpoint errors, returns an unexpected status, blows its budget or regresses.
+
+Target URL precedence: --base-url, then ENDPOINT_SUITE_URL from .env, then
+base_url in the config file.
+
+Usage:
+    python endpoint_suite.py [--config endpoint_suite.json] [--base-url URL]
+                             [--only NAME ...] [--concurrency N] [--repeat N]
+                             [--no-record] [--no-baseline]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from phase_profiler import phase, add_profile_arguments, enable_from_args
+
+load_dotenv()
+
+DEFAULT_CONFIG = Path(__file__).with_name("endpoint_suite.json")
+DEFAULT_EXPECTED_STATUS = [200, 207]
+
+
+def load_config(path: Path) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def call_endpoint(base_url: str, endpoint: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """One GET against an endpoint, shaped like the test_*.py result dicts"""
+    url = f"{base_url}{endpoint['path']}"
+    start_time = time.time()
+    try:
+        response = requests.get(url, params=endpoint.get('params'), timeout=timeout)
+        return {
+            "url": response.url,
+            "status_code": response.status_code,
+            "duration_ms": round((time.time() - start_time) * 1000, 2)
+        }
+    except Exception as e:
+        return {
+            "url": url,
+            "error": str(e),
+            "duration_ms": round((time.time() - start_time) * 1000, 2)
+        }
+
+
+def load_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    runs = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                runs.append(json.loads(line))
+    return runs
+
+
+def baselines(history: List[Dict[str, Any]], base_url: str, runs: int) -> Dict[str, float]:
+    """Median of each endpoint's median latency over its last `runs` passing runs"""
+    per_endpoint: Dict[str, List[float]] = {}
+    for run in history:
+        if run.get("base_url") != base_url:
+            continue
+        for name, result in run.get("results", {}).items():
+            if result.get("passed") and result.get("median_ms") is not None:
+                per_endpoint.setdefault(name, []).append(result["median_ms"])
+    return {
+        name: statistics.median(values[-runs:])
+        for name, values in per_endpoint.items()
+        if values
+    }
+
+
+def evaluate(endpoint: Dict[str, Any], calls: List[Dict[str, Any]], baseline: Optional[float],
+             tolerance: float, min_regression_ms: float) -> Dict[str, Any]:
+    """Summarize an endpoint's calls and decide whether it passes the gates"""
+    expected = endpoint.get('expected_status', DEFAULT_EXPECTED_STATUS)
+    durations = [call["duration_ms"] for call in calls]
+    median_ms = round(statistics.median(durations), 2) if durations else None
+    failures = []
+
+    errors = [call for call in calls if 'error' in call]
+    bad_status = [call["status_code"] for call in calls if 'error' not in call and call["status_code"] not in expected]
+    if errors:
+        failures.append(f"{len(errors)} error(s): {errors[0]['error'][:80]}")
+    if bad_status:
+        failures.append(f"unexpected status {sorted(set(bad_status))}")
+
+    budget = endpoint.get('budget_ms')
+    if budget is not None and median_ms is not None and median_ms > budget:
+        failures.append(f"median {median_ms:.0f}ms over budget {budget}ms")
+
+    if baseline is not None and median_ms is not None:
+        limit = max(baseline * (1 + tolerance), baseline + min_regression_ms)
+        if median_ms > limit:
+            failures.append(f"median {median_ms:.0f}ms regressed from baseline {baseline:.0f}ms")
+
+    return {
+        "path": endpoint['path'],
+        "calls": len(calls),
+        "status_codes": sorted({call.get("status_code") for call in calls if 'error' not in call}),
+        "median_ms": median_ms,
+        "max_ms": max(durations) if durations else None,
+        "budget_ms": budget,
+        "baseline_ms": baseline,
+        "passed": not failures,
+        "failures": failures
+    }
+
+
+def run_suite(base_url: str, endpoints: List[Dict[str, Any]], concurrency: int, repeat: int,
+              timeout: float) -> Dict[str, List[Dict[str, Any]]]:
+    """Call every endpoint `repeat` times (or its own repeat) across a thread pool"""
+    calls: Dict[str, List[Dict[str, Any]]] = {endpoint['name']: [] for endpoint in endpoints}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {}
+        for endpoint in endpoints:
+            for _ in range(endpoint.get('repeat', repeat)):
+                futures[executor.submit(call_endpoint, base_url, endpoint, timeout)] = endpoint['name']
+        for future in as_completed(futures):
+            calls[futures[future]].append(future.result())
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the endpoint catalogue with latency gates')
+    parser.add_argument('--config', default=str(DEFAULT_CONFIG), help=f'Suite config (default: {DEFAULT_CONFIG.name})')
+    parser.add_argument('--base-url', help='Worker URL (default: ENDPOINT_SUITE_URL or config base_url)')
+    parser.add_argument('--only', nargs='+', metavar='NAME', help='Run only these endpoints (includes disabled ones)')
+    parser.add_argument('--concurrency', type=int, help='Parallel requests (default: from config)')
+    parser.add_argument('--repeat', type=int, help='Calls per endpoint (default: from config)')
+    parser.add_argument('--history', help='Results history file (default: from config)')
+    parser.add_argument('--no-record', action='store_true', help="Don't append this run to the history")
+    parser.add_argument('--no-baseline', action='store_true', help='Only check absolute budgets')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    enable_from_args(args, "endpoint_suite")
+
+    config = load_config(Path(args.config))
+    base_url = (args.base_url or os.getenv('ENDPOINT_SUITE_URL') or config['base_url']).rstrip('/')
+    concurrency = args.concurrency or config.get('concurrency', 4)
+    repeat = args.repeat or config.get('repeat', 1)
+    history_path = Path(args.history or config.get('history_file', 'endpoint_history.jsonl'))
+
+    if args.only:
+        unknown = set(args.only) - {e['name'] for e in config['endpoints']}
+        if unknown:
+            print(f"❌ Unknown endpoint(s): {', '.join(sorted(unknown))}")
+            sys.exit(1)
+        endpoints = [e for e in config['endpoints'] if e['name'] in args.only]
+    else:
+        endpoints = [e for e in config['endpoints'] if e.get('enabled', True)]
+
+    history = load_history(history_path)
+    baseline = {} if args.no_baseline else baselines(history, base_url, config.get('baseline_runs', 5))
+
+    print(f"🚀 Endpoint suite against {base_url}")
+    print(f"Endpoints: {len(endpoints)}  Repeat: {repeat}  Concurrency: {concurrency}")
+    print(f"Baselines from {history_path}: {len(baseline)} endpoint(s)")
+    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    run_start = time.time()
+    with phase("run_suite"):
+        calls = run_suite(base_url, endpoints, concurrency, repeat, config.get('timeout', 30))
+    total_duration = round((time.time() - run_start) * 1000, 2)
+
+    results = {
+        endpoint['name']: evaluate(
+            endpoint, calls[endpoint['name']], baseline.get(endpoint['name']),
+            config.get('regression_tolerance', 0.5), config.get('regression_min_ms', 0)
+        )
+        for endpoint in endpoints
+    }
+
+    print(f"\n{'Endpoint':<28} {'Status':<10} {'Median':>8} {'Max':>8} {'Budget':>8} {'Baseline':>9}")
+    print('-' * 76)
+    for name, result in results.items():
+        icon = "✅" if result["passed"] else "❌"
+        statuses = ','.join(str(s) for s in result["status_codes"]) or 'ERR'
+        baseline_ms = f"{result['baseline_ms']:.0f}" if result['baseline_ms'] is not None else '-'
+        print(f"{icon} {name:<26} {statuses:<10} {result['median_ms'] or 0:>8.0f} {result['max_ms'] or 0:>8.0f} "
+              f"{result['budget_ms'] or '-':>8} {baseline_ms:>9}")
+
+    failed = {name: result for name, result in results.items() if not result["passed"]}
+
+    print(f"\n{'='*60}")
+    print(f"SUMMARY")
+    print(f"{'='*60}")
+    print(f"Total Duration: {total_duration}ms")
+    print(f"Passed: {len(results) - len(failed)}/{len(results)}")
+    if failed:
+        print(f"\n❌ Gate failures:")
+        for name, result in failed.items():
+            for failure in result["failures"]:
+                print(f"  {name}: {failure}")
+    else:
+        print(f"\n✅ All endpoints within budget")
+
+    if not args.no_record:
+        with open(history_path, 'a') as f:
+            f.write(json.dumps({
+                "run_at": datetime.utcnow().isoformat(),
+                "base_url": base_url,
+                "duration_ms": total_duration,
+                "passed": not failed,
+                "results": results
+            }) + "\n")
+        print(f"📝 Recorded run in {history_path}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+HYROX Export Job - Run the PostgreSQL export as a chunked job on the worker
+
+Submits one export job (POST /api/export-jobs), then keeps asking the worker
+to process the next chunk of events (POST /api/export-jobs/{id}/chunk) until
+none are left, printing progress after every chunk. Each chunk is committed to
+PostgreSQL on its own, so a slow or failing event only affects its chunk:
+failed events are retried up to 3 times and reported at the end, and a job
+interrupted half way can be picked up again with --resume.
+
+--parallel N runs N chunk requests at once; the worker hands out disjoint
+chunks, so more events simply means more chunks rather than a longer request.
+
+Usage:
+    python export_job.py [--worker-url URL] [--chunk-size N] [--parallel N]
+    python export_job.py --resume JOB_ID      # Continue an unfinished job
+    python export_job.py --status JOB_ID      # Print progress without processing
+"""
+
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+
+import requests
+
+DEFAULT_WORKER_URL = "http://localhost:8787"  # Default Wrangler dev server
+DEFAULT_CHUNK_SIZE = 5
+CHUNK_TIMEOUT = 300
+MAX_REQUEST_ERRORS = 5
+FINISHED = {"completed", "completed_with_errors"}
+
+
+class ExportJobClient:
+    def __init__(self, worker_url: str):
+        self.base = f"{worker_url.rstrip('/')}/api/export-jobs"
+
+    def submit(self, chunk_size: int) -> Dict[str, Any]:
+        response = requests.post(self.base, params={"chunkSize": chunk_size}, timeout=120)
+        response.raise_for_status()
+        return response.json()
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        response = requests.get(f"{self.base}/{job_id}", timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def process_chunk(self, job_id: str) -> Dict[str, Any]:
+        response = requests.post(f"{self.base}/{job_id}/chunk", timeout=CHUNK_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+
+def print_progress(status: Dict[str, Any], started: float):
+    total = status["totalEvents"]
+    finished = status["done"] + status["failed"]
+    pct = 100 * finished / total if total else 100.0
+    chunk = status.get("chunk")
+    chunk_note = f" | chunk: {chunk['exported']}/{chunk['claimed']} exported" if chunk else ""
+    if chunk and chunk.get("deferred"):
+        chunk_note += f", {chunk['deferred']} with 0 sold deferred to the end"
+    print(f"   📊 {finished}/{total} events ({pct:.0f}%) - {status['done']} exported, {status['failed']} failed, "
+          f"{status['pending']} pending, {status['running']} in flight - {time.time() - started:.0f}s{chunk_note}")
+
+
+def print_summary(status: Dict[str, Any]):
+    print(f"\n{'=' * 60}")
+    icon = "✅" if status["status"] == "completed" else "⚠️" if status["status"] in FINISHED else "⏸️"
+    print(f"{icon} Job {status['jobId']}: {status['status']}")
+    print(f"   Events exported: {status['done']}/{status['totalEvents']}")
+    print(f"   Ticket types exported: {status['ticketTypesExported']}")
+    if status["failures"]:
+        print(f"   Failed events ({len(status['failures'])}):")
+        for failure in status["failures"]:
+            print(f"      ❌ {failure['eventName']} ({failure['eventId']}, {failure['region']}) "
+                  f"after {failure['attempts']} attempt(s): {failure['error']}")
+
+
+def drive(client: ExportJobClient, job_id: str, parallel: int) -> Dict[str, Any]:
+    """Process chunks (parallel workers) until the job has nothing left to claim"""
+    started = time.time()
+    errors = 0
+
+    def worker():
+        nonlocal errors
+        while errors < MAX_REQUEST_ERRORS:
+            try:
+                status = client.process_chunk(job_id)
+            except requests.exceptions.RequestException as e:
+                errors += 1
+                print(f"   🔄 Chunk request failed ({errors}/{MAX_REQUEST_ERRORS}): {e}")
+                time.sleep(min(30, 2 ** errors))
+                continue
+            print_progress(status, started)
+            if status["status"] in FINISHED or status["chunk"]["claimed"] == 0:
+                return
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        for future in [pool.submit(worker) for _ in range(parallel)]:
+            future.result()
+    return client.status(job_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the chunked PostgreSQL export job')
+    parser.add_argument('--worker-url', default=DEFAULT_WORKER_URL, help=f'Worker base URL (default: {DEFAULT_WORKER_URL})')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Events per chunk, each committed separately (default: {DEFAULT_CHUNK_SIZE}, max 25)')
+    parser.add_argument('--parallel', type=int, default=1, help='Chunks to process at once (default: 1)')
+    parser.add_argument('--resume', metavar='JOB_ID', help='Continue processing an existing job')
+    parser.add_argument('--status', metavar='JOB_ID', help='Print job progress and exit')
+    args = parser.parse_args()
+
+    client = ExportJobClient(args.worker_url)
+    try:
+        if args.status:
+            status = client.status(args.status)
+            print_summary(status)
+            sys.exit(0 if status["status"] == "completed" else 1)
+
+        if args.resume:
+            job_id = args.resume
+            print(f"🔁 Resuming export job {job_id}")
+        else:
+            print(f"📤 Submitting export job to {args.worker_url} (chunks of {args.chunk_size})...")
+            job = client.submit(args.chunk_size)
+            job_id = job["jobId"]
+            print(f"   🆔 Job {job_id}: {job['totalEvents']} event(s) discovered")
+
+        status = drive(client, job_id, max(1, args.parallel))
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Worker request failed: {e}")
+        sys.exit(1)
+
+    print_summary(status)
+    if status["status"] not in FINISHED:
+        print(f"\n   Continue with: python export_job.py --worker-url {args.worker_url} --resume {job_id}")
+    sys.exit(0 if status["status"] == "completed" else 1)
+
+
+if __name__ == "__main__":
+    main()
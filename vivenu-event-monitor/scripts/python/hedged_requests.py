@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+HYROX Hedged Requests - Duplicate slow GETs to cut tail latency
+
+A few /tickets pages take seconds while the rest come back quickly, and a
+paginated fetch waits on every page in turn. With hedging, a page that
+hasn't answered after the --hedge-percentile latency seen so far in this run
+(p95 by default, learned from a rolling window of page latencies) gets a
+duplicate request, and whichever answers first is used. The other response
+is closed when it arrives.
+
+Latency is timed over the whole page: with stream=True requests.get returns
+as soon as the headers arrive, so the body is read inside the race too and a
+page whose download stalls is hedged like one that is slow to answer. The
+winning page is therefore buffered before the caller decodes it.
+
+Load stays bounded: hedges are only sent once enough latencies have been
+seen, never more than --hedge-budget of all requests (default 5%), and each
+one takes a token from the shared rate limiter like any other request.
+
+Stats compare what the fetch saw (first response) with what the original
+requests alone would have given (their latency, measured even when the hedge
+won), for p50/p99 page latency and time saved on the fetch.
+
+Used by historical_sync.py --hedge and availability_engine.py --hedge.
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable
+
+import requests
+
+DEFAULT_PERCENTILE = 95
+DEFAULT_BUDGET = 0.05
+MIN_SAMPLES = 10
+WINDOW = 200
+MIN_HEDGE_DELAY = 0.05
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def close_response(future):
+    """Release the connection of a response that lost the race"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class HedgedGetter:
+    """requests.get with one hedged duplicate after a learned latency percentile"""
+
+    def __init__(self, hedge_percentile: float = DEFAULT_PERCENTILE, budget: float = DEFAULT_BUDGET,
+                 acquire: Optional[Callable[[], Any]] = None, max_workers: int = 8):
+        self.hedge_percentile = hedge_percentile
+        self.budget = budget
+        self.acquire = acquire
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.lock = threading.Lock()
+        self.window: deque = deque(maxlen=WINDOW)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.observed: List[float] = []
+        self.primary: List[float] = []
+        self.primary_pending = 0
+        self.saved = 0.0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        with self.lock:
+            if len(self.window) < MIN_SAMPLES:
+                return None
+            return max(MIN_HEDGE_DELAY, percentile(list(self.window), self.hedge_percentile))
+
+    def _can_hedge(self) -> bool:
+        with self.lock:
+            return self.hedges + 1 <= self.budget * self.requests
+
+    def _timed_get(self, url: str, kwargs: Dict[str, Any], primary: bool):
+        started = time.perf_counter()
+        try:
+            response = requests.get(url, **kwargs)
+            if kwargs.get("stream"):
+                try:
+                    response.content  # Race the body download, not just time-to-first-byte
+                except Exception:
+                    response.close()
+                    raise
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.window.append(elapsed)
+                if primary:
+                    self.primary.append(elapsed)
+                    self.primary_pending -= 1
+
+    def get(self, url: str, acquire: Optional[Callable[[], Any]] = None, **kwargs) -> requests.Response:
+        """Like requests.get. The caller has already taken a rate-limit token for the first
+        request; acquire (default: the one given to the constructor) is called before a hedge."""
+        acquire = acquire or self.acquire
+        started = time.perf_counter()
+        with self.lock:
+            self.requests += 1
+            self.primary_pending += 1
+        first = self.executor.submit(self._timed_get, url, kwargs, True)
+        futures = [first]
+
+        delay = self.hedge_delay()
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if not done and self._can_hedge():
+                if acquire:
+                    acquire()
+                with self.lock:
+                    self.hedges += 1
+                futures.append(self.executor.submit(self._timed_get, url, kwargs, False))
+
+        pending = set(futures)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in futures if f in done and f.exception() is None), None)
+            if winner is not None or not pending:
+                break
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.observed.append(elapsed)
+            if winner is not None and winner is not first:
+                self.hedge_wins += 1
+                first.add_done_callback(lambda f, won_at=time.perf_counter(): self._record_saving(won_at))
+        for future in futures:
+            if future is not winner:
+                future.add_done_callback(close_response)
+        if winner is None:
+            raise next(f for f in futures if f.done()).exception()
+        return winner.result()
+
+    def _record_saving(self, won_at: float):
+        with self.lock:
+            self.saved += time.perf_counter() - won_at
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": round(self.hedges / self.requests, 3) if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "p50_s": round(percentile(self.observed, 50), 3),
+                "p99_s": round(percentile(self.observed, 99), 3),
+                "unhedged_p50_s": round(percentile(self.primary, 50), 3),
+                "unhedged_p99_s": round(percentile(self.primary, 99), 3),
+                "unhedged_still_running": self.primary_pending,
+                "time_saved_s": round(self.saved, 2),
+                "hedge_after_s": round(percentile(list(self.window), self.hedge_percentile), 3) if self.window else None,
+            }
+
+    def report(self) -> str:
+        s = self.summary()
+        line = (f"{s['requests']} page(s), {s['hedges']} hedged ({100 * s['hedge_rate']:.1f}%, budget "
+                f"{100 * self.budget:.0f}%), {s['hedge_wins']} won; p99 {s['unhedged_p99_s']:.2f}s → {s['p99_s']:.2f}s, "
+                f"p50 {s['unhedged_p50_s']:.2f}s → {s['p50_s']:.2f}s, ~{s['time_saved_s']:.1f}s fetch time saved")
+        if s["unhedged_still_running"]:
+            line += f" ({s['unhedged_still_running']} slow original(s) still running, not yet counted)"
+        return line
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def add_hedge_arguments(parser):
+    parser.add_argument('--hedge', action='store_true',
+                        help='Send a duplicate request for ticket pages slower than the learned latency percentile')
+    parser.add_argument('--hedge-percentile', type=float, default=DEFAULT_PERCENTILE,
+                        help=f'With --hedge: hedge after this latency percentile (default: {DEFAULT_PERCENTILE})')
+    parser.add_argument('--hedge-budget', type=float, default=DEFAULT_BUDGET,
+                        help=f'With --hedge: max hedges as a fraction of requests (default: {DEFAULT_BUDGET})')
+
+
+def from_args(args, acquire: Optional[Callable[[], Any]] = None, max_workers: int = 8) -> Optional[HedgedGetter]:
+    if not getattr(args, 'hedge', False):
+        return None
+    return HedgedGetter(args.hedge_percentile, args.hedge_budget, acquire=acquire, max_workers=max_workers)
@@ -12,6 +12,17 @@ Usage:
 Options:
     --batch-size N  Process N tickets per batch (default: 50)
     --resume        Continue from last processed ticket
+    --refresh       Refetch tickets from Vivenu instead of the local ticket store
+    --project       Send only the ticket fields in webhook_fields.json
+    --gzip          Gzip webhook bodies (HMAC still over the uncompressed JSON)
+    --plan          Estimate API calls, webhook posts and duration first (sync_planner.py)
+    --page-size N   Tickets per /tickets call (default: 1000, decoded as streamed)
+    --hedge         Duplicate ticket page requests slower than the run's p95 (see hedged_requests.py)
+    --profile [DIR] Time fetch/filter/send/save phases (see phase_profiler.py)
+
+The filtered, sorted ticket set is kept in a memory-mapped ticket store
+(see ticket_store.py) so --resume and --test-batch read only the slice they
+need instead of refetching the whole event.
 """
 
 import os
@@ -24,17 +35,41 @@ import hashlib
 import argparse
 import requests
 import subprocess
+from itertools import islice
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union, Iterator
 from pathlib import Path
 from dotenv import load_dotenv
 
+from ticket_store import TicketStore
+from ticket_index import TicketIndex
+from ticket_merkle import TicketMerkleTree, LeafBuckets, verify_tree
+from dead_letters import DeadLetterQueue, classify_failure
+from rate_limiter import shared_limiter
+from metadata_cache import get_event
+from webhook_payload import WebhookPayloads, env_flag
+from phase_profiler import phase, profiled, add_profile_arguments, enable_from_args
+from hedged_requests import HedgedGetter, add_hedge_arguments, from_args as hedger_from_args
+from streaming_json import RowStream, CHUNK_SIZE
+
 load_dotenv()
 
+# Webhook pacing shared by every process posting to the worker:
+# one request per 1.8 seconds = ~33 tickets/minute = ~2,000 tickets/hour
+WEBHOOK_RATE_LIMIT_RPS = 1 / 1.8
+
+# /tickets page size. Pages are decoded incrementally (streaming_json.py), so
+# large pages no longer mean a memory spike per call; see stream_benchmark.py
+TICKET_PAGE_SIZE = 1000
+
+# Tickets hashed, indexed and filtered together while a page is still streaming in
+PIPELINE_BATCH = 200
+
 class HistoricalSync:
-    def __init__(self, region: str, safety_mode: bool = True):
+    def __init__(self, region: str, safety_mode: bool = True, index_tickets: bool = True):
         self.region = region.upper()
         self.safety_mode = safety_mode
+        self.index_tickets = index_tickets
         self.api_key = os.getenv(f"{self.region}_API")
         
         if not self.api_key:
@@ -51,6 +86,16 @@ class HistoricalSync:
             "Content-Type": "application/json"
         }
         
+        # Token buckets shared with every other process using this API key
+        self.rate_limiter = shared_limiter()
+        self.webhook_rate = WEBHOOK_RATE_LIMIT_RPS
+        
+        # Tickets per /tickets call (--page-size); shrunk automatically on repeated 503s
+        self.page_size = TICKET_PAGE_SIZE
+        
+        # Optional hedged GETs for slow ticket pages (hedged_requests.py); set by --hedge
+        self.hedger: Optional[HedgedGetter] = None
+        
         # Webhook endpoint - production endpoint
         self.webhook_url = "https://vivenu-filter.high-impact-athletes.workers.dev/ticket-created"
         
@@ -59,9 +104,20 @@ class HistoricalSync:
         if not self.vivenu_secret:
             print("⚠️ WARNING: VIVENU_SECRET not configured in .env - webhooks will fail signature validation")
         
+        # Optional field projection / gzip bodies (webhook_payload.py); off unless enabled
+        self.payloads = WebhookPayloads(project=env_flag("WEBHOOK_PROJECTION"), compress=env_flag("WEBHOOK_GZIP"))
+        
         # Progress tracking
         self.progress_file = Path(f"historical_sync_progress_{self.region}.json")
         self.progress = self.load_progress()
+        
+        # Failed webhook sends live in the dead-letter queue, not the progress file
+        self.dead_letters = DeadLetterQueue()
+        if self.progress.get("errors"):
+            moved = self.dead_letters.record_legacy(self.region, self.progress["errors"])
+            self.progress["errors"] = []
+            self.save_progress()
+            print(f"📮 Moved {moved} old progress errors to the dead-letter queue")
     
     def get_event_id_for_region(self, region: str) -> str:
         """Get event ID from environment for region"""
@@ -101,6 +157,7 @@ class HistoricalSync:
             "event_progress": {}
         }
     
+    @profiled("save_progress")
     def save_progress(self):
         """Save progress to file"""
         self.progress["last_run"] = datetime.utcnow().isoformat()
@@ -108,28 +165,35 @@ class HistoricalSync:
             json.dump(self.progress, f, indent=2)
     
     def get_event_data(self, event_id: str) -> Optional[Dict[str, Any]]:
-        """Fetch event data from Vivenu API"""
-        url = f"{self.base_url}/events/{event_id}"
+        """Fetch event data from Vivenu API (memoized, see metadata_cache.py)"""
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+            return get_event(self.base_url, event_id, self.api_key)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching event {event_id}: {e}")
             return None
     
-    def get_tickets_for_event(self, event_id: str) -> List[Dict[str, Any]]:
-        """Fetch all PURCHASED tickets for an event with robust 503 error handling"""
-        all_tickets = []
+    @profiled("fetch_tickets")
+    def get_tickets_for_event(self, event_id: str, extra_params: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Fetch all PURCHASED tickets for an event as a list (see iter_tickets_for_event)"""
+        return list(self.iter_tickets_for_event(event_id, extra_params))
+    
+    def iter_tickets_for_event(self, event_id: str, extra_params: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield all PURCHASED tickets for an event as they are decoded, with robust 503 error handling.
+        
+        Each ticket is handed on as soon as its JSON is complete, so the caller
+        never holds more than it chooses to keep. If a body is cut off part way,
+        the page is retried from the first ticket not yet yielded.
+        """
+        fetched = 0
         skip = 0
-        initial_batch_size = 100
-        batch_size = initial_batch_size
+        batch_size = self.page_size
         min_batch_size = 10
         call_count = 0
         max_retries = 3
         base_delay = 1
         max_delay = 30
         expected_total = None
+        rate_limit_wait = 0.0
         
         print(f"📥 Fetching all tickets for event {event_id} with robust 503 handling...")
         
@@ -147,17 +211,25 @@ class HistoricalSync:
             params = {
                 "event": event_id,
                 "top": batch_size,
-                "skip": skip
+                "skip": skip,
+                **(extra_params or {})
             }
             
             print(f"   📞 API Call #{call_count}: skip={skip}, batch_size={batch_size}")
             
             # Retry logic for 503 errors
             success = False
+            page_count = 0  # Tickets of this page already yielded
             for attempt in range(max_retries):
                 try:
+                    # A retry resumes after the tickets already handed on
+                    params["skip"] = skip + page_count
+                    with phase("rate_limit_wait"):
+                        rate_limit_wait += self.rate_limiter.acquire(self.api_key, url)
                     start_time = time.time()
-                    response = requests.get(url, headers=self.headers, params=params, timeout=15)
+                    with phase("http"):
+                        get = self.hedger.get if self.hedger else requests.get
+                        response = get(url, headers=self.headers, params=params, timeout=15, stream=True)
                     
                     if response.status_code == 503:
                         delay = exponential_backoff(attempt)
@@ -177,10 +249,14 @@ class HistoricalSync:
                             break
                     
                     response.raise_for_status()
-                    data = response.json()
+                    # Tickets are decoded and handed on as the body arrives instead of after buffering the whole page
+                    rows = RowStream(response.iter_content(CHUNK_SIZE))
+                    for ticket in rows:
+                        page_count += 1
+                        fetched += 1
+                        yield ticket
                     
-                    tickets = data.get("rows", [])
-                    total = data.get("total", 0)
+                    total = rows.meta.get("total", 0)
                     elapsed = time.time() - start_time
                     
                     # Set expected total on first successful call
@@ -188,19 +264,17 @@ class HistoricalSync:
                         expected_total = total
                         print(f"   🎯 Expected total tickets: {expected_total:,}")
                     
-                    all_tickets.extend(tickets)
-                    
                     # Progress logging
-                    progress_pct = (len(all_tickets) / expected_total * 100) if expected_total > 0 else 0
-                    print(f"   ✅ Got {len(tickets)} tickets in {elapsed:.1f}s")
-                    print(f"   📊 Progress: {len(all_tickets):,}/{expected_total:,} ({progress_pct:.1f}%)")
+                    progress_pct = (fetched / expected_total * 100) if expected_total > 0 else 0
+                    print(f"   ✅ Got {page_count} tickets in {elapsed:.1f}s")
+                    print(f"   📊 Progress: {fetched:,}/{expected_total:,} ({progress_pct:.1f}%)")
                     
                     success = True
                     break
                     
-                except requests.exceptions.RequestException as e:
+                except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
                     delay = exponential_backoff(attempt)
-                    print(f"   🔄 Request error (attempt {attempt + 1}/{max_retries}): {str(e)}")
+                    print(f"   🔄 Request error (attempt {attempt + 1}/{max_retries}, {page_count} tickets of this page kept): {str(e)}")
                     if attempt < max_retries - 1:
                         print(f"   ⏰ Waiting {delay:.1f}s before retry...")
                         time.sleep(delay)
@@ -210,46 +284,59 @@ class HistoricalSync:
                         break
             
             if not success:
-                print(f"   ❌ Batch failed at skip={skip}")
-                print(f"   📊 Successfully fetched {len(all_tickets)} tickets before failure")
+                print(f"   ❌ Batch failed at skip={skip + page_count}")
+                print(f"   📊 Successfully fetched {fetched} tickets before failure")
                 break
             
             # Check completion conditions
-            if len(tickets) == 0:
+            if page_count == 0:
                 print(f"   🏁 No more tickets returned - stopping")
                 break
-            elif len(all_tickets) >= expected_total:
-                print(f"   🏁 Got all expected tickets ({len(all_tickets):,}) - stopping")
+            elif fetched >= expected_total:
+                print(f"   🏁 Got all expected tickets ({fetched:,}) - stopping")
                 break
             
-            skip += len(tickets)
-            
-            # Small delay between requests to be nice to the API
-            time.sleep(0.2)
+            skip += page_count
         
         # Validate completeness
-        completion_rate = (len(all_tickets) / expected_total * 100) if expected_total else 0
+        completion_rate = (fetched / expected_total * 100) if expected_total else 0
         
         print(f"\n📥 FETCH COMPLETE!")
-        print(f"   Total tickets fetched: {len(all_tickets):,}")
-        print(f"   Expected tickets: {expected_total:,}")
+        print(f"   Total tickets fetched: {fetched:,}")
+        print(f"   Expected tickets: {expected_total or 0:,}")
         print(f"   Completion rate: {completion_rate:.1f}%")
         print(f"   API calls made: {call_count}")
+        print(f"   Rate limiter wait: {rate_limit_wait:.1f}s")
+        if self.hedger:
+            print(f"   Hedging: {self.hedger.report()}")
         
         if completion_rate < 95:
             print(f"   ⚠️  WARNING: Only got {completion_rate:.1f}% of expected tickets!")
-        
-        return all_tickets
     
-    def generate_hmac_signature(self, payload: str) -> str:
+    def count_tickets(self, event_id: str, extra_params: Optional[Dict[str, str]] = None) -> Optional[int]:
+        """Cheap count-only request: the `total` of a top=1 page, or None on failure"""
+        params = {"event": event_id, "top": 1, **(extra_params or {})}
+        try:
+            self.rate_limiter.acquire(self.api_key, f"{self.base_url}/tickets")
+            response = requests.get(f"{self.base_url}/tickets", headers=self.headers, params=params, timeout=15)
+            response.raise_for_status()
+            return response.json().get("total", 0)
+        except requests.exceptions.RequestException as e:
+            print(f"   ❌ Count request failed: {e}")
+            return None
+    
+    def generate_hmac_signature(self, payload: Union[str, bytes]) -> str:
         """Generate HMAC-SHA256 signature for webhook payload"""
         if not self.vivenu_secret:
             raise ValueError("VIVENU_SECRET not configured in .env")
         
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        
         # Generate HMAC-SHA256 in hex format (matching Vivenu's format)
         signature = hmac.new(
             self.vivenu_secret.encode('utf-8'),
-            payload.encode('utf-8'),
+            payload,
             hashlib.sha256
         ).hexdigest()
         
@@ -274,49 +361,124 @@ class HistoricalSync:
         
         return webhook_data
     
+    def build_raw_webhook_payload(self, raw_ticket: bytes, seller_id: str = "") -> bytes:
+        """Build the webhook payload around raw ticket JSON bytes from the ticket store.
+        
+        Produces exactly the bytes json.dumps(transform_to_webhook(ticket)) would,
+        without decoding and re-encoding the ticket itself.
+        """
+        webhook_id = str(uuid.uuid4())
+        envelope = json.dumps({
+            "id": webhook_id,
+            "sellerId": seller_id,
+            "webhookId": f"historical-sync-{webhook_id[:8]}",
+            "type": "ticket.created",
+            "mode": "prod",
+        }, separators=(',', ':'))
+        return envelope[:-1].encode('utf-8') + b',"data":{"ticket":' + raw_ticket + b'}}'
+    
+    def build_webhook_payload(self, webhook_data: Dict[str, Any]) -> Tuple[bytes, int]:
+        """JSON bytes to sign and send (projected when enabled) and the full payload size"""
+        payload = json.dumps(webhook_data, separators=(',', ':')).encode('utf-8')
+        full_size = len(payload)
+        if self.payloads.fields is not None:
+            projected = {**webhook_data, "data": {"ticket": self.payloads.project(webhook_data['data']['ticket'])}}
+            payload = json.dumps(projected, separators=(',', ':')).encode('utf-8')
+        return payload, full_size
+    
+    @profiled("send_webhook")
     def send_webhook(self, webhook_data: Dict[str, Any]) -> bool:
         """Send webhook to endpoint with HMAC signature"""
+        with phase("build_payload"):
+            payload, full_size = self.build_webhook_payload(webhook_data)
+        return self.post_webhook_payload(payload, webhook_data['data']['ticket'], full_size)
+    
+    @profiled("send_webhook")
+    def send_raw_webhook(self, raw_ticket: bytes, ticket: Dict[str, Any]) -> bool:
+        """Send a ticket straight from its stored line bytes"""
+        with phase("build_payload"):
+            projected = self.payloads.project_raw(raw_ticket)
+            payload = self.build_raw_webhook_payload(projected, ticket.get("sellerId", ""))
+        return self.post_webhook_payload(payload, ticket, len(payload) - len(projected) + len(raw_ticket))
+    
+    def deliver_webhook(self, payload: bytes, quiet: bool = False,
+                        full_size: Optional[int] = None) -> Tuple[bool, Optional[int], str, Optional[str]]:
+        """POST a serialized webhook payload with HMAC signature.
+        
+        The signature covers the uncompressed JSON even when the body is sent
+        gzipped. full_size is the unprojected payload size, for the byte report.
+        Returns (success, status code, response text or error, error class).
+        """
         try:
-            # Convert webhook data to JSON string for signature
-            payload = json.dumps(webhook_data, separators=(',', ':'))
-            
             # Generate HMAC signature
             headers = {"Content-Type": "application/json"}
             if self.vivenu_secret:
-                signature = self.generate_hmac_signature(payload)
+                with phase("hmac"):
+                    signature = self.generate_hmac_signature(payload)
                 headers["x-vivenu-signature"] = signature
-                print(f"🔑 Generated HMAC signature: {signature[:16]}...")
+                if not quiet:
+                    print(f"🔑 Generated HMAC signature: {signature[:16]}...")
+            with phase("encode_body"):
+                body, encoding_headers = self.payloads.encode(payload, full_size)
+            headers.update(encoding_headers)
             
-            print(f"Sending to: {self.webhook_url}")
-            response = requests.post(
-                self.webhook_url,
-                data=payload,  # Use data instead of json to send exact payload we signed
-                headers=headers,
-                timeout=30
-            )
+            if not quiet:
+                print(f"Sending to: {self.webhook_url}")
+            with phase("rate_limit_wait"):
+                self.rate_limiter.acquire(self.vivenu_secret, self.webhook_url, rate=self.webhook_rate, burst=1)
+            with phase("http_post"):
+                response = requests.post(
+                    self.webhook_url,
+                    data=body,  # Use data instead of json to send exact payload we signed
+                    headers=headers,
+                    timeout=30
+                )
             
             if response.status_code == 200:
-                ticket_info = webhook_data['data']['ticket']
-                print(f"✓ Sent ticket: {ticket_info.get('ticketName', 'Unknown')} - {ticket_info.get('name', 'Unknown')}")
-                print(f"Response: {response.text}")
-                return True
-            else:
-                print(f"✗ Failed to send ticket: {response.status_code} - {response.text}")
-                self.progress["errors"].append({
-                    "ticket_id": webhook_data['data']['ticket']['_id'],
-                    "error": f"HTTP {response.status_code}: {response.text}",
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-                return False
+                return True, 200, response.text, None
+            return False, response.status_code, response.text, classify_failure(response.status_code)
                 
         except Exception as e:
-            print(f"✗ Error sending webhook: {e}")
-            self.progress["errors"].append({
-                "ticket_id": webhook_data['data']['ticket']['_id'],
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            })
-            return False
+            return False, None, str(e), classify_failure(None, e)
+    
+    def post_webhook_payload(self, payload: bytes, ticket_info: Dict[str, Any], full_size: Optional[int] = None) -> bool:
+        """Send a webhook payload, recording failures in the dead-letter queue"""
+        ok, status_code, detail, error_class = self.deliver_webhook(payload, full_size=full_size)
+        
+        if ok:
+            print(f"✓ Sent ticket: {ticket_info.get('ticketName', 'Unknown')} - {ticket_info.get('name', 'Unknown')}")
+            print(f"Response: {detail}")
+            return True
+        
+        if status_code is not None:
+            print(f"✗ Failed to send ticket: {status_code} - {detail}")
+        else:
+            print(f"✗ Error sending webhook: {detail}")
+        self.dead_letters.record_failure(self.region, ticket_info, error_class, status_code, detail)
+        return False
+    
+    def update_event_status(self, event_id: str):
+        """Mark an event completed once every ticket has been processed"""
+        event_progress = self.progress["event_progress"].get(event_id)
+        if event_progress is None:
+            return
+        if event_progress["processed_tickets"] >= event_progress["total_tickets"]:
+            event_progress["status"] = "completed"
+            if event_id not in self.progress["events_processed"]:
+                self.progress["events_processed"].append(event_id)
+        else:
+            event_progress["status"] = "in_progress"
+    
+    def mark_ticket_sent(self, event_id: str, ticket_id: str):
+        """Record a successful send in the progress counters (caller saves)"""
+        event_progress = self.progress["event_progress"].get(event_id)
+        if event_progress is not None:
+            if ticket_id in event_progress["sent_ticket_ids"]:
+                return
+            event_progress["sent_ticket_ids"].append(ticket_id)
+            event_progress["processed_tickets"] += 1
+        self.progress["tickets_sent"] += 1
+        self.dead_letters.remove(self.region, ticket_id)
     
     def analyze_ticket_types(self, tickets: List[Dict[str, Any]]) -> Dict[str, int]:
         """Analyze ticket types and return counts"""
@@ -361,7 +523,184 @@ class HistoricalSync:
         
         return team_tickets
     
-    def sync_event(self, event_id: str, batch_size: int = 50, resume: bool = False, dry_run: bool = False, quiet: bool = False, validate: bool = False, test_batch: int = None):
+    def rejection_reason(self, ticket: Dict[str, Any]) -> Optional[str]:
+        """Why a ticket would not be sent, or None if it passes the sync filters"""
+        ticket_name = ticket.get('ticketName', ticket.get('name', ''))
+        status = ticket.get('status', '')
+        
+        # Check status filter - only VALID and DETAILSREQUIRED
+        if status not in ['VALID', 'DETAILSREQUIRED']:
+            return f"status {status or 'missing'}"
+        
+        # Check charity filter - must contain CHARITY
+        if 'CHARITY' not in ticket_name.upper():
+            return "not a charity ticket"
+        
+        return None
+    
+    @profiled("fetch_filtered_tickets")
+    def fetch_filtered_tickets(self, event_id: str, quiet: bool = False) -> List[Dict[str, Any]]:
+        """Fetch tickets for an event and return the charity tickets, oldest first.
+        
+        Tickets are hashed, indexed and filtered in small batches as they are
+        decoded, so only the charity tickets (and per-ticket fingerprints for
+        the hash tree) are held, not the whole event.
+        """
+        # Note: We don't need to fetch event data separately for purchased tickets
+        # The tickets already contain all necessary information
+        print(f"Fetching purchased tickets for event {event_id}...")
+        
+        fetched_at = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+        leaves = LeafBuckets()
+        filtered_tickets = []
+        total_tickets = 0
+        indexed = 0
+        status_rejected = 0
+        charity_rejected = 0
+        
+        index = TicketIndex() if self.index_tickets else None
+        try:
+            stream = self.iter_tickets_for_event(event_id)
+            while True:
+                batch = list(islice(stream, PIPELINE_BATCH))
+                if not batch:
+                    break
+                total_tickets += len(batch)
+                
+                # Hash tree over all tickets so --verify can detect changes cheaply later
+                with phase("merkle_tree"):
+                    for ticket in batch:
+                        leaves.add(ticket)
+                
+                # Index every fetched ticket locally for support lookups (see ticket_index.py)
+                if index:
+                    with phase("index_upsert"):
+                        indexed += index.upsert_tickets(batch, event_id, self.region,
+                                                        rejection_reason=self.rejection_reason)
+                
+                with phase("filter"):
+                    for ticket in batch:
+                        ticket_name = ticket.get('ticketName', ticket.get('name', ''))
+                        reason = self.rejection_reason(ticket)
+                    
+                        if reason is None:
+                            filtered_tickets.append(ticket)
+                        elif reason.startswith('status'):
+                            status_rejected += 1
+                            if not quiet:
+                                print(f"  ⚠️ Skipping {ticket_name} - Status: {ticket.get('status', '')}")
+                        else:
+                            charity_rejected += 1
+                            if not quiet:
+                                print(f"  ⚠️ Skipping {ticket_name} - Not a charity ticket")
+        finally:
+            if index:
+                index.close()
+        
+        print(f"Found {total_tickets} total tickets")
+        if not total_tickets:
+            print("No tickets found for this event")
+            return []
+        
+        with phase("merkle_tree"):
+            tree = leaves.tree(event_id, built_at=fetched_at)
+            tree.save(TicketMerkleTree.path_for(self.region, event_id))
+        print(f"🌳 Saved ticket hash tree ({len(tree.leaves)} day buckets, root {tree.root['hash'][:12]})")
+        if index:
+            print(f"🗂️  Indexed {indexed:,} tickets in {index.db_path}")
+        
+        print(f"\nFiltering results:")
+        print(f"  - Total tickets: {total_tickets}")
+        print(f"  - Rejected (wrong status): {status_rejected}")
+        print(f"  - Rejected (not charity): {charity_rejected}")
+        print(f"  - ✅ Tickets to send: {len(filtered_tickets)}")
+        
+        if not filtered_tickets:
+            print("\nNo tickets passed the filters!")
+            return []
+        
+        # Sort tickets chronologically (oldest first)
+        with phase("sort"):
+            filtered_tickets.sort(key=lambda t: t.get('createdAt', ''))
+        return filtered_tickets
+    
+    @profiled("load_tickets")
+    def load_sorted_tickets(self, event_id: str, quiet: bool = False, use_store: bool = False) -> Union[TicketStore, List[Dict[str, Any]]]:
+        """Return the sorted charity ticket set, from the local ticket store when allowed.
+        
+        A fresh fetch always rewrites the store so later --resume/--test-batch
+        runs can read just their slice from it.
+        """
+        store_path = TicketStore.path_for(self.region, event_id)
+        if use_store and TicketStore.exists(store_path):
+            try:
+                store = TicketStore(store_path)
+            except ValueError as e:
+                print(f"⚠️  {e}")
+                print("   Refetching tickets from Vivenu instead")
+            else:
+                print(f"📦 Using local ticket store {store_path} ({len(store):,} sorted tickets, written {store.meta.get('written_at', 'unknown')})")
+                print("   Use --refresh to refetch tickets from Vivenu")
+                return store
+        
+        tickets = self.fetch_filtered_tickets(event_id, quiet=quiet)
+        if not tickets:
+            return []
+        
+        with phase("store_write"):
+            store = TicketStore.write(store_path, tickets, meta={"region": self.region, "event_id": event_id})
+        print(f"📦 Wrote {len(store):,} sorted tickets to local ticket store {store_path}")
+        return store
+    
+    def verify_event(self, event_id: str) -> bool:
+        """Check whether an event changed since its hash tree was built. Returns True if unchanged."""
+        print(f"\n{'='*60}")
+        print(f"🌳 VERIFY MODE - comparing hash tree with Vivenu")
+        print(f"Event: {event_id}")
+        print(f"{'='*60}\n")
+        
+        tree_path = TicketMerkleTree.path_for(self.region, event_id)
+        if not tree_path.exists():
+            print(f"❌ No hash tree at {tree_path}")
+            print(f"Run 'python historical_sync.py {self.region} {event_id} --dry-run' to build it")
+            return False
+        
+        tree = TicketMerkleTree.load(tree_path)
+        old_root = tree.root["hash"] if tree.root else None
+        print(f"Tree built at: {tree.built_at}")
+        print(f"Tickets: {tree.root['count'] if tree.root else 0:,} in {len(tree.leaves)} day buckets\n")
+        
+        verified_at = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+        stats = verify_tree(
+            tree,
+            count_tickets=lambda params: self.count_tickets(event_id, params),
+            fetch_tickets=lambda params: self.get_tickets_for_event(event_id, params),
+            verified_at=verified_at
+        )
+        
+        if stats["failed"]:
+            print(f"❌ Verification aborted after {stats['probes']} requests: {stats['error']}")
+            return False
+        
+        print(f"\n📊 Probe requests: {stats['probes']} ({stats['branches_checked']} tree nodes checked)")
+        print(f"📥 Buckets refetched: {stats['leaves_refetched']}")
+        
+        if not stats["changed_leaves"]:
+            # Tree and ticket store still describe the same tickets, so only built_at moves on
+            tree.save(tree_path)
+            print("✅ Event unchanged since the tree was built")
+            return True
+        
+        print(f"⚠️  {len(stats['changed_leaves'])} bucket(s) changed:")
+        for leaf in stats["changed_leaves"]:
+            print(f"  - {leaf['start'][:10]}: {leaf['old_count']} → {leaf['new_count']} tickets")
+        print(f"\nRoot: {old_root[:12] if old_root else None} → {tree.root['hash'][:12]}")
+        # The stored tree is left as it was: it is rewritten with the ticket store on the next refetch
+        print(f"Run 'python historical_sync.py {self.region} {event_id} --refresh --dry-run' to refetch the event")
+        return False
+    
+    @profiled("sync_event")
+    def sync_event(self, event_id: str, batch_size: int = 50, resume: bool = False, dry_run: bool = False, quiet: bool = False, validate: bool = False, test_batch: int = None, refresh: bool = False):
         """Sync all tickets from a single event with batch processing"""
         print(f"\n{'='*60}")
         if dry_run:
@@ -391,58 +730,11 @@ class HistoricalSync:
             print(f"Event {event_id} already fully processed. Use --resume to reprocess.")
             return
         
-        # Note: We don't need to fetch event data separately for purchased tickets
-        # The tickets already contain all necessary information
-        print(f"Fetching purchased tickets for event {event_id}...")
-        
-        # Get tickets
-        all_tickets = self.get_tickets_for_event(event_id)
-        print(f"Found {len(all_tickets)} total tickets")
-        
-        if not all_tickets:
-            print("No tickets found for this event")
-            return
-        
-        # Filter tickets
-        filtered_tickets = []
-        status_rejected = 0
-        charity_rejected = 0
-        
-        for ticket in all_tickets:
-            ticket_name = ticket.get('ticketName', ticket.get('name', ''))
-            status = ticket.get('status', '')
-            
-            # Check status filter - only VALID and DETAILSREQUIRED
-            if status not in ['VALID', 'DETAILSREQUIRED']:
-                status_rejected += 1
-                if not quiet:
-                    print(f"  ⚠️ Skipping {ticket_name} - Status: {status}")
-                continue
-                
-            # Check charity filter - must contain CHARITY
-            if 'CHARITY' not in ticket_name.upper():
-                charity_rejected += 1
-                if not quiet:
-                    print(f"  ⚠️ Skipping {ticket_name} - Not a charity ticket")
-                continue
-                
-            filtered_tickets.append(ticket)
-        
-        print(f"\nFiltering results:")
-        print(f"  - Total tickets: {len(all_tickets)}")
-        print(f"  - Rejected (wrong status): {status_rejected}")
-        print(f"  - Rejected (not charity): {charity_rejected}")
-        print(f"  - ✅ Tickets to send: {len(filtered_tickets)}")
-        
-        if not filtered_tickets:
-            print("\nNo tickets passed the filters!")
+        tickets = self.load_sorted_tickets(event_id, quiet=quiet,
+                                           use_store=(resume or test_batch is not None) and not refresh)
+        if not tickets:
             return
         
-        tickets = filtered_tickets
-        
-        # Sort tickets chronologically (oldest first)
-        tickets.sort(key=lambda t: t.get('createdAt', ''))
-        
         # Apply test batch with smart team handling
         if test_batch is not None:
             print(f"\n🧪 TEST BATCH MODE: Limiting to {test_batch} tickets with smart team handling")
@@ -597,35 +889,28 @@ class HistoricalSync:
             
             print(f"[{i+1}/{len(tickets)}] Processing: {ticket_name} - {customer_name}")
             
-            # Transform to webhook format
-            webhook_data = self.transform_to_webhook(ticket)
+            # Forward the stored line bytes as-is when reading from the ticket store,
+            # otherwise transform to webhook format
+            if isinstance(tickets, TicketStore):
+                sent = self.send_raw_webhook(tickets.raw_line(i), ticket)
+            else:
+                sent = self.send_webhook(self.transform_to_webhook(ticket))
             
-            # Send webhook
-            if self.send_webhook(webhook_data):
+            if sent:
                 batch_success_count += 1
                 success_count += 1
-                self.progress["tickets_sent"] += 1
-                event_progress["sent_ticket_ids"].append(ticket_id)
-                event_progress["processed_tickets"] += 1
+                self.mark_ticket_sent(event_id, ticket_id)
             
             # Update progress after each ticket
             event_progress["last_processed_index"] = i
             self.save_progress()
-            
-            # Rate limiting - being generous to avoid overwhelming the system
-            # 1.8 seconds between requests = ~33 tickets/minute = ~2,000 tickets/hour
-            time.sleep(1.8)  # 1.8 seconds between requests
+            # Pacing happens in deliver_webhook via the shared rate limiter
         
         # Update batch completion
         event_progress["batches_completed"] = batch_number
         
         # Check if event is fully processed
-        if event_progress["processed_tickets"] >= event_progress["total_tickets"]:
-            event_progress["status"] = "completed"
-            if event_id not in self.progress["events_processed"]:
-                self.progress["events_processed"].append(event_id)
-        else:
-            event_progress["status"] = "in_progress"
+        self.update_event_status(event_id)
         
         self.save_progress()
         
@@ -634,6 +919,13 @@ class HistoricalSync:
         print(f"Event progress: {event_progress['processed_tickets']}/{event_progress['total_tickets']} tickets processed")
         print(f"Total tickets sent (all time): {self.progress['tickets_sent']}")
         
+        print(f"Rate limiter: {self.rate_limiter.summary()}")
+        
+        dead_letter_count = self.dead_letters.count(self.region)
+        if dead_letter_count:
+            print(f"📮 Failed sends in dead-letter queue: {dead_letter_count}")
+            print(f"   Retry them with: python dead_letters.py {self.region} retry")
+        
         if event_progress["status"] == "in_progress":
             print(f"\nTo continue processing, run:")
             print(f"python historical_sync.py {self.region} {event_id} --resume")
@@ -751,17 +1043,33 @@ def main():
     parser.add_argument('--quiet', action='store_true', help='Suppress non-charity ticket skip messages')
     parser.add_argument('--no-validate', action='store_true', help='Skip validation (NOT recommended - validation runs by default)')
     parser.add_argument('--test-batch', type=int, metavar='N', help='Process only first N tickets (smart team handling - use 1-5 for testing)')
+    parser.add_argument('--no-index', action='store_true', help='Skip upserting fetched tickets into the local ticket index')
+    parser.add_argument('--verify', action='store_true', help='Only check whether the event changed since the last fetch, using the stored hash tree')
+    parser.add_argument('--plan', action='store_true', help='Only estimate API calls, webhook posts and duration (count requests, see sync_planner.py)')
+    parser.add_argument('--refresh', action='store_true', help='Refetch tickets from Vivenu instead of reading the local ticket store')
+    parser.add_argument('--project', action='store_true', help='Send only the ticket fields in webhook_fields.json (or WEBHOOK_PROJECTION=1)')
+    parser.add_argument('--gzip', action='store_true', help='Gzip webhook bodies (or WEBHOOK_GZIP=1); the worker must decompress before verifying')
+    parser.add_argument('--page-size', type=int, default=TICKET_PAGE_SIZE,
+                        help=f'Tickets per /tickets call (default: {TICKET_PAGE_SIZE}; halved on repeated 503s)')
+    add_hedge_arguments(parser)
+    add_profile_arguments(parser)
     
     # Check if we have enough arguments
     if len(sys.argv) < 2:
-        print("Usage: python historical_sync.py <REGION> [EVENT_ID] [--batch-size N] [--resume] [--dry-run] [--quiet] [--no-validate] [--test-batch N]")
+        print("Usage: python historical_sync.py <REGION> [EVENT_ID] [--batch-size N] [--resume] [--dry-run] [--quiet] [--no-validate] [--test-batch N] [--refresh] [--no-index] [--verify] [--plan] [--project] [--gzip] [--page-size N] [--hedge] [--profile [DIR]]")
         print("       python historical_sync.py --test")
         print("\nIf EVENT_ID is not provided, it will be looked up from .env file using <REGION>_EVENT")
         sys.exit(1)
     
     args = parser.parse_args()
+    enable_from_args(args, "historical_sync")
     
-    sync = HistoricalSync(args.region)
+    sync = HistoricalSync(args.region, index_tickets=not args.no_index)
+    if args.project or args.gzip:
+        sync.payloads = WebhookPayloads(project=args.project or sync.payloads.fields is not None,
+                                        compress=args.gzip or sync.payloads.compress)
+    sync.page_size = args.page_size
+    sync.hedger = hedger_from_args(args, acquire=lambda: sync.rate_limiter.acquire(sync.api_key, f"{sync.base_url}/tickets"))
     
     # Get event ID - either from argument or from .env file
     if args.event_id:
@@ -775,6 +1083,17 @@ def main():
             print(f"Error: {e}")
             sys.exit(1)
     
+    if args.verify:
+        unchanged = sync.verify_event(event_id)
+        sys.exit(0 if unchanged else 1)
+    
+    if args.plan:
+        from sync_planner import SyncPlanner, print_plan
+        # sync_event only reads the local store for --resume/--test-batch, so plan a normal run as a refetch
+        refresh = args.refresh or not (args.resume or args.test_batch is not None)
+        print_plan(SyncPlanner(page_size=args.page_size, refresh=refresh).plan([(sync.region, event_id)]))
+        sys.exit(0)
+    
     # Run validation by default (unless --no-validate is specified)
     if not args.no_validate:
         print(f"\n{'='*60}")
@@ -810,7 +1129,9 @@ def main():
         print(f"{'='*60}")
     
     sync.sync_event(event_id, batch_size=args.batch_size, resume=args.resume, dry_run=args.dry_run, 
-                   quiet=args.quiet, validate=not args.no_validate, test_batch=args.test_batch)
+                   quiet=args.quiet, validate=not args.no_validate, test_batch=args.test_batch,
+                   refresh=args.refresh)
+    sync.payloads.print_report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+HYROX HTTP Trace - Record real HTTP traffic and replay it offline
+
+503 storms and long paginated fetches only happen against production. This
+records every request a script makes (through requests, at the transport
+adapter, so no script changes are needed) into a trace file, and replays
+the trace later as a fake transport:
+
+    record   runs a script with live traffic and writes one JSON line per
+             exchange: start offset, elapsed time, method, URL, query
+             params, status, key headers and (optionally) the body.
+             Authorization headers and key-like params are never written.
+             --bodies redacted (default) keeps only known non-personal
+             fields of /tickets rows (ids, ticket name, status, prices,
+             timestamps) and replaces every other value, nested ones
+             included, with a pseudonym keyed by a random per-trace salt:
+             equal values match within one trace but can't be checked
+             against a list of known emails. Event and ticket type
+             responses are kept. --bodies none keeps only sizes (replay then returns "{}").
+    replay   runs a script against the trace: each request is answered by
+             the next recorded response for the same method, URL and params
+             (falling back to method + URL), after the recorded latency
+             divided by --speed (0 = no delay). Status sequences such as
+             503, 503, 200 come back in the recorded order.
+    summary  status counts, retries and latency percentiles per endpoint
+
+The same is available in code for benchmarking a new fetch strategy:
+
+    with replaying("paris.trace.jsonl", speed=4):
+        stream_tickets(...)
+
+Usage:
+    python http_trace.py record <TRACE> [--bodies redacted|full|none] -- <SCRIPT> [ARGS...]
+    python http_trace.py replay <TRACE> [--speed S] [--strict] -- <SCRIPT> [ARGS...]
+    python http_trace.py summary <TRACE>
+"""
+
+import io
+import os
+import sys
+import gzip
+import hmac
+import json
+import time
+import runpy
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+TRACE_VERSION = 1
+KEPT_HEADERS = ["content-type", "content-encoding", "retry-after", "x-ratelimit-remaining", "x-ratelimit-reset"]
+SECRET_PARAMS = {"key", "api_key", "apikey", "token", "access_token", "secret", "signature"}
+# Ticket fields kept in redacted traces; every other value on a /tickets row is pseudonymized.
+# Other responses (events, ticket types) carry no personal data.
+TICKET_FIELDS = {
+    "_id", "sellerId", "eventId", "ticketTypeId", "ticketName", "categoryName", "categoryRef",
+    "status", "realPrice", "regularPrice", "currency", "createdAt", "updatedAt",
+}
+
+
+def open_trace(path: Path, mode: str):
+    """Trace files are JSON lines, gzipped when the name ends in .gz"""
+    return gzip.open(path, mode + "t", encoding="utf-8") if str(path).endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+def pseudonym(value: Any, salt: bytes) -> str:
+    text = value if isinstance(value, str) else json.dumps(value)
+    return "redacted-" + hmac.new(salt, text.encode("utf-8"), hashlib.sha256).hexdigest()[:10]
+
+
+def redact_value(value: Any, salt: bytes) -> Any:
+    """Pseudonymize every scalar in a value, keeping dict keys and list shapes"""
+    if isinstance(value, dict):
+        return {key: redact_value(item, salt) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact_value(item, salt) for item in value]
+    if value is None or value == "":
+        return value
+    return pseudonym(value, salt)
+
+
+def redact_ticket(ticket: Any, salt: bytes) -> Any:
+    """Keep a ticket row's TICKET_FIELDS and pseudonymize everything else"""
+    if not isinstance(ticket, dict):
+        return redact_value(ticket, salt)
+    return {key: value if key in TICKET_FIELDS else redact_value(value, salt) for key, value in ticket.items()}
+
+
+def redact(document: Any, path: str, salt: bytes) -> Any:
+    """Redact a response body by endpoint: GET /tickets rows and GET /tickets/{id}; anything else is kept"""
+    segments = [segment for segment in path.split("/") if segment]
+    if segments and segments[-1] == "tickets" and isinstance(document, dict):
+        rows = document.get("rows")
+        if isinstance(rows, list):
+            return {**document, "rows": [redact_ticket(row, salt) for row in rows]}
+        return document
+    if len(segments) >= 2 and segments[-2] == "tickets":
+        return redact_ticket(document, salt)
+    return document
+
+
+def split_url(url: str) -> Tuple[str, Dict[str, List[str]]]:
+    parts = urlsplit(url)
+    params: Dict[str, List[str]] = {}
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        params.setdefault(key, []).append("<redacted>" if key.lower() in SECRET_PARAMS else value)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}", params
+
+
+def match_key(method: str, base_url: str, params: Dict[str, List[str]]) -> str:
+    return f"{method} {base_url}?{json.dumps(sorted(params.items()))}"
+
+
+class TraceRecorder:
+    """Wraps HTTPAdapter.send and appends one line per exchange"""
+
+    def __init__(self, path: Path, bodies: str = "redacted"):
+        self.path = Path(path)
+        self.bodies = bodies
+        # Never written to the trace, so pseudonyms can't be recomputed from candidate values
+        self.salt = os.urandom(16)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.count = 0
+        self.file = open_trace(self.path, "w")
+        self.file.write(json.dumps({
+            "trace": TRACE_VERSION,
+            "recorded_at": datetime.utcnow().isoformat() + "Z",
+            "argv": sys.argv,
+            "bodies": bodies,
+        }) + "\n")
+
+    def body_for(self, response: requests.Response) -> Optional[str]:
+        if self.bodies == "none":
+            return None
+        text = response.content.decode(response.encoding or "utf-8", errors="replace")
+        if self.bodies == "redacted":
+            try:
+                return json.dumps(redact(json.loads(text), urlsplit(response.url).path, self.salt), separators=(',', ':'))
+            except ValueError:
+                return None  # Not JSON: can't tell what is personal, keep size only
+        return text
+
+    def send(self, original, adapter, request, **kwargs):
+        started = time.perf_counter()
+        error = None
+        response = None
+        try:
+            response = original(adapter, request, **kwargs)
+            response.content  # Include the body read in the timing, also for stream=True
+            return response
+        except requests.exceptions.RequestException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            base_url, params = split_url(request.url)
+            entry = {
+                "offset": round(started - self.started, 6),
+                "elapsed": round(elapsed, 6),
+                "method": request.method,
+                "url": base_url,
+                "params": params,
+                "request_bytes": len(request.body or b""),
+                "status": response.status_code if response is not None else None,
+                "error": error,
+            }
+            if response is not None:
+                entry["headers"] = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+                entry["response_bytes"] = len(response.content)
+                entry["body"] = self.body_for(response)
+            with self.lock:
+                self.count += 1
+                entry["seq"] = self.count
+                self.file.write(json.dumps(entry) + "\n")
+                self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def load_trace(path: Path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    with open_trace(Path(path), "r") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or "trace" not in lines[0]:
+        raise ValueError(f"{path} is not an HTTP trace")
+    return lines[0], lines[1:]
+
+
+class TraceReplayer:
+    """Answers requests from a trace instead of the network"""
+
+    def __init__(self, path: Path, speed: float = 1.0, strict: bool = False):
+        self.header, entries = load_trace(path)
+        self.speed = speed
+        self.strict = strict
+        self.lock = threading.Lock()
+        self.entries = entries
+        self.used = [False] * len(entries)
+        # Recorded order per exact request and per method + URL, as positions into entries
+        self.exact: Dict[str, deque] = defaultdict(deque)
+        self.loose: Dict[str, deque] = defaultdict(deque)
+        for i, entry in enumerate(entries):
+            self.exact[match_key(entry["method"], entry["url"], entry["params"])].append(i)
+            self.loose[f"{entry['method']} {entry['url']}"].append(i)
+        self.served = 0
+        self.fallbacks = 0
+        self.unmatched: List[str] = []
+        self.simulated_latency = 0.0
+
+    def _take(self, queue: Optional[deque]) -> Optional[int]:
+        while queue:
+            i = queue.popleft()
+            if not self.used[i]:
+                self.used[i] = True
+                return i
+        return None
+
+    def next_entry(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        base_url, params = split_url(url)
+        with self.lock:
+            i = self._take(self.exact.get(match_key(method, base_url, params)))
+            if i is None and not self.strict:
+                i = self._take(self.loose.get(f"{method} {base_url}"))
+                if i is not None:
+                    self.fallbacks += 1
+            if i is None:
+                self.unmatched.append(f"{method} {url}")
+                return None
+            return self.entries[i]
+
+    def send(self, original, adapter, request, **kwargs):
+        entry = self.next_entry(request.method, request.url)
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {request.url}", request=request)
+        delay = entry["elapsed"] / self.speed if self.speed > 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            self.served += 1
+            self.simulated_latency += delay
+        if entry.get("status") is None:
+            error = getattr(requests.exceptions, entry.get("error") or "ConnectionError", requests.exceptions.ConnectionError)
+            raise error(f"Recorded {entry.get('error')} for {request.method} {request.url}", request=request)
+        return self.build_response(request, entry)
+
+    def build_response(self, request, entry: Dict[str, Any]) -> requests.Response:
+        body = entry.get("body")
+        content = (body if body is not None else "{}").encode("utf-8")
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = "Replayed"
+        response.headers = CaseInsensitiveDict({k: v for k, v in entry.get("headers", {}).items() if k != "content-encoding"})
+        response._content = content
+        response._content_consumed = True
+        response.raw = io.BytesIO(content)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        return response
+
+    def summary(self) -> str:
+        left = self.used.count(False)
+        return (f"{self.served} served ({self.fallbacks} by URL only), {len(self.unmatched)} unmatched, "
+                f"{left} recorded left, {self.simulated_latency:.1f}s simulated latency")
+
+
+@contextmanager
+def _patched_send(handler):
+    original = HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        return handler.send(original, adapter, request, **kwargs)
+
+    HTTPAdapter.send = send
+    try:
+        yield handler
+    finally:
+        HTTPAdapter.send = original
+
+
+@contextmanager
+def recording(path: Path, bodies: str = "redacted"):
+    recorder = TraceRecorder(path, bodies)
+    try:
+        with _patched_send(recorder):
+            yield recorder
+    finally:
+        recorder.close()
+
+
+@contextmanager
+def replaying(path: Path, speed: float = 1.0, strict: bool = False):
+    with _patched_send(TraceReplayer(path, speed, strict)) as replayer:
+        yield replayer
+
+
+def run_script(script: List[str]) -> int:
+    """Run a script as __main__ with its own argv; returns its exit code"""
+    path = Path(script[0])
+    sys.argv = [str(path)] + script[1:]
+    sys.path.insert(0, str(path.resolve().parent))
+    try:
+        runpy.run_path(str(path), run_name="__main__")
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    return 0
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def print_summary(path: Path):
+    header, entries = load_trace(path)
+    print(f"📼 {path}: {len(entries):,} exchange(s), recorded {header.get('recorded_at')}, bodies {header.get('bodies')}")
+    print(f"   Command: {' '.join(header.get('argv', []))}")
+    if not entries:
+        return
+    duration = max(e["offset"] + e["elapsed"] for e in entries)
+    print(f"   Duration: {duration:.1f}s, {sum(e.get('response_bytes', 0) for e in entries):,} response bytes")
+
+    endpoints: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for entry in entries:
+        endpoints[f"{entry['method']} {entry['url']}"].append(entry)
+    print(f"\n   {'Endpoint':<50} {'Calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}  Statuses")
+    for endpoint, calls in endpoints.items():
+        latencies = [c["elapsed"] * 1000 for c in calls]
+        statuses = defaultdict(int)
+        for call in calls:
+            statuses[call["status"] or call.get("error") or "error"] += 1
+        print(f"   {endpoint[:50]:<50} {len(calls):>6,} {percentile(latencies, 50):>8.0f} {percentile(latencies, 95):>8.0f} "
+              f"{max(latencies):>8.0f}  " + ", ".join(f"{s}x{n}" for s, n in sorted(statuses.items(), key=str)))
+
+    failures = [e for e in entries if e["status"] is None or e["status"] >= 500]
+    if failures:
+        runs, current = [], 0
+        for entry in entries:
+            current = current + 1 if entry["status"] is None or entry["status"] >= 500 else 0
+            if current:
+                runs.append(current)
+        print(f"\n   ⚠️ {len(failures)} failed exchange(s), longest run of consecutive failures: {max(runs)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and replay HTTP traces of the Python scripts')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = sub.add_parser('record', help='Run a script and record its HTTP traffic')
+    record_parser.add_argument('trace', help='Trace file to write (.jsonl, or .jsonl.gz)')
+    record_parser.add_argument('--bodies', choices=['redacted', 'full', 'none'], default='redacted',
+                               help='Response bodies: personal fields pseudonymized (default), as-is, or sizes only')
+
+    replay_parser = sub.add_parser('replay', help='Run a script against a recorded trace')
+    replay_parser.add_argument('trace', help='Trace file to replay')
+    replay_parser.add_argument('--speed', type=float, default=1.0, help='Latency divisor: 1 = recorded, 4 = 4x faster, 0 = no delay')
+    replay_parser.add_argument('--strict', action='store_true', help='Only answer requests with exactly matching params')
+
+    summary_parser = sub.add_parser('summary', help='Status and latency summary of a trace')
+    summary_parser.add_argument('trace')
+    # Everything after "--" belongs to the script being run
+    argv = sys.argv[1:]
+    script = argv[argv.index('--') + 1:] if '--' in argv else []
+    args = parser.parse_args(argv[:argv.index('--')] if '--' in argv else argv)
+
+    if args.command == 'summary':
+        print_summary(Path(args.trace))
+        return
+
+    if not script:
+        parser.error("give the script to run after --")
+
+    started = time.time()
+    if args.command == 'record':
+        with recording(Path(args.trace), args.bodies) as recorder:
+            code = run_script(script)
+        print(f"\n📼 Recorded {recorder.count:,} exchange(s) to {args.trace} in {time.time() - started:.1f}s")
+    else:
+        with replaying(Path(args.trace), args.speed, args.strict) as replayer:
+            code = run_script(script)
+        print(f"\n📼 Replay at {args.speed:g}x: {replayer.summary()}, {time.time() - started:.1f}s wall")
+        for request in replayer.unmatched[:5]:
+            print(f"   ⚠️ Unmatched: {request}")
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Vivenu Availability Dashboard - Load Test
+
+Drives the test functions from test_availability.py concurrently to see how
+the dashboard behaves when many people check a sell-out at once.
+
+Two phases run back to back:
+    cold  - starts against an expired KV availability cache (use --cold-wait 300
+            to let the 5-minute cache lapse first), so the first requests scrape
+    warm  - same load once the cache is populated
+
+Reported per phase and endpoint: throughput, p50/p95/p99 latency, error rate.
+A timeline in --window buckets shows how latency and the cache hit ratio move
+as the cache fills and expires. Availability responses count as cache hits
+when their lastUpdated is older than the request itself.
+
+Usage:
+    python load_test_availability.py [--base-url URL] [--concurrency N] [--rate RPS]
+                                     [--cold-duration S] [--warm-duration S] [--cold-wait S]
+                                     [--mix event:4,ticket-type:2,...] [--window S] [--output FILE]
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+import test_availability
+from test_availability import (
+    test_health_check,
+    test_dashboard_html,
+    test_dashboard_data,
+    test_event_availability,
+    test_ticket_type_availability,
+)
+from phase_profiler import phase as profile_phase, add_profile_arguments, enable_from_args
+
+# Matches CACHE_TTL_MS in src/services/availability.ts
+CACHE_TTL_SECONDS = 5 * 60
+
+# Data at least this much older than the request came out of KV; allows for clock skew
+CACHE_HIT_MIN_AGE_SECONDS = 2
+
+ENDPOINTS: Dict[str, Tuple[str, Callable[[], dict]]] = {
+    "health": ("Health Check", test_health_check),
+    "dashboard": ("Dashboard HTML", test_dashboard_html),
+    "dashboard-data": ("Dashboard Data API", test_dashboard_data),
+    "event": ("Event Availability", test_event_availability),
+    "ticket-type": ("Ticket Type Availability", test_ticket_type_availability),
+}
+
+# Weighted like a sell-out: mostly availability lookups, some dashboard loads
+DEFAULT_MIX = "event:4,ticket-type:2,dashboard-data:2,dashboard:1,health:1"
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Parse "endpoint:weight,..." into a weight map"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.strip().partition(':')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = int(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("Endpoint mix needs at least one positive weight")
+    return weights
+
+
+def parse_iso(timestamp: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def cache_state(endpoint: str, data: Any, requested_at: float) -> Optional[str]:
+    """'hit' or 'miss' for responses that carry a lastUpdated, None otherwise"""
+    if not isinstance(data, dict):
+        return None
+    if endpoint == "event":
+        stamps = [data.get('lastUpdated')]
+    elif endpoint == "dashboard-data":
+        stamps = [event.get('lastUpdated') for event in data.get('events', []) if isinstance(event, dict)]
+    else:
+        return None
+
+    times = [t for t in (parse_iso(s) for s in stamps if s) if t is not None]
+    if not times:
+        return None
+    # Dashboard data is a hit only if every event came from KV
+    if all(requested_at - t >= CACHE_HIT_MIN_AGE_SECONDS for t in times):
+        return "hit"
+    return "miss"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LoadTest:
+    """Runs weighted endpoint calls at a fixed concurrency, optionally paced to a request rate"""
+
+    def __init__(self, weights: Dict[str, int], concurrency: int, rate: Optional[float] = None):
+        self.names = [name for name, weight in weights.items() if weight > 0]
+        self.weights = [weights[name] for name in self.names]
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.samples: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def call(self, phase: str, scheduled_at: Optional[float] = None):
+        """Make one request and record it"""
+        endpoint = random.choices(self.names, weights=self.weights)[0]
+        requested_at = time.time()
+        result = ENDPOINTS[endpoint][1]()
+        status_code = result.get('status_code')
+        sample = {
+            "phase": phase,
+            "endpoint": endpoint,
+            "offset_s": round(requested_at - self.started_at, 3),
+            "duration_ms": result.get('duration_ms', 0),
+            # Time spent waiting for a free worker in open-loop mode
+            "queue_ms": round((requested_at - scheduled_at) * 1000, 2) if scheduled_at else 0,
+            "status_code": status_code,
+            "ok": 'error' not in result and status_code in (200, 207),
+            "error": result.get('error'),
+            "cache": cache_state(endpoint, result.get('data'), requested_at),
+        }
+        with self.lock:
+            self.samples.append(sample)
+
+    def run_phase(self, phase: str, duration: float):
+        """Generate load for duration seconds"""
+        deadline = time.time() + duration
+        print(f"\n🔥 Phase '{phase}': {duration:.0f}s, concurrency {self.concurrency}"
+              + (f", {self.rate:g} req/s" if self.rate else ", closed loop"))
+
+        if self.rate:
+            # Open loop: submit on a fixed schedule, in-flight calls capped by the pool size
+            interval = 1.0 / self.rate
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                next_at = time.time()
+                while next_at < deadline:
+                    delay = next_at - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                    executor.submit(self.call, phase, next_at)
+                    next_at += interval
+        else:
+            # Closed loop: every worker fires its next request as soon as the last returns
+            def worker():
+                while time.time() < deadline:
+                    self.call(phase)
+
+            threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        done = sum(1 for s in self.samples if s["phase"] == phase)
+        print(f"   {done} requests completed")
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles, error and cache hit rates for a set of samples"""
+    latencies = [s["duration_ms"] for s in samples if s["ok"]]
+    errors = sum(1 for s in samples if not s["ok"])
+    cache_samples = [s for s in samples if s["cache"]]
+    hits = [s for s in cache_samples if s["cache"] == "hit"]
+    misses = [s for s in cache_samples if s["cache"] == "miss"]
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "error_rate": round(errors / len(samples), 4) if samples else 0,
+        "queue_p95_ms": percentile([s["queue_ms"] for s in samples], 95),
+        "cache_hit_rate": round(len(hits) / len(cache_samples), 4) if cache_samples else None,
+        "cache_hit_p50_ms": percentile([s["duration_ms"] for s in hits if s["ok"]], 50),
+        "cache_miss_p50_ms": percentile([s["duration_ms"] for s in misses if s["ok"]], 50),
+    }
+
+
+def timeline(samples: List[Dict[str, Any]], window: float) -> List[Dict[str, Any]]:
+    """Per-window summaries, ordered by time since the test started"""
+    buckets: Dict[int, List[Dict[str, Any]]] = {}
+    for sample in samples:
+        buckets.setdefault(int(sample["offset_s"] // window), []).append(sample)
+    return [
+        {"start_s": round(index * window, 1), "phase": bucket[0]["phase"], **summarize(bucket, window)}
+        for index, bucket in sorted(buckets.items())
+    ]
+
+
+def fmt_ms(value: Optional[float]) -> str:
+    return f"{value:.0f}" if value is not None else "-"
+
+
+def fmt_pct(value: Optional[float]) -> str:
+    return f"{value * 100:.1f}%" if value is not None else "-"
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'='*78}")
+    print(f"LOAD TEST RESULTS")
+    print(f"{'='*78}")
+    header = f"{'Phase':<6} {'Endpoint':<16} {'Reqs':>6} {'Req/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'Errors':>7} {'Cache':>7}"
+    print(header)
+    print('-' * len(header))
+    for phase, phase_report in report["phases"].items():
+        rows = [("all", phase_report["overall"])] + list(phase_report["endpoints"].items())
+        for endpoint, stats in rows:
+            print(f"{phase:<6} {endpoint:<16} {stats['requests']:>6} {stats['throughput_rps']:>7.1f} "
+                  f"{fmt_ms(stats['p50_ms']):>7} {fmt_ms(stats['p95_ms']):>7} {fmt_ms(stats['p99_ms']):>7} "
+                  f"{fmt_pct(stats['error_rate']):>7} {fmt_pct(stats['cache_hit_rate']):>7}")
+
+    print(f"\nKV availability cache effect (p50 of availability lookups):")
+    for phase, phase_report in report["phases"].items():
+        overall = phase_report["overall"]
+        print(f"  {phase:<6} hit {fmt_ms(overall['cache_hit_p50_ms'])}ms  "
+              f"miss {fmt_ms(overall['cache_miss_p50_ms'])}ms  hit rate {fmt_pct(overall['cache_hit_rate'])}")
+
+    print(f"\nTimeline:")
+    print(f"  {'t (s)':>7} {'Phase':<6} {'Req/s':>7} {'p95':>7} {'Errors':>7} {'Cache':>7}")
+    for bucket in report["timeline"]:
+        print(f"  {bucket['start_s']:>7.0f} {bucket['phase']:<6} {bucket['throughput_rps']:>7.1f} "
+              f"{fmt_ms(bucket['p95_ms']):>7} {fmt_pct(bucket['error_rate']):>7} {fmt_pct(bucket['cache_hit_rate']):>7}")
+
+    errors: Dict[str, int] = {}
+    for sample in report["samples"]:
+        if not sample["ok"]:
+            key = f"{sample['endpoint']}: {sample['status_code'] or sample['error']}"
+            errors[key] = errors.get(key, 0) + 1
+    if errors:
+        print(f"\n❌ Errors:")
+        for key, count in sorted(errors.items(), key=lambda item: -item[1]):
+            print(f"  {count:>5}x {key[:100]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the availability dashboard endpoints')
+    parser.add_argument('--base-url', default=test_availability.BASE_URL, help=f'Worker URL (default: {test_availability.BASE_URL})')
+    parser.add_argument('--concurrency', type=int, default=10, help='Parallel requests in flight (default: 10)')
+    parser.add_argument('--rate', type=float, help='Target requests per second; omit to run closed loop')
+    parser.add_argument('--cold-duration', type=float, default=30, help='Seconds of cold-cache load (default: 30, 0 to skip)')
+    parser.add_argument('--warm-duration', type=float, default=60, help='Seconds of warm-cache load (default: 60, 0 to skip)')
+    parser.add_argument('--cold-wait', type=float, default=0,
+                        help=f'Seconds to wait before the cold phase so the KV cache expires ({CACHE_TTL_SECONDS} for a guaranteed miss)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Endpoint weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--window', type=float, default=10, help='Timeline bucket size in seconds (default: 10)')
+    parser.add_argument('--output', help='Write the full report and raw samples as JSON')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    enable_from_args(args, "load_test_availability")
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    # The test functions read the module-level BASE_URL on every call
+    test_availability.BASE_URL = args.base_url.rstrip('/')
+
+    print(f"🚀 Load testing Availability Dashboard")
+    print(f"Base URL: {test_availability.BASE_URL}")
+    print(f"Endpoint mix: {', '.join(f'{k}:{v}' for k, v in weights.items())}")
+    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    if args.cold_duration and args.cold_wait:
+        print(f"\n⏳ Waiting {args.cold_wait:.0f}s for the KV availability cache to expire...")
+        time.sleep(args.cold_wait)
+
+    load = LoadTest(weights, args.concurrency, args.rate)
+    phase_times = {}
+    for phase, duration in (("cold", args.cold_duration), ("warm", args.warm_duration)):
+        if duration <= 0:
+            continue
+        phase_start = time.time()
+        with profile_phase(f"{phase}_load"):
+            load.run_phase(phase, duration)
+        phase_times[phase] = time.time() - phase_start
+
+    report: Dict[str, Any] = {
+        "base_url": test_availability.BASE_URL,
+        "concurrency": load.concurrency,
+        "rate": args.rate,
+        "mix": weights,
+        "started_at": datetime.fromtimestamp(load.started_at).isoformat(),
+        "phases": {},
+        "timeline": timeline(load.samples, args.window),
+        "samples": load.samples,
+    }
+    for phase, elapsed in phase_times.items():
+        phase_samples = [s for s in load.samples if s["phase"] == phase]
+        report["phases"][phase] = {
+            "duration_s": round(elapsed, 1),
+            "overall": summarize(phase_samples, elapsed),
+            "endpoints": {
+                name: summarize([s for s in phase_samples if s["endpoint"] == name], elapsed)
+                for name in weights if weights[name] > 0
+            },
+        }
+
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report written to {args.output}")
+
+    total = len(load.samples)
+    failed = sum(1 for s in load.samples if not s["ok"])
+    sys.exit(0 if total and failed == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+HYROX Metadata Cache - TTL-memoized Vivenu event, ticket type and seller lookups
+
+Event, ticket type and data-field metadata changes rarely but every script
+used to fetch it again on each call. Lookups through this module go through
+three tiers:
+
+    1. In-process memo - repeated lookups within a run are free
+    2. On-disk JSON under metadata_cache/ - repeated runs and validations
+       reuse the response until its resource TTL runs out
+    3. Vivenu - one request, taken from the shared rate limiter. Concurrent
+       identical lookups (threads) are single-flighted onto that request.
+
+Entries are keyed by resource, URL, query params and a hash of the API key,
+so regions never share entries. Errors are never cached.
+
+Usage:
+    python metadata_cache.py stats
+    python metadata_cache.py clear [RESOURCE]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+
+from rate_limiter import acquire
+
+CACHE_ROOT = Path("metadata_cache")
+
+# Seconds each resource stays fresh. Capacities (ticket type `amount`) can be
+# edited during a sale, so anything with ticket types expires sooner.
+RESOURCE_TTLS = {
+    "event": 30 * 60,
+    "event_tickets": 5 * 60,
+    "data_fields": 60 * 60,
+    "data_fields_resolve": 60 * 60,
+}
+DEFAULT_TTL = 15 * 60
+
+
+class _Flight:
+    """A request in progress that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class MetadataCache:
+    """Memo + disk cache in front of Vivenu GET requests"""
+
+    def __init__(self, root: Path = CACHE_ROOT):
+        self.root = Path(root)
+        self._memo: Dict[str, Tuple[float, Any]] = {}
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"memo_hits": 0, "disk_hits": 0, "fetches": 0, "shared_flights": 0}
+
+    @staticmethod
+    def cache_key(resource: str, url: str, params: Optional[Dict[str, Any]], api_key: Optional[str]) -> str:
+        key_hash = hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:16]
+        param_text = json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(f"{resource}|{url}|{param_text}|{key_hash}".encode('utf-8')).hexdigest()
+
+    def _path(self, resource: str, key: str) -> Path:
+        return self.root / resource / f"{key}.json"
+
+    def _read_disk(self, resource: str, key: str, ttl: float) -> Optional[Tuple[float, Any]]:
+        path = self._path(resource, key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        expires_at = entry["fetched_at"] + ttl
+        if expires_at <= time.time():
+            return None
+        return expires_at, entry["data"]
+
+    def _write_disk(self, resource: str, key: str, url: str, params: Optional[Dict[str, Any]], data: Any):
+        path = self._path(resource, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump({"fetched_at": time.time(), "url": url, "params": params, "data": data}, f)
+        os.replace(tmp, path)
+
+    def get(self, resource: str, url: str, api_key: Optional[str], params: Optional[Dict[str, Any]] = None,
+            ttl: Optional[float] = None, refresh: bool = False, timeout: float = 30) -> Any:
+        """Parsed JSON for a GET request, from memo, disk or Vivenu.
+
+        Raises requests.HTTPError / RequestException like a direct call would.
+        """
+        ttl = RESOURCE_TTLS.get(resource, DEFAULT_TTL) if ttl is None else ttl
+        key = self.cache_key(resource, url, params, api_key)
+
+        with self._lock:
+            if not refresh:
+                memo = self._memo.get(key)
+                if memo and memo[0] > time.time():
+                    self.stats["memo_hits"] += 1
+                    return memo[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats["shared_flights"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            cached = None if refresh else self._read_disk(resource, key, ttl)
+            if cached:
+                expires_at, data = cached
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+            else:
+                acquire(api_key, url)
+                response = requests.get(url, params=params, headers={
+                    'Authorization': f'Bearer {api_key}',
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json'
+                }, timeout=timeout)
+                response.raise_for_status()
+                data = response.json()
+                expires_at = time.time() + ttl
+                self._write_disk(resource, key, url, params, data)
+                with self._lock:
+                    self.stats["fetches"] += 1
+            with self._lock:
+                self._memo[key] = (expires_at, data)
+            flight.result = data
+            return data
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def summary(self) -> str:
+        return (f"{self.stats['fetches']} fetched, {self.stats['disk_hits']} from disk, "
+                f"{self.stats['memo_hits']} memoized, {self.stats['shared_flights']} deduplicated")
+
+    def clear(self, resource: Optional[str] = None):
+        with self._lock:
+            self._memo.clear()
+        target = self.root / resource if resource else self.root
+        if target.exists():
+            shutil.rmtree(target)
+
+
+_shared: Optional[MetadataCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> MetadataCache:
+    """The process-wide cache on CACHE_ROOT"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = MetadataCache()
+        return _shared
+
+
+def get_event(base_url: str, event_id: str, api_key: Optional[str], include_tickets: bool = False,
+              refresh: bool = False) -> Dict[str, Any]:
+    """GET /events/{id}, optionally with ticket types (?include=tickets)"""
+    if include_tickets:
+        return shared_cache().get("event_tickets", f"{base_url}/events/{event_id}", api_key,
+                                  params={"include": "tickets"}, refresh=refresh)
+    return shared_cache().get("event", f"{base_url}/events/{event_id}", api_key, refresh=refresh)
+
+
+def get_data_fields(base_url: str, api_key: Optional[str], refresh: bool = False) -> Any:
+    """GET /data-fields for the seller behind api_key"""
+    return shared_cache().get("data_fields", f"{base_url}/data-fields", api_key, refresh=refresh)
+
+
+def resolve_data_fields(base_url: str, api_key: Optional[str], params: Dict[str, Any],
+                        refresh: bool = False) -> Any:
+    """GET /data-fields/resolve for a seller/event/ticket type/scope combination"""
+    return shared_cache().get("data_fields_resolve", f"{base_url}/data-fields/resolve", api_key,
+                              params=params, refresh=refresh)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "clear"):
+        print("Usage: python metadata_cache.py stats | clear [RESOURCE]")
+        sys.exit(1)
+
+    cache = MetadataCache()
+    if sys.argv[1] == "clear":
+        resource = sys.argv[2] if len(sys.argv) > 2 else None
+        cache.clear(resource)
+        print(f"✅ Cleared {resource or 'all'} metadata cache entries in {cache.root}")
+        return
+
+    if not cache.root.exists():
+        print(f"No metadata cache at {cache.root}")
+        return
+    now = time.time()
+    print(f"{'Resource':<22} {'Entries':>8} {'Fresh':>6} {'TTL':>7}")
+    for resource_dir in sorted(p for p in cache.root.iterdir() if p.is_dir()):
+        ttl = RESOURCE_TTLS.get(resource_dir.name, DEFAULT_TTL)
+        entries = list(resource_dir.glob("*.json"))
+        fresh = 0
+        for entry in entries:
+            try:
+                with open(entry, 'r') as f:
+                    fresh += json.load(f)["fetched_at"] + ttl > now
+            except (OSError, ValueError, KeyError):
+                pass
+        print(f"{resource_dir.name:<22} {len(entries):>8} {fresh:>6} {ttl // 60:>5}m")
+
+
+if __name__ == "__main__":
+    main()
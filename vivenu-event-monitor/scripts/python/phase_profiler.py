@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+HYROX Phase Profiler - Named phase timing with optional CPU and memory detail
+
+Scripts mark their expensive steps as named phases:
+
+    from phase_profiler import phase, profiled
+
+    with phase("http"):
+        response = requests.get(...)
+
+    @profiled("save_progress")
+    def save_progress(self): ...
+
+Phases nest; a phase is identified by its stack ("sync_event;fetch_tickets;http").
+Nothing is measured unless the script was started with --profile, so the
+markers cost one attribute check otherwise. With --profile every phase
+records calls, wall time and self time (excluding child phases), and:
+
+    --profile-cpu     a cProfile per phase (self time only: the parent's
+                      profiler is paused while a child phase runs), saved
+                      for snakeviz/pstats, with its top functions in the report.
+    --profile-memory  tracemalloc peak memory per phase (including children)
+
+At exit a report is written to the --profile directory (default: profile/):
+
+    <script>_<timestamp>.json    phases, totals and top functions
+    <script>_<timestamp>.folded  collapsed stacks in microseconds, for
+                                 flamegraph.pl / speedscope / inferno
+    <script>_<timestamp>_prof/   one <phase>.prof per phase (--profile-cpu)
+
+Usage:
+    python historical_sync.py PARIS --dry-run --profile [DIR] [--profile-cpu] [--profile-memory]
+    python phase_profiler.py <REPORT.json>    # Print a saved report
+"""
+
+import sys
+import json
+import time
+import atexit
+import pstats
+import cProfile
+import functools
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+DEFAULT_OUTPUT_DIR = "profile"
+TOP_FUNCTIONS = 15
+PROFILER_FILES = {"phase_profiler.py", "contextlib.py"}
+
+
+class PhaseStats:
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.child_wall = 0.0
+        self.peak_bytes = 0
+        self.cpu: Optional[cProfile.Profile] = None
+
+
+class Frame:
+    def __init__(self, path: str, cpu: Optional[cProfile.Profile]):
+        self.path = path
+        self.started = time.perf_counter()
+        self.child_wall = 0.0
+        self.peak_bytes = 0
+        self.cpu = cpu
+
+
+class PhaseProfiler:
+    """Collects per-phase wall time, optional cProfile and tracemalloc peaks"""
+
+    def __init__(self):
+        self.enabled = False
+        self.cpu = False
+        self.memory = False
+        self.name = "run"
+        self.output_dir = Path(DEFAULT_OUTPUT_DIR)
+        self.stats: Dict[str, PhaseStats] = {}
+        self.stack: List[Frame] = []
+        self.started_at: Optional[datetime] = None
+
+    def enable(self, name: str, output_dir: str = DEFAULT_OUTPUT_DIR, cpu: bool = False, memory: bool = False):
+        self.enabled = True
+        self.name = name
+        self.output_dir = Path(output_dir)
+        self.cpu = cpu
+        self.memory = memory
+        self.started_at = datetime.now()
+        if memory:
+            tracemalloc.start()
+        self.begin(name)
+        atexit.register(self.finish)
+
+    def begin(self, name: str):
+        parent = self.stack[-1] if self.stack else None
+        path = f"{parent.path};{name}" if parent else name
+        stats = self.stats.setdefault(path, PhaseStats())
+
+        cpu = None
+        if self.cpu:
+            if parent and parent.cpu:
+                parent.cpu.disable()
+            stats.cpu = stats.cpu or cProfile.Profile()
+            cpu = stats.cpu
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent:
+                parent.peak_bytes = max(parent.peak_bytes, peak)
+            tracemalloc.reset_peak()
+        self.stack.append(Frame(path, cpu))
+        if cpu:
+            cpu.enable()
+
+    def end(self):
+        frame = self.stack.pop()
+        if frame.cpu:
+            frame.cpu.disable()
+        elapsed = time.perf_counter() - frame.started
+        stats = self.stats[frame.path]
+        stats.calls += 1
+        stats.wall += elapsed
+        stats.child_wall += frame.child_wall
+
+        parent = self.stack[-1] if self.stack else None
+        if self.memory:
+            peak = max(frame.peak_bytes, tracemalloc.get_traced_memory()[1])
+            stats.peak_bytes = max(stats.peak_bytes, peak)
+            if parent:
+                parent.peak_bytes = max(parent.peak_bytes, peak)
+        if parent:
+            parent.child_wall += elapsed
+            if parent.cpu:
+                parent.cpu.enable()
+
+    def finish(self):
+        if not self.enabled:
+            return
+        while self.stack:
+            self.end()
+        self.enabled = False
+        if self.memory:
+            tracemalloc.stop()
+        report_path = self.write_report()
+        print(f"\n⏱️ Profile saved to {report_path} (+ .folded for flame graphs)")
+
+    def report(self) -> Dict[str, Any]:
+        total = self.stats[self.name].wall if self.name in self.stats else 0.0
+        phases = []
+        for path, stats in self.stats.items():
+            entry = {
+                "phase": path,
+                "calls": stats.calls,
+                "wall_s": round(stats.wall, 6),
+                "self_s": round(stats.wall - stats.child_wall, 6),
+                "percent": round(100 * stats.wall / total, 1) if total else 0.0,
+            }
+            if self.memory:
+                entry["peak_bytes"] = stats.peak_bytes
+            if stats.cpu:
+                entry["top_functions"] = top_functions(stats.cpu)
+            phases.append(entry)
+        return {
+            "script": self.name,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "argv": sys.argv[1:],
+            "total_s": round(total, 6),
+            "cpu": self.cpu,
+            "memory": self.memory,
+            "phases": phases,
+        }
+
+    def folded(self) -> List[str]:
+        """Collapsed stacks: self time in microseconds; with --profile-cpu, split by function"""
+        lines = []
+        for path, stats in self.stats.items():
+            self_us = int((stats.wall - stats.child_wall) * 1e6)
+            functions = top_functions(stats.cpu, limit=None) if stats.cpu else []
+            attributed = 0
+            for function in functions:
+                us = int(function["self_s"] * 1e6)
+                if us > 0:
+                    lines.append(f"{path};{function['function'].replace(';', ':')} {us}")
+                    attributed += us
+            if self_us - attributed > 0:
+                lines.append(f"{path} {self_us - attributed}")
+        return lines
+
+    def write_report(self) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.name}_{(self.started_at or datetime.now()).strftime('%Y%m%d_%H%M%S')}"
+        report_path = self.output_dir / f"{stem}.json"
+        with open(report_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        with open(self.output_dir / f"{stem}.folded", 'w') as f:
+            f.write("\n".join(self.folded()) + "\n")
+        cpu_phases = [(path, stats.cpu) for path, stats in self.stats.items() if stats.cpu]
+        if cpu_phases:
+            prof_dir = self.output_dir / f"{stem}_prof"
+            prof_dir.mkdir(exist_ok=True)
+            for path, cpu in cpu_phases:
+                cpu.dump_stats(str(prof_dir / f"{path.replace(';', '.')}.prof"))
+        return report_path
+
+
+def top_functions(profile: cProfile.Profile, limit: Optional[int] = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    """Functions by self time (tottime) from one phase's cProfile"""
+    try:
+        raw = pstats.Stats(profile).stats
+    except TypeError:
+        return []  # Phase never ran any Python code
+    functions = []
+    for (filename, line, name), (calls, _, tottime, cumtime, _) in raw.items():
+        if Path(filename).name in PROFILER_FILES:
+            continue  # Phase bookkeeping, not the code being measured
+        label = f"{name} ({Path(filename).name}:{line})" if line else name
+        functions.append({"function": label, "calls": calls, "self_s": round(tottime, 6), "cumulative_s": round(cumtime, 6)})
+    functions.sort(key=lambda f: -f["self_s"])
+    return functions[:limit] if limit else functions
+
+
+profiler = PhaseProfiler()
+
+
+@contextmanager
+def phase(name: str):
+    if not profiler.enabled:
+        yield
+        return
+    profiler.begin(name)
+    try:
+        yield
+    finally:
+        profiler.end()
+
+
+def profiled(name: str):
+    """Decorator form of phase()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_OUTPUT_DIR, metavar='DIR',
+                        help=f'Time named phases and write a report to DIR (default: {DEFAULT_OUTPUT_DIR}/)')
+    parser.add_argument('--profile-cpu', action='store_true', help='With --profile: cProfile each phase')
+    parser.add_argument('--profile-memory', action='store_true', help='With --profile: tracemalloc peak per phase')
+
+
+def enable_from_args(args, name: str):
+    if args.profile or args.profile_cpu or args.profile_memory:
+        profiler.enable(name, args.profile or DEFAULT_OUTPUT_DIR, cpu=args.profile_cpu, memory=args.profile_memory)
+
+
+def enable_from_argv(name: str) -> List[str]:
+    """For scripts without argparse: consume --profile[=DIR], --profile-cpu, --profile-memory from sys.argv"""
+    output_dir, cpu, memory, rest = None, False, False, []
+    for arg in sys.argv[1:]:
+        if arg == "--profile":
+            output_dir = DEFAULT_OUTPUT_DIR
+        elif arg.startswith("--profile="):
+            output_dir = arg.split("=", 1)[1]
+        elif arg == "--profile-cpu":
+            cpu = True
+        elif arg == "--profile-memory":
+            memory = True
+        else:
+            rest.append(arg)
+    if output_dir or cpu or memory:
+        profiler.enable(name, output_dir or DEFAULT_OUTPUT_DIR, cpu=cpu, memory=memory)
+    sys.argv[1:] = rest
+    return rest
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"⏱️ {report['script']} {' '.join(report.get('argv', []))} - {report['total_s']:.2f}s total")
+    print(f"   {'Phase':<55} {'Calls':>7} {'Wall s':>9} {'Self s':>9} {'%':>6}" + ("  Peak MB" if report.get("memory") else ""))
+    for entry in report["phases"]:
+        depth = entry["phase"].count(";")
+        label = "  " * depth + entry["phase"].rsplit(";", 1)[-1]
+        line = (f"   {label[:55]:<55} {entry['calls']:>7,} {entry['wall_s']:>9.3f} {entry['self_s']:>9.3f} "
+                f"{entry['percent']:>5.1f}%")
+        if report.get("memory"):
+            line += f"  {entry.get('peak_bytes', 0) / 1e6:>7.1f}"
+        print(line)
+        for function in [f for f in entry.get("top_functions", []) if f["self_s"] >= 0.001][:3]:
+            print(f"   {'':<{2 * depth + 2}}{function['function'][:60]} {function['self_s']:.3f}s self")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python phase_profiler.py <REPORT.json>")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        print_report(json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+HYROX Shared Rate Limiter - Cross-process token buckets per API key and host
+
+Every script that calls Vivenu (historical_sync.py, dead_letters.py,
+postgres_loader.py, test_data_fields.py, ...) takes a token from the same
+bucket before each request. Buckets live in one SQLite file, and every
+acquire runs in a BEGIN IMMEDIATE transaction, which is the lock that
+serializes concurrent processes. However many jobs share a `<REGION>_API`
+key, their combined request rate stays at the configured limit.
+
+Acquire reserves a token even if the bucket is empty (the balance goes
+negative) and then sleeps off the debt. Waiting processes queue up in
+arrival order instead of polling, and each one learns its wait time from a
+single transaction.
+
+Buckets are keyed by a hash of the API key plus the request host, so keys
+are never written to disk. The database defaults to the system temp
+directory, so processes started from different directories share it.
+
+Configuration (.env):
+    VIVENU_RATE_LIMIT_RPS    Requests per second per key and host (default: 5)
+    VIVENU_RATE_LIMIT_BURST  Bucket size (default: 5)
+    VIVENU_RATE_LIMIT_DB     Bucket database (default: <tmp>/vivenu_rate_limits.db)
+
+Usage:
+    python rate_limiter.py stats    # Show buckets, tokens and total wait time
+    python rate_limiter.py reset    # Drop all buckets and stats
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DB_PATH = Path(os.getenv("VIVENU_RATE_LIMIT_DB", Path(tempfile.gettempdir()) / "vivenu_rate_limits.db"))
+DEFAULT_RATE = float(os.getenv("VIVENU_RATE_LIMIT_RPS", "5"))
+DEFAULT_BURST = float(os.getenv("VIVENU_RATE_LIMIT_BURST", "5"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    rate REAL NOT NULL,
+    burst REAL NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    acquired INTEGER NOT NULL DEFAULT 0,
+    waited_seconds REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def bucket_key(api_key: Optional[str], url: str) -> str:
+    """Stable bucket name for an API key and request host"""
+    host = urlparse(url).netloc or url
+    key_hash = hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:16]
+    return f"{key_hash}@{host}"
+
+
+class RateLimiter:
+    """Token buckets shared between processes through one SQLite file"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection per thread; sqlite3 connections can't be shared across threads
+        self._local = threading.local()
+        # Totals for this process, for end-of-run reporting
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None so BEGIN IMMEDIATE below controls locking
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, api_key: Optional[str], url: str, rate: Optional[float] = None,
+                burst: Optional[float] = None) -> float:
+        """Take one token and return how long the caller must wait before sending"""
+        rate = rate or DEFAULT_RATE
+        burst = burst or DEFAULT_BURST
+        bucket = bucket_key(api_key, url)
+        conn = self._connect()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE bucket = ?", (bucket,)).fetchone()
+            if row is None:
+                tokens = burst
+            else:
+                tokens = min(burst, row["tokens"] + (now - row["updated_at"]) * rate)
+            tokens -= 1
+            wait = max(0.0, -tokens / rate)
+            conn.execute("""
+                INSERT INTO buckets (bucket, host, rate, burst, tokens, updated_at, acquired, waited_seconds)
+                VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT (bucket) DO UPDATE SET
+                    rate = excluded.rate,
+                    burst = excluded.burst,
+                    tokens = excluded.tokens,
+                    updated_at = excluded.updated_at,
+                    acquired = buckets.acquired + 1,
+                    waited_seconds = buckets.waited_seconds + excluded.waited_seconds
+            """, (bucket, urlparse(url).netloc or url, rate, burst, tokens, now, wait))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, api_key: Optional[str], url: str, rate: Optional[float] = None,
+                burst: Optional[float] = None) -> float:
+        """Block until a request to url may be sent; returns seconds waited"""
+        wait = self.reserve(api_key, url, rate, burst)
+        if wait > 0:
+            time.sleep(wait)
+        with self._stats_lock:
+            self.acquired += 1
+            self.waited_seconds += wait
+        return wait
+
+    def summary(self) -> str:
+        """One-line report of this process's limiter usage"""
+        average = self.waited_seconds / self.acquired if self.acquired else 0
+        return (f"{self.acquired} request(s), {self.waited_seconds:.1f}s waiting for tokens "
+                f"(avg {average * 1000:.0f}ms)")
+
+    def stats(self):
+        return self._connect().execute("""
+            SELECT bucket, host, rate, burst, tokens, updated_at, acquired, waited_seconds
+            FROM buckets ORDER BY host, bucket
+        """).fetchall()
+
+    def reset(self):
+        self._connect().execute("DELETE FROM buckets")
+
+
+_shared: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    """The process-wide limiter on DEFAULT_DB_PATH"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimiter()
+        return _shared
+
+
+def acquire(api_key: Optional[str], url: str, rate: Optional[float] = None,
+            burst: Optional[float] = None) -> float:
+    """Take a token from the shared bucket for api_key and url's host"""
+    return shared_limiter().acquire(api_key, url, rate, burst)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "reset"):
+        print("Usage: python rate_limiter.py stats|reset")
+        sys.exit(1)
+
+    limiter = RateLimiter()
+    if sys.argv[1] == "reset":
+        limiter.reset()
+        print(f"✅ Cleared rate limit buckets in {limiter.db_path}")
+        return
+
+    rows = limiter.stats()
+    if not rows:
+        print(f"No buckets yet in {limiter.db_path}")
+        return
+    now = time.time()
+    print(f"Buckets in {limiter.db_path}:")
+    print(f"{'Host':<45} {'Key':<18} {'Rate':>6} {'Tokens':>7} {'Requests':>9} {'Waited':>9}")
+    for row in rows:
+        tokens = min(row["burst"], row["tokens"] + (now - row["updated_at"]) * row["rate"])
+        print(f"{row['host']:<45} {row['bucket'].split('@')[0]:<18} {row['rate']:>6.2f} "
+              f"{tokens:>7.1f} {row['acquired']:>9,} {row['waited_seconds']:>8.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+HYROX Reconcile - Set-diff Vivenu charity tickets against what landed downstream
+
+sent_ticket_ids in the progress file only says what historical_sync.py
+posted, not what the worker stored. This command compares the two ID sets
+directly and replays only the gap:
+
+    1. Vivenu side: the sorted charity ticket set from the local ticket store.
+       If the event's hash tree (ticket_merkle.py) says nothing changed, that
+       costs a handful of count requests; otherwise the event is refetched.
+    2. Downstream side: recorded ticket IDs, streamed in sorted order from
+       either a Postgres query (server-side cursor) or a worker export
+       endpoint returning one ID per line.
+    3. A streaming sorted merge yields missing (in Vivenu, not downstream)
+       and extra (downstream, not a current charity ticket) IDs.
+    4. --replay sends only the missing tickets, straight from the store.
+
+Downstream source (first one configured wins):
+    --database-url / DATABASE_URL   with --query / RECONCILE_QUERY (required), a
+                                    query against the table the webhook pipeline
+                                    writes, sorted with ORDER BY ticket_id COLLATE "C"
+    --export-url / WORKER_EXPORT_URL  GET <url>?event=<EVENT_ID>, text/plain or
+                                      NDJSON, one ticket ID per line, sorted
+
+There is no default query: the `tickets` table filled by postgres_loader.py is
+a copy of Vivenu, not what the webhook pipeline recorded, so queries reading it
+are refused.
+
+Usage:
+    python reconcile.py <REGION> [EVENT_ID] [--replay] [--limit N] [--refresh]
+                        [--database-url URL] [--query SQL] [--export-url URL]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+from historical_sync import HistoricalSync
+from ticket_store import TicketStore
+from ticket_merkle import TicketMerkleTree
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+load_dotenv()
+
+CURSOR_BATCH = 10000
+# postgres_loader.py's table holds Vivenu's own tickets, so diffing against it proves nothing
+LOADER_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+(?:"?public"?\s*\.\s*)?"?tickets"?(?=[\s;),]|$)', re.IGNORECASE)
+
+
+def reads_loader_table(query: str) -> bool:
+    """Whether the query reads the tickets table filled by postgres_loader.py"""
+    return bool(LOADER_TABLE_RE.search(query))
+
+
+def postgres_ids(database_url: str, event_id: str, query: str) -> Iterator[str]:
+    """Recorded ticket IDs from Postgres through a server-side cursor"""
+    if psycopg is None:
+        raise RuntimeError("psycopg is required to read recorded IDs from Postgres (pip install 'psycopg[binary]')")
+    with psycopg.connect(database_url) as conn:
+        with conn.cursor(name="reconcile_ids") as cursor:
+            cursor.itersize = CURSOR_BATCH
+            cursor.execute(query, {"event_id": event_id})
+            for row in cursor:
+                yield row[0]
+
+
+def export_ids(export_url: str, event_id: str) -> Iterator[str]:
+    """Recorded ticket IDs streamed from a worker export endpoint, one per line"""
+    with requests.get(export_url, params={"event": event_id}, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        response.encoding = response.encoding or 'utf-8'
+        for line in response.iter_lines(decode_unicode=True):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                line = record.get("ticket_id") or record.get("_id")
+            elif line.startswith('"'):
+                line = json.loads(line)
+            yield line
+
+
+def check_sorted(ids: Iterable[str], source: str) -> Iterator[str]:
+    """Pass IDs through, failing loudly if the source isn't actually sorted"""
+    previous = None
+    for ticket_id in ids:
+        if previous is not None and ticket_id < previous:
+            raise ValueError(f"{source} returned IDs out of order ({previous} before {ticket_id})")
+        previous = ticket_id
+        yield ticket_id
+
+
+def sorted_merge(expected: Iterable[str], recorded: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Yield ("missing", id) and ("extra", id) from two sorted ID streams in one pass"""
+    expected, recorded = iter(expected), iter(recorded)
+    a, b = next(expected, None), next(recorded, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a < b):
+            yield "missing", a
+            a = next(expected, None)
+        elif a is None or b < a:
+            yield "extra", b
+            b = next(recorded, None)
+        else:
+            a, b = next(expected, None), next(recorded, None)
+
+
+def load_vivenu_tickets(sync: HistoricalSync, event_id: str, refresh: bool) -> TicketStore:
+    """The charity ticket store, refetched unless the hash tree says it's still current"""
+    store_path = TicketStore.path_for(sync.region, event_id)
+    tree_path = TicketMerkleTree.path_for(sync.region, event_id)
+    use_store = not refresh and TicketStore.exists(store_path) and tree_path.exists() and sync.verify_event(event_id)
+    return sync.load_sorted_tickets(event_id, quiet=True, use_store=use_store)
+
+
+def replay_missing(sync: HistoricalSync, event_id: str, tickets: TicketStore, indexes: List[int]) -> int:
+    sent = 0
+    for position, i in enumerate(indexes, 1):
+        ticket = tickets[i]
+        print(f"   [{position}/{len(indexes)}] {ticket.get('ticketName', 'Unknown')} - {ticket.get('name', 'Unknown')}")
+        if sync.send_raw_webhook(tickets.raw_line(i), ticket):
+            sync.mark_ticket_sent(event_id, ticket.get('_id', ''))
+            sent += 1
+            if sent % 25 == 0:
+                sync.save_progress()
+    sync.save_progress()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff Vivenu charity tickets against downstream records')
+    parser.add_argument('region', help='Region (e.g. FRANKFURT)')
+    parser.add_argument('event_id', nargs='?', help='Event ID (default: <REGION>_EVENT from .env)')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help='Postgres with recorded tickets')
+    parser.add_argument('--query', default=os.getenv('RECONCILE_QUERY'),
+                        help='SQL returning the webhook pipeline\'s ticket IDs, ORDER BY ticket_id COLLATE "C"; '
+                             '%%(event_id)s is the event (required with --database-url)')
+    parser.add_argument('--export-url', default=os.getenv('WORKER_EXPORT_URL'), help='Worker export endpoint')
+    parser.add_argument('--refresh', action='store_true', help='Refetch tickets from Vivenu even if unchanged')
+    parser.add_argument('--replay', action='store_true', help='Send the missing tickets')
+    parser.add_argument('--limit', type=int, help='Replay at most N missing tickets')
+    args = parser.parse_args()
+
+    if not args.database_url and not args.export_url:
+        print("❌ No downstream source. Set DATABASE_URL or WORKER_EXPORT_URL, or pass --database-url / --export-url")
+        sys.exit(1)
+    if args.database_url and not args.query:
+        print("❌ No --query / RECONCILE_QUERY. Point it at the table the webhook pipeline writes, e.g.")
+        print('   SELECT ticket_id FROM <table> WHERE event_id = %(event_id)s ORDER BY ticket_id COLLATE "C"')
+        sys.exit(1)
+    if args.database_url and reads_loader_table(args.query):
+        print("❌ The query reads the tickets table filled by postgres_loader.py, which is a copy of Vivenu itself")
+        print("   Query the table the webhook pipeline writes instead, or use --export-url")
+        sys.exit(1)
+
+    sync = HistoricalSync(args.region)
+    event_id = args.event_id or sync.get_event_id_for_region(sync.region)
+    source = "Postgres" if args.database_url else args.export_url
+
+    print(f"\n{'='*60}")
+    print(f"🔁 RECONCILE - {sync.region} {event_id}")
+    print(f"Downstream: {source}")
+    print(f"{'='*60}")
+
+    tickets = load_vivenu_tickets(sync, event_id, args.refresh)
+    if not tickets:
+        print("No charity tickets in Vivenu for this event")
+        return
+    positions = {tickets.ticket_id(i): i for i in range(len(tickets))}
+    expected = sorted(positions)
+
+    recorded = postgres_ids(args.database_url, event_id, args.query) if args.database_url else export_ids(args.export_url, event_id)
+    missing: List[str] = []
+    extra: List[str] = []
+    recorded_count = 0
+    try:
+        for kind, ticket_id in sorted_merge(expected, check_sorted(recorded, source)):
+            (missing if kind == "missing" else extra).append(ticket_id)
+        recorded_count = len(expected) - len(missing) + len(extra)
+    except (requests.exceptions.RequestException, RuntimeError, ValueError) as e:
+        print(f"❌ Could not read downstream IDs: {e}")
+        sys.exit(1)
+
+    sent_locally = set(sync.progress["event_progress"].get(event_id, {}).get("sent_ticket_ids", []))
+    sent_but_missing = [t for t in missing if t in sent_locally]
+
+    print(f"\n📊 Vivenu charity tickets: {len(expected):,}")
+    print(f"📊 Recorded downstream:    {recorded_count:,}")
+    print(f"❌ Missing downstream:     {len(missing):,} ({len(sent_but_missing):,} of them marked sent locally)")
+    print(f"➕ Extra downstream:       {len(extra):,} (deleted, refunded or no longer charity in Vivenu)")
+
+    report_path = f"reconcile_{sync.region}_{event_id}.json"
+    with open(report_path, 'w') as f:
+        json.dump({
+            "region": sync.region,
+            "event_id": event_id,
+            "reconciled_at": datetime.utcnow().isoformat() + 'Z',
+            "downstream": "postgres" if args.database_url else args.export_url,
+            "vivenu_count": len(expected),
+            "recorded_count": recorded_count,
+            "missing": missing,
+            "missing_marked_sent": sent_but_missing,
+            "extra": extra,
+        }, f, indent=2)
+    print(f"💾 Report saved to {report_path}")
+
+    if not missing:
+        print("✅ Downstream has every charity ticket")
+        return
+    if not args.replay:
+        print(f"Run with --replay to send the {len(missing):,} missing ticket(s)")
+        sys.exit(1)
+
+    # Replay in the store's chronological order so teams stay together
+    indexes = sorted(positions[t] for t in missing)[:args.limit]
+    print(f"\n📤 Replaying {len(indexes):,} missing ticket(s)")
+    sent = replay_missing(sync, event_id, tickets, indexes)
+    print(f"\n✅ Sent {sent:,}/{len(indexes):,}; failures are in the dead-letter queue (python dead_letters.py {sync.region} list)")
+    sys.exit(0 if sent == len(indexes) else 1)
+
+
+if __name__ == "__main__":
+    main()
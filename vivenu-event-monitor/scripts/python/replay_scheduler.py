@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+HYROX Replay Scheduler - Priority classes and weighted fair share across backfills
+
+historical_sync.py replays one event strictly oldest-first. This replays
+several events (and regions) from one queue, so an urgent backfill finishes
+first without starving the rest:
+
+    - Every pending purchase (a single ticket, or a team's tickets bought
+      together) is assigned a priority class:
+          race-week  event starts within --race-window days (or --urgent)
+          hia        HIA-branded charity ticket types ("HIA" in the name)
+          standard   everything else
+    - Each (class, region, event) is a flow with weight
+      class weight x region weight. Flows are served by weighted fair
+      queuing: every flow keeps a virtual finish time that advances by
+      tickets sent / weight, and the flow with the lowest one goes next.
+      Within a flow tickets stay in chronological order.
+    - Webhook sends go through the shared rate limiter; --budget sets the
+      combined webhook rate for every process posting to the worker.
+    - Per class: tickets sent/failed, throughput, queueing delay (time from
+      start until sent) and send latency percentiles.
+
+Progress is recorded in historical_sync_progress_<REGION>.json as usual, so
+tickets already sent are skipped and historical_sync.py --resume keeps working.
+
+Usage:
+    python replay_scheduler.py REGION[:EVENT_ID] ... [--budget RPS] [--race-window DAYS]
+                               [--weights race-week=8,hia=4,standard=1] [--region-weight PARIS=2]
+                               [--urgent REGION:EVENT_ID ...] [--refresh] [--dry-run] [--stats-json FILE]
+"""
+
+import sys
+import json
+import time
+import heapq
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from historical_sync import HistoricalSync
+from ticket_store import TicketStore
+from availability_engine import parse_targets
+
+CLASS_ORDER = ["race-week", "hia", "standard"]
+DEFAULT_WEIGHTS = {"race-week": 8.0, "hia": 4.0, "standard": 1.0}
+DEFAULT_RACE_WINDOW_DAYS = 14
+SAVE_EVERY = 25
+
+
+def parse_weights(spec: Optional[str], known: Optional[List[str]] = None) -> Dict[str, float]:
+    """"a=2,b=0.5" -> {"a": 2.0, "b": 0.5}"""
+    weights = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip() if known else name.strip().upper()
+        if known and name not in known:
+            raise ValueError(f"Unknown class '{name}' (expected one of {', '.join(known)})")
+        if float(value) <= 0:
+            raise ValueError(f"Weight for {name} must be positive")
+        weights[name] = float(value)
+    return weights
+
+
+def days_until_start(event_data: Optional[Dict[str, Any]]) -> Optional[float]:
+    start = (event_data or {}).get("start")
+    if not start:
+        return None
+    starts_at = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    return (starts_at - datetime.now(timezone.utc)).total_seconds() / 86400
+
+
+def purchase_units(sync: HistoricalSync, tickets: TicketStore, skip_ids: Set[str]) -> List[List[int]]:
+    """Chronological send units: team tickets bought together stay one unit (like get_team_tickets)"""
+    units: List[List[int]] = []
+    i = 0
+    while i < len(tickets):
+        ticket = tickets[i]
+        unit = [i]
+        if sync.is_team_ticket(ticket.get('ticketName', '')):
+            j = i + 1
+            while (j < len(tickets) and tickets[j].get('createdAt', '') == ticket.get('createdAt', '')
+                   and sync.is_team_ticket(tickets[j].get('ticketName', ''))):
+                unit.append(j)
+                j += 1
+        i = unit[-1] + 1
+        unit = [k for k in unit if tickets.ticket_id(k) not in skip_ids]
+        if unit:
+            units.append(unit)
+    return units
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class Flow:
+    """Pending units of one (class, region, event)"""
+
+    def __init__(self, priority: str, region: str, event_id: str, weight: float, tickets: TicketStore, units: List[List[int]]):
+        self.priority = priority
+        self.region = region
+        self.event_id = event_id
+        self.weight = weight
+        self.tickets = tickets
+        self.units = units
+        self.position = 0
+        self.finish = 0.0  # virtual finish time
+
+    @property
+    def pending(self) -> int:
+        return sum(len(unit) for unit in self.units[self.position:])
+
+
+class ClassStats:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.queue_delays: List[float] = []
+        self.send_latencies: List[float] = []
+        self.first_at: Optional[float] = None
+        self.last_at: Optional[float] = None
+
+    def record(self, ok: bool, queued: float, latency: float, now: float):
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.queue_delays.append(queued)
+        self.send_latencies.append(latency)
+        self.first_at = self.first_at or now
+        self.last_at = now
+
+    def summary(self, started: float) -> Dict[str, Any]:
+        active = max((self.last_at or started) - (self.first_at or started), 1e-9)
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "throughput_per_min": round((self.sent + self.failed) / active * 60, 1) if self.last_at else 0.0,
+            "finished_after_s": round((self.last_at or started) - started, 1),
+            "queue_delay_p50_s": round(percentile(self.queue_delays, 50), 1),
+            "queue_delay_p95_s": round(percentile(self.queue_delays, 95), 1),
+            "send_latency_p50_ms": round(percentile(self.send_latencies, 50) * 1000),
+            "send_latency_p95_ms": round(percentile(self.send_latencies, 95) * 1000),
+        }
+
+
+class ReplayScheduler:
+    """Weighted fair queuing over flows, one send at a time through the shared rate limiter"""
+
+    def __init__(self, flows: List[Flow]):
+        self.flows = [flow for flow in flows if flow.units]
+        self.stats = {priority: ClassStats() for priority in CLASS_ORDER}
+        # (virtual finish, class rank, flow index): ties go to the more urgent class
+        self.heap: List[Tuple[float, int, int]] = []
+        for index, flow in enumerate(self.flows):
+            heapq.heappush(self.heap, (self._tag(flow), CLASS_ORDER.index(flow.priority), index))
+
+    def _tag(self, flow: Flow) -> float:
+        return flow.finish + len(flow.units[flow.position]) / flow.weight
+
+    def next_unit(self) -> Optional[Tuple[Flow, List[int]]]:
+        if not self.heap:
+            return None
+        tag, rank, index = heapq.heappop(self.heap)
+        flow = self.flows[index]
+        unit = flow.units[flow.position]
+        flow.finish = tag
+        flow.position += 1
+        if flow.position < len(flow.units):
+            heapq.heappush(self.heap, (self._tag(flow), rank, index))
+        return flow, unit
+
+    def order(self) -> List[Tuple[Flow, List[int]]]:
+        """The full send order without sending (consumes the queue)"""
+        schedule = []
+        while True:
+            item = self.next_unit()
+            if item is None:
+                return schedule
+            schedule.append(item)
+
+    def run(self, syncs: Dict[str, HistoricalSync]) -> float:
+        started = time.time()
+        sent_since_save = 0
+        try:
+            while True:
+                item = self.next_unit()
+                if item is None:
+                    break
+                flow, unit = item
+                sync = syncs[flow.region]
+                for i in unit:
+                    ticket = flow.tickets[i]
+                    print(f"   [{flow.priority}] {flow.region} {ticket.get('ticketName', 'Unknown')} - {ticket.get('name', 'Unknown')}")
+                    send_started = time.time()
+                    ok = sync.send_raw_webhook(flow.tickets.raw_line(i), ticket)
+                    now = time.time()
+                    self.stats[flow.priority].record(ok, now - started, now - send_started, now)
+                    if ok:
+                        sync.mark_ticket_sent(flow.event_id, ticket.get('_id', ''))
+                        sent_since_save += 1
+                        if sent_since_save >= SAVE_EVERY:
+                            sync.save_progress()
+                            sent_since_save = 0
+        except KeyboardInterrupt:
+            print("\n⏹️ Stopped - progress saved, rerun to continue")
+        finally:
+            for sync in syncs.values():
+                for flow in self.flows:
+                    if flow.region == sync.region:
+                        sync.update_event_status(flow.event_id)
+                sync.save_progress()
+        return started
+
+
+def print_plan(schedule: List[Tuple[Flow, List[int]]], rate: float):
+    """Projected per-class finish times if every send takes its rate-limit slot"""
+    finished: Dict[str, Tuple[int, float]] = {}
+    sent = 0
+    for flow, unit in schedule:
+        sent += len(unit)
+        count = finished.get(flow.priority, (0, 0.0))[0] + len(unit)
+        finished[flow.priority] = (count, sent / rate)
+    print(f"\n🗓️ Planned order at {rate:.2f} webhooks/s ({sent:,} tickets):")
+    for priority in CLASS_ORDER:
+        if priority in finished:
+            count, seconds = finished[priority]
+            print(f"   {priority:<10} {count:>7,} tickets, done after ~{seconds / 60:,.1f} min")
+    print("\nFirst sends:")
+    for flow, unit in schedule[:15]:
+        print(f"   [{flow.priority}] {flow.region} {flow.event_id} x{len(unit)}")
+
+
+def print_stats(scheduler: ReplayScheduler, started: float) -> Dict[str, Any]:
+    summary = {priority: scheduler.stats[priority].summary(started)
+               for priority in CLASS_ORDER if scheduler.stats[priority].queue_delays}
+    print(f"\n📊 Per-class stats ({time.time() - started:.0f}s):")
+    print(f"   {'Class':<10} {'Sent':>7} {'Failed':>7} {'/min':>7} {'Done at':>9} "
+          f"{'Wait p50':>9} {'Wait p95':>9} {'Send p50':>9} {'Send p95':>9}")
+    for priority, s in summary.items():
+        print(f"   {priority:<10} {s['sent']:>7,} {s['failed']:>7,} {s['throughput_per_min']:>7.1f} "
+              f"{s['finished_after_s']:>8.0f}s {s['queue_delay_p50_s']:>8.0f}s {s['queue_delay_p95_s']:>8.0f}s "
+              f"{s['send_latency_p50_ms']:>7}ms {s['send_latency_p95_ms']:>7}ms")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay several events with priority classes and weighted fair share')
+    parser.add_argument('targets', nargs='*', help='REGION or REGION:EVENT_ID (default: every region in .env)')
+    parser.add_argument('--budget', type=float, help='Combined webhook rate in requests/second (default: one per 1.8s)')
+    parser.add_argument('--race-window', type=float, default=DEFAULT_RACE_WINDOW_DAYS,
+                        help=f'Events starting within this many days are race-week (default: {DEFAULT_RACE_WINDOW_DAYS})')
+    parser.add_argument('--weights', help='Class weights, e.g. race-week=8,hia=4,standard=1')
+    parser.add_argument('--region-weight', help='Region weights, e.g. PARIS=2,BERLIN=1 (default: 1)')
+    parser.add_argument('--urgent', nargs='*', default=[], help='REGION:EVENT_ID to treat as race-week')
+    parser.add_argument('--refresh', action='store_true', help='Refetch tickets from Vivenu instead of reading local ticket stores')
+    parser.add_argument('--dry-run', action='store_true', help='Show the planned order and per-class finish times without sending')
+    parser.add_argument('--stats-json', help='Write per-class stats to this file')
+    args = parser.parse_args()
+
+    try:
+        targets = parse_targets(args.targets)
+        weights = {**DEFAULT_WEIGHTS, **parse_weights(args.weights, CLASS_ORDER)}
+        region_weights = parse_weights(args.region_weight)
+        urgent = set(parse_targets(args.urgent)) if args.urgent else set()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not targets:
+        print("❌ No regions configured. Set <REGION>_API and <REGION>_EVENT in .env")
+        sys.exit(1)
+
+    syncs: Dict[str, HistoricalSync] = {}
+    flows: List[Flow] = []
+    for region, event_id in targets:
+        sync = syncs.setdefault(region, HistoricalSync(region))
+        if args.budget:
+            sync.webhook_rate = args.budget
+        event_progress = sync.progress["event_progress"].setdefault(event_id, {
+            "total_tickets": 0,
+            "processed_tickets": 0,
+            "sent_ticket_ids": [],
+            "last_processed_index": -1,
+            "status": "pending",
+            "batches_completed": 0
+        })
+        tickets = sync.load_sorted_tickets(event_id, quiet=True, use_store=not args.refresh)
+        if not tickets:
+            continue
+        event_progress["total_tickets"] = max(event_progress["total_tickets"], len(tickets))
+        units = purchase_units(sync, tickets, set(event_progress["sent_ticket_ids"]))
+
+        days = days_until_start(sync.get_event_data(event_id))
+        race_week = (region, event_id) in urgent or (days is not None and -1 <= days <= args.race_window)
+        by_class: Dict[str, List[List[int]]] = {}
+        for unit in units:
+            if race_week:
+                priority = "race-week"
+            elif any('HIA' in tickets[i].get('ticketName', '').upper() for i in unit):
+                priority = "hia"
+            else:
+                priority = "standard"
+            by_class.setdefault(priority, []).append(unit)
+        for priority, class_units in by_class.items():
+            weight = weights[priority] * region_weights.get(region, 1.0)
+            flows.append(Flow(priority, region, event_id, weight, tickets, class_units))
+        starts = f"starts in {days:.0f} days" if days is not None else "no start date"
+        classes = ", ".join(f"{p} {sum(len(u) for u in us):,}" for p, us in by_class.items()) or "all sent"
+        print(f"📋 {region} {event_id}: {sum(len(u) for u in units):,} to send ({starts}) - {classes}")
+
+    scheduler = ReplayScheduler(flows)
+    if not scheduler.flows:
+        print("✅ Nothing left to send")
+        return
+    rate = next(iter(syncs.values())).webhook_rate
+
+    if args.dry_run:
+        print_plan(scheduler.order(), rate)
+        return
+
+    print(f"\n📤 Replaying {sum(f.pending for f in scheduler.flows):,} tickets from {len(scheduler.flows)} flow(s) "
+          f"at up to {rate:.2f} webhooks/s")
+    started = scheduler.run(syncs)
+    summary = print_stats(scheduler, started)
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            json.dump({"started_at": datetime.fromtimestamp(started, timezone.utc).isoformat(),
+                       "weights": weights, "region_weights": region_weights, "classes": summary}, f, indent=2)
+        print(f"💾 Stats saved to {args.stats_json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+HYROX Sales Forecast - Sales velocity and projected sell-out per ticket type
+
+Reads ticket createdAt timestamps from ticket_index.db (filled by every
+historical_sync.py fetch) for all events and regions at once and turns them
+into NumPy arrays:
+
+    - (event, ticket type) pairs are factorized to row numbers and tickets
+      are counted per time bucket by a GROUP BY in SQLite, giving a
+      types x buckets matrix of sales
+    - cumulative sales and rolling velocity (tickets/day over --window
+      days) come from cumsum and shifted differences over the whole matrix
+    - projected sell-out = as-of time + (capacity - sold) / current velocity;
+      types already at capacity report when they crossed it
+
+Capacities are the ticket types' `amount` from /events/{id}?include=tickets
+(via metadata_cache.py) for regions with an API key configured, or from
+availability_engine.py result files given with --results. Secondary ticket
+types are skipped, like the worker's availability numbers.
+
+Requires numpy (pip install numpy).
+
+Usage:
+    python sales_forecast.py [--db ticket_index.db] [--region R] [--event ID] [--charity]
+                             [--bucket-hours N] [--window DAYS] [--as-of TIME]
+                             [--results FILE ...] [--output forecast.json]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from metadata_cache import get_event
+from ticket_index import DEFAULT_DB_PATH
+from data_fields_matrix import base_url_for
+from availability_engine import is_secondary_ticket
+
+load_dotenv()
+
+DEFAULT_BUCKET_HOURS = 24
+DEFAULT_WINDOW_DAYS = 7
+
+
+def load_sales(db_path: Path, bucket_seconds: int, as_of: int, region: Optional[str] = None,
+               event_id: Optional[str] = None):
+    """Tickets sold per ticket type and time bucket, counted by SQLite.
+
+    Returns (groups, group_ids, bucket_ids, counts): groups is a list of
+    (region, event_id, ticket_name), and counts[i] tickets were sold in bucket
+    bucket_ids[i] (epoch seconds // bucket_seconds) for groups[group_ids[i]].
+    Only tickets created at or before as_of are counted. Python sees one row
+    per type and bucket, never one per ticket.
+    """
+    conn = sqlite3.connect(str(db_path))
+    # createdAt is UTC ISO 8601; strftime('%s') turns its first 19 chars into epoch seconds
+    epoch = "CAST(strftime('%s', substr(created_at, 1, 19)) AS INTEGER)"
+    where = f"WHERE created_at IS NOT NULL AND ticket_name IS NOT NULL AND {epoch} <= ?"
+    params: List[Any] = [bucket_seconds, as_of]
+    if region:
+        where += " AND region = ?"
+        params.append(region.upper())
+    if event_id:
+        where += " AND event_id = ?"
+        params.append(event_id)
+
+    rows = conn.execute(f"""
+        SELECT region, event_id, ticket_name, {epoch} / ? AS bucket, COUNT(*)
+        FROM tickets {where}
+        GROUP BY region, event_id, ticket_name, bucket
+    """, params).fetchall()
+    conn.close()
+
+    group_index: Dict[Tuple[str, str, str], int] = {}
+    groups: List[Tuple[str, str, str]] = []
+    group_ids = np.empty(len(rows), dtype=np.int64)
+    for i, (ticket_region, ticket_event, ticket_name, _, _) in enumerate(rows):
+        key = (ticket_region, ticket_event, ticket_name)
+        index = group_index.get(key)
+        if index is None:
+            index = group_index[key] = len(groups)
+            groups.append(key)
+        group_ids[i] = index
+    bucket_ids = np.array([row[3] for row in rows], dtype=np.int64)
+    counts = np.array([row[4] for row in rows], dtype=np.int64)
+    return groups, group_ids, bucket_ids, counts
+
+
+def sales_matrix(group_ids, bucket_ids, counts, groups: int, bucket_seconds: int, as_of: int) -> Tuple[Any, int]:
+    """groups x buckets matrix of tickets sold per bucket, and the first bucket's start time"""
+    first = int(bucket_ids.min())
+    last = max(as_of // bucket_seconds, int(bucket_ids.max()))
+    matrix = np.zeros((groups, last - first + 1), dtype=np.int64)
+    matrix[group_ids, bucket_ids - first] = counts
+    return matrix, first * bucket_seconds
+
+
+def forecast(matrix, capacities, start: int, bucket_seconds: int, window_buckets: int, as_of: int) -> Dict[str, Any]:
+    """Velocity and sell-out projections for every row of the sales matrix at once"""
+    cumulative = matrix.cumsum(axis=1)
+    sold = cumulative[:, -1]
+
+    # Rolling velocity over the trailing window, in tickets/day
+    window = max(1, min(window_buckets, matrix.shape[1]))
+    padded = np.concatenate([np.zeros((matrix.shape[0], 1), dtype=cumulative.dtype), cumulative], axis=1)
+    window_days = window * bucket_seconds / 86400
+    velocity = (padded[:, -1] - padded[:, -1 - window]) / window_days
+    rolling = (padded[:, window:] - padded[:, :-window]) / window_days
+
+    remaining = capacities - sold
+    has_capacity = capacities > 0
+    sold_out = has_capacity & (remaining <= 0)
+    selling = has_capacity & ~sold_out & (velocity > 0)
+
+    projected = np.full(matrix.shape[0], np.nan)
+    projected[selling] = as_of + remaining[selling] / velocity[selling] * 86400
+
+    # When sold-out types crossed capacity: first bucket where cumulative >= capacity
+    crossed = cumulative >= np.maximum(capacities, 1)[:, None]
+    crossed_bucket = crossed.argmax(axis=1)
+    projected[sold_out] = start + (crossed_bucket[sold_out] + 1) * bucket_seconds
+
+    return {
+        "sold": sold,
+        "velocity": velocity,
+        "peak_velocity": rolling.max(axis=1) if rolling.size else np.zeros(matrix.shape[0]),
+        "remaining": remaining,
+        "sold_out": sold_out,
+        "projected": projected,
+    }
+
+
+def live_capacities(pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """(event_id, ticket type name) -> amount for events whose region has an API key"""
+    capacities = {}
+    for region, event_id in pairs:
+        api_key = os.getenv(f"{region}_API")
+        if not api_key:
+            continue
+        try:
+            event_data = get_event(base_url_for(region), event_id, api_key, include_tickets=True)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ {region} {event_id}: could not load capacities: {e}")
+            continue
+        for ticket_type in event_data.get('tickets', []):
+            capacities[(event_id, ticket_type.get('name'))] = ticket_type.get('amount') or 0
+    return capacities
+
+
+def file_capacities(paths: List[str]) -> Dict[Tuple[str, str], int]:
+    capacities = {}
+    for path in paths:
+        with open(path, 'r') as f:
+            results = json.load(f)
+        event_id = results.get("event", {}).get("id")
+        if not event_id:
+            print(f"⚠️ {path} has no event id (availability_engine.py output expected), skipping")
+            continue
+        for ticket_type in results.get("ticket_types", []):
+            capacities[(event_id, ticket_type["name"])] = ticket_type.get("capacity", 0)
+    return capacities
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sales velocity and sell-out forecast per ticket type')
+    parser.add_argument('--db', default=str(DEFAULT_DB_PATH), help=f'Ticket index (default: {DEFAULT_DB_PATH})')
+    parser.add_argument('--region', help='Only this region')
+    parser.add_argument('--event', help='Only this event ID')
+    parser.add_argument('--charity', action='store_true', help='Only charity ticket types')
+    parser.add_argument('--bucket-hours', type=int, default=DEFAULT_BUCKET_HOURS,
+                        help=f'Bucket size in hours (default: {DEFAULT_BUCKET_HOURS})')
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW_DAYS,
+                        help=f'Rolling velocity window in days (default: {DEFAULT_WINDOW_DAYS})')
+    parser.add_argument('--as-of', help='Forecast from this UTC time (ISO, default: now)')
+    parser.add_argument('--results', nargs='*', default=[], help='availability_engine.py result files for capacities')
+    parser.add_argument('--no-live', action='store_true', help="Don't fetch capacities from Vivenu")
+    parser.add_argument('--output', help='Write the forecast as JSON')
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ numpy is required for sales forecasting")
+        print("Install with: pip install numpy")
+        sys.exit(1)
+
+    started = time.time()
+    as_of = int(datetime.fromisoformat(args.as_of).replace(tzinfo=timezone.utc).timestamp()) if args.as_of else int(time.time())
+    bucket_seconds = args.bucket_hours * 3600
+    window_buckets = max(1, int(round(args.window * 86400 / bucket_seconds)))
+    groups, group_ids, bucket_ids, counts = load_sales(Path(args.db), bucket_seconds, as_of, args.region, args.event)
+    if counts.size == 0:
+        print(f"No tickets with createdAt in {args.db}. Run historical_sync.py first to fill the index.")
+        sys.exit(1)
+
+    # Type filters run once per ticket type
+    keep_group = np.array([not is_secondary_ticket(name) and (not args.charity or 'CHARITY' in name.upper())
+                           for _, _, name in groups], dtype=bool)
+    mask = keep_group[group_ids]
+    if not mask.any():
+        print("No matching ticket types")
+        sys.exit(1)
+    kept = np.flatnonzero(keep_group)
+    renumber = np.cumsum(keep_group) - 1
+    group_ids, bucket_ids, counts = renumber[group_ids[mask]], bucket_ids[mask], counts[mask]
+    group_regions = [groups[i][0] for i in kept]
+    group_events = [groups[i][1] for i in kept]
+    group_names = [groups[i][2] for i in kept]
+
+    matrix, start = sales_matrix(group_ids, bucket_ids, counts, len(kept), bucket_seconds, as_of)
+
+    capacities: Dict[Tuple[str, str], int] = {}
+    if not args.no_live:
+        capacities.update(live_capacities(sorted({(r, e) for r, e in zip(group_regions, group_events)})))
+    capacities.update(file_capacities(args.results))
+    capacity = np.array([capacities.get((e, n), 0) for e, n in zip(group_events, group_names)], dtype=np.int64)
+
+    result = forecast(matrix, capacity, start, bucket_seconds, window_buckets, as_of)
+    elapsed = time.time() - started
+
+    order = np.lexsort((-result["velocity"], np.nan_to_num(result["projected"], nan=np.inf)))
+    rows = []
+    for i in order:
+        projected = result["projected"][i]
+        rows.append({
+            "region": group_regions[i],
+            "event_id": group_events[i],
+            "ticket_type": group_names[i],
+            "capacity": int(capacity[i]),
+            "sold": int(result["sold"][i]),
+            "remaining": int(result["remaining"][i]) if capacity[i] else None,
+            "velocity_per_day": round(float(result["velocity"][i]), 2),
+            "peak_velocity_per_day": round(float(result["peak_velocity"][i]), 2),
+            "sold_out": bool(result["sold_out"][i]),
+            "sell_out_at": format_time(projected) if not np.isnan(projected) else None,
+        })
+
+    print(f"📈 SALES FORECAST (as of {format_time(as_of)} UTC, {args.window:g}-day velocity)")
+    print(f"{'Region':<10} {'Ticket type':<42} {'Sold':>7} {'Cap':>7} {'/day':>7}  Sell-out")
+    for row in rows:
+        if row["sold_out"]:
+            outlook = f"SOLD OUT {row['sell_out_at']}"
+        elif row["sell_out_at"]:
+            outlook = row["sell_out_at"]
+        elif not row["capacity"]:
+            outlook = "no capacity"
+        else:
+            outlook = "no recent sales"
+        print(f"{row['region']:<10} {row['ticket_type'][:42]:<42} {row['sold']:>7,} {row['capacity']:>7,} "
+              f"{row['velocity_per_day']:>7.1f}  {outlook}")
+    print(f"\n{int(counts.sum()):,} tickets, {len(rows)} ticket type(s), {matrix.shape[1]} bucket(s) in {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"as_of": format_time(as_of), "bucket_hours": args.bucket_hours,
+                       "window_days": args.window, "ticket_types": rows}, f, indent=2)
+        print(f"💾 Forecast saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
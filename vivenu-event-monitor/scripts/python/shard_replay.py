@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+HYROX Sharded Replay - Parallel historical sync across processes and machines
+
+historical_sync.py keeps its progress in one JSON file per region, so only one
+process can replay an event at a time. This mode splits the sorted ticket set
+into shards by hashing each ticket _id and lets any number of workers
+cooperate on one backfill through a shared lease store:
+
+    - A worker claims a pending shard by writing itself as owner with a lease
+      expiry. A heartbeat thread keeps extending the lease while it works.
+    - Every sent ticket is committed to the store before the next one is sent,
+      so a shard can be picked up exactly where it stopped.
+    - If a worker crashes its lease expires and another worker reclaims the
+      shard, skipping tickets already recorded as sent.
+    - The worker that sees the last shard finish merges all sent ids into
+      historical_sync_progress_<REGION>.json, so --resume, ticket_index.py and
+      dead_letters.py keep working as usual.
+
+The lease store is a SQLite file (workers on one host) or PostgreSQL (workers
+on several hosts) given as --lease-db. Webhook sends still go through the
+shared rate limiter; raise --webhook-rps to let the workers go faster together.
+Don't run a plain historical_sync.py for the same event while a sharded replay
+is in progress.
+
+Usage:
+    python shard_replay.py <REGION> [EVENT_ID] [--shards N] [--lease-db PATH_OR_URL]
+                           [--lease-ttl S] [--webhook-rps R] [--worker-id ID]
+                           [--run-id ID] [--refresh] [--no-wait] [--status]
+                           [--project] [--gzip]
+"""
+
+import os
+import sys
+import time
+import random
+import socket
+import hashlib
+import sqlite3
+import argparse
+import threading
+from typing import Dict, List, Optional, Set
+
+from historical_sync import HistoricalSync
+from ticket_store import TicketStore
+from webhook_payload import WebhookPayloads
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+DEFAULT_LEASE_DB = "shard_leases.db"
+DEFAULT_SHARDS = 16
+DEFAULT_LEASE_TTL = 60
+
+# Written with ? placeholders; converted to %s for PostgreSQL
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS replay_runs (
+        run_id TEXT PRIMARY KEY,
+        region TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        shards INTEGER NOT NULL,
+        created_at DOUBLE PRECISION NOT NULL,
+        finalized_at DOUBLE PRECISION
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS replay_shards (
+        run_id TEXT NOT NULL,
+        shard INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'pending',
+        owner TEXT,
+        lease_expires DOUBLE PRECISION,
+        claims INTEGER NOT NULL DEFAULT 0,
+        updated_at DOUBLE PRECISION,
+        PRIMARY KEY (run_id, shard)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS replay_sent (
+        run_id TEXT NOT NULL,
+        ticket_id TEXT NOT NULL,
+        shard INTEGER NOT NULL,
+        sent_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (run_id, ticket_id)
+    )
+    """,
+]
+
+
+def shard_for(ticket_id: str, shards: int) -> int:
+    """Stable shard number for a ticket _id, identical on every host"""
+    return int(hashlib.sha1(ticket_id.encode('utf-8')).hexdigest()[:8], 16) % shards
+
+
+def ticket_set_key(tickets: TicketStore) -> str:
+    """Short hash of the ticket ids in store order; the same ticket set gives the same key on every host"""
+    digest = hashlib.sha1()
+    for i in range(len(tickets)):
+        digest.update(tickets.ticket_id(i).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()[:12]
+
+
+def split_shards(tickets: TicketStore, shards: int) -> Dict[int, List[int]]:
+    """Store indexes per shard, each list in the store's chronological order"""
+    by_shard: Dict[int, List[int]] = {shard: [] for shard in range(shards)}
+    for i in range(len(tickets)):
+        by_shard[shard_for(tickets.ticket_id(i), shards)].append(i)
+    return by_shard
+
+
+class LeaseStore:
+    """Shard leases and sent-ticket records in SQLite or PostgreSQL"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.is_postgres = target.startswith(("postgres://", "postgresql://"))
+        if self.is_postgres:
+            if psycopg is None:
+                raise RuntimeError("psycopg is required for a PostgreSQL lease store (pip install 'psycopg[binary]')")
+            self.conn = psycopg.connect(target, autocommit=True)
+        else:
+            # Autocommit: every statement below is a single atomic update
+            self.conn = sqlite3.connect(target, timeout=30, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA_STATEMENTS:
+            self.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def execute(self, sql: str, params: tuple = ()):
+        if self.is_postgres:
+            sql = sql.replace("?", "%s")
+        return self.conn.execute(sql, params)
+
+    def init_run(self, run_id: str, region: str, event_id: str, shard_totals: Dict[int, int]) -> int:
+        """Create the run and its shards unless another worker already did. Returns the shard count in use."""
+        self.execute("""
+            INSERT INTO replay_runs (run_id, region, event_id, shards, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (run_id) DO NOTHING
+        """, (run_id, region, event_id, len(shard_totals), time.time()))
+        shards = self.run_shards(run_id)
+        if shards == len(shard_totals):
+            for shard, total in shard_totals.items():
+                self.execute("""
+                    INSERT INTO replay_shards (run_id, shard, total, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (run_id, shard) DO NOTHING
+                """, (run_id, shard, total, time.time()))
+        return shards
+
+    def reopen_changed(self, run_id: str, shard_totals: Dict[int, int]) -> List[int]:
+        """Reset shards whose ticket count no longer matches this worker's ticket set.
+
+        A reopened shard goes back to pending (its current owner loses the
+        lease) and the run can be finalized again. Returns the reopened shards.
+        """
+        now = time.time()
+        reopened = []
+        for shard, total in shard_totals.items():
+            cursor = self.execute("""
+                UPDATE replay_shards
+                SET total = ?, status = 'pending', owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE run_id = ? AND shard = ? AND total != ?
+            """, (total, now, run_id, shard, total))
+            if cursor.rowcount == 1:
+                reopened.append(shard)
+        if reopened:
+            self.execute("UPDATE replay_runs SET finalized_at = NULL WHERE run_id = ?", (run_id,))
+        return reopened
+
+    def latest_run(self, region: str, event_id: str) -> Optional[str]:
+        row = self.execute("""
+            SELECT run_id FROM replay_runs WHERE region = ? AND event_id = ?
+            ORDER BY created_at DESC LIMIT 1
+        """, (region, event_id)).fetchone()
+        return row[0] if row else None
+
+    def is_finalized(self, run_id: str) -> bool:
+        row = self.execute("SELECT finalized_at FROM replay_runs WHERE run_id = ?", (run_id,)).fetchone()
+        return bool(row and row[0] is not None)
+
+    def run_shards(self, run_id: str) -> Optional[int]:
+        row = self.execute("SELECT shards FROM replay_runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, run_id: str, owner: str, ttl: float) -> Optional[int]:
+        """Lease one unfinished shard whose lease is free or expired"""
+        now = time.time()
+        candidates = [row[0] for row in self.execute("""
+            SELECT shard FROM replay_shards
+            WHERE run_id = ? AND status != 'done' AND (owner IS NULL OR lease_expires < ?)
+        """, (run_id, now)).fetchall()]
+        # Start at a random candidate so workers starting together don't all race for shard 0
+        random.shuffle(candidates)
+        for shard in candidates:
+            cursor = self.execute("""
+                UPDATE replay_shards
+                SET owner = ?, status = 'leased', lease_expires = ?, claims = claims + 1, updated_at = ?
+                WHERE run_id = ? AND shard = ? AND status != 'done' AND (owner IS NULL OR lease_expires < ?)
+            """, (owner, now + ttl, now, run_id, shard, now))
+            if cursor.rowcount == 1:
+                return shard
+        return None
+
+    def renew(self, run_id: str, shard: int, owner: str, ttl: float) -> bool:
+        """Extend a lease; False if another worker has taken the shard"""
+        cursor = self.execute("""
+            UPDATE replay_shards SET lease_expires = ?
+            WHERE run_id = ? AND shard = ? AND owner = ?
+        """, (time.time() + ttl, run_id, shard, owner))
+        return cursor.rowcount == 1
+
+    def record(self, run_id: str, shard: int, owner: str, ticket_id: Optional[str], sent: bool) -> bool:
+        """Commit one ticket's outcome; False if the lease was lost"""
+        now = time.time()
+        if sent:
+            self.execute("""
+                INSERT INTO replay_sent (run_id, ticket_id, shard, sent_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (run_id, ticket_id) DO NOTHING
+            """, (run_id, ticket_id, shard, now))
+        cursor = self.execute("""
+            UPDATE replay_shards SET sent = sent + ?, failed = failed + ?, updated_at = ?
+            WHERE run_id = ? AND shard = ? AND owner = ?
+        """, (1 if sent else 0, 0 if sent else 1, now, run_id, shard, owner))
+        return cursor.rowcount == 1
+
+    def complete(self, run_id: str, shard: int, owner: str):
+        self.execute("""
+            UPDATE replay_shards SET status = 'done', owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE run_id = ? AND shard = ? AND owner = ?
+        """, (time.time(), run_id, shard, owner))
+
+    def release(self, run_id: str, shard: int, owner: str):
+        """Give a shard back without finishing it (e.g. on Ctrl+C)"""
+        self.execute("""
+            UPDATE replay_shards SET status = 'pending', owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE run_id = ? AND shard = ? AND owner = ?
+        """, (time.time(), run_id, shard, owner))
+
+    def sent_ids(self, run_id: str, shard: Optional[int] = None) -> Set[str]:
+        if shard is None:
+            rows = self.execute("SELECT ticket_id FROM replay_sent WHERE run_id = ?", (run_id,))
+        else:
+            rows = self.execute("SELECT ticket_id FROM replay_sent WHERE run_id = ? AND shard = ?", (run_id, shard))
+        return {row[0] for row in rows.fetchall()}
+
+    def unfinished(self, run_id: str) -> int:
+        return self.execute("SELECT COUNT(*) FROM replay_shards WHERE run_id = ? AND status != 'done'",
+                            (run_id,)).fetchone()[0]
+
+    def claim_finalize(self, run_id: str) -> bool:
+        """Exactly one worker gets True and merges results into the progress file"""
+        cursor = self.execute("""
+            UPDATE replay_runs SET finalized_at = ?
+            WHERE run_id = ? AND finalized_at IS NULL
+        """, (time.time(), run_id))
+        return cursor.rowcount == 1
+
+    def shards(self, run_id: str) -> List[tuple]:
+        return self.execute("""
+            SELECT shard, total, sent, failed, status, owner, lease_expires, claims
+            FROM replay_shards WHERE run_id = ? ORDER BY shard
+        """, (run_id,)).fetchall()
+
+
+class LeaseHeartbeat:
+    """Keeps a shard lease alive from a background thread while tickets are sent"""
+
+    def __init__(self, lease_db: str, run_id: str, shard: int, owner: str, ttl: float):
+        self.lease_db = lease_db
+        self.run_id = run_id
+        self.shard = shard
+        self.owner = owner
+        self.ttl = ttl
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # Own connection: SQLite connections can't cross threads
+        store = LeaseStore(self.lease_db)
+        try:
+            while not self._stop.wait(self.ttl / 3):
+                if not store.renew(self.run_id, self.shard, self.owner, self.ttl):
+                    self.lost.set()
+                    return
+        finally:
+            store.close()
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def replay_shard(sync: HistoricalSync, store: LeaseStore, lease_db: str, run_id: str, shard: int,
+                 indexes: List[int], tickets: TicketStore, already_sent: Set[str],
+                 worker_id: str, ttl: float) -> bool:
+    """Send every unsent ticket of one shard in chronological order. Returns False if the lease was lost."""
+    done = already_sent | store.sent_ids(run_id, shard)
+    todo = [i for i in indexes if tickets.ticket_id(i) not in done]
+    print(f"\n🧩 Shard {shard}: {len(indexes)} tickets, {len(indexes) - len(todo)} already sent, {len(todo)} to send")
+
+    with LeaseHeartbeat(lease_db, run_id, shard, worker_id, ttl) as heartbeat:
+        for position, i in enumerate(todo, 1):
+            if heartbeat.lost.is_set():
+                print(f"   ⚠️ Lost lease on shard {shard} - another worker took over")
+                return False
+            ticket = tickets[i]
+            ticket_id = ticket.get('_id', '')
+            print(f"   [{shard}:{position}/{len(todo)}] {ticket.get('ticketName', 'Unknown')} - {ticket.get('name', 'Unknown')}")
+            sent = sync.send_raw_webhook(tickets.raw_line(i), ticket)
+            if sent:
+                sync.dead_letters.remove(sync.region, ticket_id)
+            if not store.record(run_id, shard, worker_id, ticket_id, sent):
+                print(f"   ⚠️ Lost lease on shard {shard} - another worker took over")
+                return False
+
+    store.complete(run_id, shard, worker_id)
+    print(f"   ✅ Shard {shard} complete")
+    return True
+
+
+def finalize(sync: HistoricalSync, store: LeaseStore, run_id: str, event_id: str, total: int):
+    """Merge the run's sent ids into the regular progress file"""
+    sync.progress = sync.load_progress()
+    event_progress = sync.progress["event_progress"].setdefault(event_id, {
+        "total_tickets": 0,
+        "processed_tickets": 0,
+        "sent_ticket_ids": [],
+        "last_processed_index": -1,
+        "status": "pending",
+        "batches_completed": 0
+    })
+    event_progress["total_tickets"] = max(event_progress["total_tickets"], total)
+    run_sent = store.sent_ids(run_id)
+    new_ids = sorted(run_sent - set(event_progress["sent_ticket_ids"]))
+    event_progress["sent_ticket_ids"].extend(new_ids)
+    event_progress["processed_tickets"] += len(new_ids)
+    sync.progress["tickets_sent"] += len(new_ids)
+    sync.dead_letters.remove_many(sync.region, run_sent)
+    # Shards replay out of global order, so resume by ticket id rather than position
+    event_progress["last_processed_index"] = total - 1
+    sync.update_event_status(event_id)
+    sync.save_progress()
+    print(f"📝 Merged {len(new_ids)} sent ticket(s) into {sync.progress_file}")
+
+
+def print_status(store: LeaseStore, run_id: str):
+    rows = store.shards(run_id)
+    if not rows:
+        print(f"No sharded replay recorded for {run_id}")
+        return
+    now = time.time()
+    total = sum(row[1] for row in rows)
+    sent = sum(row[2] for row in rows)
+    failed = sum(row[3] for row in rows)
+    print(f"Run {run_id}: {sent:,}/{total:,} sent, {failed:,} failed, "
+          f"{sum(1 for row in rows if row[4] == 'done')}/{len(rows)} shards done")
+    print(f"{'Shard':>5} {'Total':>7} {'Sent':>7} {'Failed':>7}  {'Status':<8} {'Claims':>6}  Owner")
+    for shard, shard_total, shard_sent, shard_failed, status, owner, lease_expires, claims in rows:
+        lease = ""
+        if owner:
+            remaining = lease_expires - now
+            lease = f"{owner} ({'expired' if remaining < 0 else f'{remaining:.0f}s left'})"
+        print(f"{shard:>5} {shard_total:>7} {shard_sent:>7} {shard_failed:>7}  {status:<8} {claims:>6}  {lease}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded, lease-based historical replay')
+    parser.add_argument('region', help='Region code (e.g., PARIS, FRANKFURT)')
+    parser.add_argument('event_id', nargs='?', help='Event ID to replay (optional if configured in .env)')
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS, help=f'Shard count for a new run (default: {DEFAULT_SHARDS})')
+    parser.add_argument('--lease-db', default=os.getenv('SHARD_LEASE_DB', DEFAULT_LEASE_DB),
+                        help=f'SQLite path or PostgreSQL URL shared by all workers (default: {DEFAULT_LEASE_DB})')
+    parser.add_argument('--lease-ttl', type=float, default=DEFAULT_LEASE_TTL, help=f'Lease length in seconds (default: {DEFAULT_LEASE_TTL})')
+    parser.add_argument('--webhook-rps', type=float, help='Combined webhook rate for all workers (default: one per 1.8s)')
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}", help='Lease owner name (default: host:pid)')
+    parser.add_argument('--run-id', help='Backfill run name (default: <REGION>:<EVENT_ID>:<ticket set hash>)')
+    parser.add_argument('--refresh', action='store_true', help='Refetch tickets from Vivenu instead of reading the local ticket store')
+    parser.add_argument('--no-wait', action='store_true', help="Exit when no shard is free instead of waiting for other workers' leases")
+    parser.add_argument('--status', action='store_true', help='Show shard progress and exit')
+    parser.add_argument('--project', action='store_true', help='Send only the ticket fields in webhook_fields.json')
+    parser.add_argument('--gzip', action='store_true', help='Gzip webhook bodies; the worker must decompress before verifying')
+    parser.add_argument('--quiet', action='store_true', help='Suppress non-charity ticket skip messages')
+    args = parser.parse_args()
+
+    sync = HistoricalSync(args.region)
+    try:
+        event_id = args.event_id or sync.get_event_id_for_region(args.region)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.webhook_rps:
+        sync.webhook_rate = args.webhook_rps
+    if args.project or args.gzip:
+        sync.payloads = WebhookPayloads(project=args.project or sync.payloads.fields is not None,
+                                        compress=args.gzip or sync.payloads.compress)
+
+    store = LeaseStore(args.lease_db)
+
+    if args.status:
+        print_status(store, args.run_id or store.latest_run(sync.region, event_id) or f"{sync.region}:{event_id}")
+        return
+
+    tickets = sync.load_sorted_tickets(event_id, quiet=args.quiet, use_store=not args.refresh)
+    if not tickets:
+        print("No tickets to replay")
+        return
+
+    # Keyed on the ticket set, so a refreshed store with new tickets starts a new run
+    run_id = args.run_id or f"{sync.region}:{event_id}:{ticket_set_key(tickets)}"
+
+    print(f"\n{'='*60}")
+    print(f"🧩 SHARDED REPLAY")
+    print(f"Region: {sync.region}  Event: {event_id}")
+    print(f"Run: {run_id}  Worker: {args.worker_id}")
+    print(f"Lease store: {args.lease_db} (TTL {args.lease_ttl:.0f}s)")
+    print(f"{'='*60}\n")
+
+    # An existing run keeps the shard count it was created with
+    shards = store.run_shards(run_id) or args.shards
+    by_shard = split_shards(tickets, shards)
+    created_shards = store.init_run(run_id, sync.region, event_id,
+                                    {shard: len(indexes) for shard, indexes in by_shard.items()})
+    if created_shards != shards:
+        # Another worker created the run first with a different count
+        shards = created_shards
+        by_shard = split_shards(tickets, shards)
+    if shards != args.shards:
+        print(f"ℹ️  Run already exists with {shards} shards - using that")
+    reopened = store.reopen_changed(run_id, {shard: len(indexes) for shard, indexes in by_shard.items()})
+    if reopened:
+        print(f"🔄 Ticket set changed since this run started - reopened shard(s) {', '.join(map(str, reopened))}")
+    elif store.is_finalized(run_id):
+        print(f"ℹ️  Run {run_id} already finished for this ticket set - nothing to send")
+        print_status(store, run_id)
+        return
+
+    already_sent = set(sync.progress["event_progress"].get(event_id, {}).get("sent_ticket_ids", []))
+    completed = 0
+    current: Optional[int] = None
+    try:
+        while True:
+            current = store.claim(run_id, args.worker_id, args.lease_ttl)
+            if current is None:
+                remaining = store.unfinished(run_id)
+                if remaining == 0:
+                    break
+                if args.no_wait:
+                    print(f"\n⏸️  {remaining} shard(s) leased by other workers - exiting (--no-wait)")
+                    return
+                print(f"\n⏳ {remaining} shard(s) leased by other workers - waiting for them to finish or expire...")
+                time.sleep(min(args.lease_ttl / 2, 30))
+                continue
+            if replay_shard(sync, store, args.lease_db, run_id, current, by_shard[current],
+                            tickets, already_sent, args.worker_id, args.lease_ttl):
+                completed += 1
+            current = None
+    except KeyboardInterrupt:
+        if current is not None:
+            store.release(run_id, current, args.worker_id)
+            print(f"\n⏹️  Interrupted - released shard {current} for other workers")
+        sys.exit(130)
+
+    print(f"\n✅ All shards done ({completed} completed by this worker)")
+    print(f"Rate limiter: {sync.rate_limiter.summary()}")
+    sync.payloads.print_report()
+    if store.claim_finalize(run_id):
+        finalize(sync, store, run_id, event_id, len(tickets))
+    print_status(store, run_id)
+    dead_letter_count = sync.dead_letters.count(sync.region)
+    if dead_letter_count:
+        print(f"📮 Failed sends in dead-letter queue: {dead_letter_count}")
+        print(f"   Retry them with: python dead_letters.py {sync.region} retry")
+
+
+if __name__ == "__main__":
+    main()
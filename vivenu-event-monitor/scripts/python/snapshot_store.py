@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+HYROX Snapshot Store - Compact time series of per-ticket-type availability
+
+Availability results (availability_engine.py output, *_test_results.json) are
+whole JSON documents, so "what changed since the last run" meant loading and
+comparing files by hand. This store keeps successive sold / available
+vectors for each event in one SQLite file:
+
+    - Each event has a ticket-type dictionary; a snapshot is two integer
+      columns (sold, available) indexed by dictionary slot.
+    - Columns are delta-encoded against the previous snapshot, zigzag
+      varint packed and zlib-compressed. Unchanged types cost ~nothing.
+      Every KEYFRAME_INTERVAL-th snapshot stores full values so reading a
+      point never replays more than that many deltas.
+    - snapshot_changes indexes (event, seq, slot) for every type whose
+      values changed, so a diff between two points only decodes the two
+      endpoints and only reports types that actually moved.
+
+Usage:
+    python snapshot_store.py record RESULTS.json [--event ID] [--region R] [--at TIME]
+    python snapshot_store.py list
+    python snapshot_store.py diff EVENT_ID [--from TIME] [--to TIME]
+    python snapshot_store.py series EVENT_ID TICKET_TYPE_ID [--from TIME] [--to TIME]
+    python snapshot_store.py stats
+
+TIME is an ISO timestamp (2025-10-01T12:00) or epoch seconds.
+"""
+
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+DEFAULT_DB_PATH = Path("availability_snapshots.db")
+KEYFRAME_INTERVAL = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_types (
+    event_id TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    ticket_type_id TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (event_id, slot),
+    UNIQUE (event_id, ticket_type_id)
+);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    event_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    taken_at REAL NOT NULL,
+    region TEXT,
+    keyframe INTEGER NOT NULL,
+    slots INTEGER NOT NULL,
+    sold BLOB NOT NULL,
+    available BLOB NOT NULL,
+    PRIMARY KEY (event_id, seq)
+);
+
+CREATE INDEX IF NOT EXISTS idx_snapshots_time ON snapshots (event_id, taken_at);
+
+CREATE TABLE IF NOT EXISTS snapshot_changes (
+    event_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    PRIMARY KEY (event_id, seq, slot)
+);
+"""
+
+
+def encode_column(values: List[int]) -> bytes:
+    """Zigzag varints, zlib-compressed"""
+    out = bytearray()
+    for value in values:
+        n = (value << 1) ^ (value >> 63)
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+    return zlib.compress(bytes(out), 9)
+
+
+def decode_column(blob: bytes) -> List[int]:
+    data = zlib.decompress(blob)
+    values, n, shift = [], 0, 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append((n >> 1) ^ -(n & 1))
+        n, shift = 0, 0
+    return values
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds')
+
+
+class SnapshotStore:
+    """Delta-encoded availability snapshots per event"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _types(self, event_id: str) -> List[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT slot, ticket_type_id, name FROM snapshot_types WHERE event_id = ? ORDER BY slot",
+            (event_id,)
+        ).fetchall()
+
+    def _decode_at(self, event_id: str, seq: int) -> Tuple[List[int], List[int]]:
+        """Full sold/available columns at seq: nearest keyframe plus the deltas after it"""
+        rows = self.conn.execute("""
+            SELECT keyframe, slots, sold, available FROM snapshots
+            WHERE event_id = ? AND seq <= ?
+              AND seq >= (SELECT MAX(seq) FROM snapshots WHERE event_id = ? AND seq <= ? AND keyframe = 1)
+            ORDER BY seq
+        """, (event_id, seq, event_id, seq)).fetchall()
+        sold: List[int] = []
+        available: List[int] = []
+        for row in rows:
+            sold_col, available_col = decode_column(row["sold"]), decode_column(row["available"])
+            if row["keyframe"]:
+                sold, available = sold_col, available_col
+                continue
+            sold += [0] * (row["slots"] - len(sold))
+            available += [0] * (row["slots"] - len(available))
+            sold = [a + b for a, b in zip(sold, sold_col)]
+            available = [a + b for a, b in zip(available, available_col)]
+        return sold, available
+
+    def record(self, event_id: str, results: Dict[str, Any], region: Optional[str] = None,
+               taken_at: Optional[float] = None) -> int:
+        """Append a snapshot from a results dict (ticket_types with id/name/sold/available); returns its seq"""
+        taken_at = taken_at if taken_at is not None else time.time()
+        with self.conn:
+            slots = {row["ticket_type_id"]: row["slot"] for row in self._types(event_id)}
+            for ticket_type in results.get("ticket_types", []):
+                if ticket_type["id"] not in slots:
+                    slots[ticket_type["id"]] = len(slots)
+                    self.conn.execute(
+                        "INSERT INTO snapshot_types (event_id, slot, ticket_type_id, name) VALUES (?, ?, ?, ?)",
+                        (event_id, slots[ticket_type["id"]], ticket_type["id"], ticket_type.get("name"))
+                    )
+
+            last = self.conn.execute("SELECT MAX(seq) AS seq FROM snapshots WHERE event_id = ?",
+                                     (event_id,)).fetchone()["seq"]
+            if last is None:
+                previous_sold, previous_available = [], []
+            else:
+                previous_sold, previous_available = self._decode_at(event_id, last)
+            size = len(slots)
+            previous_sold += [0] * (size - len(previous_sold))
+            previous_available += [0] * (size - len(previous_available))
+
+            # Types missing from this result keep their previous values
+            sold, available = list(previous_sold), list(previous_available)
+            for ticket_type in results.get("ticket_types", []):
+                slot = slots[ticket_type["id"]]
+                sold[slot] = int(ticket_type.get("sold", 0))
+                available[slot] = int(ticket_type.get("available", 0))
+
+            seq = 0 if last is None else last + 1
+            keyframe = seq % KEYFRAME_INTERVAL == 0
+            if keyframe:
+                sold_blob, available_blob = encode_column(sold), encode_column(available)
+            else:
+                sold_blob = encode_column([a - b for a, b in zip(sold, previous_sold)])
+                available_blob = encode_column([a - b for a, b in zip(available, previous_available)])
+            self.conn.execute("""
+                INSERT INTO snapshots (event_id, seq, taken_at, region, keyframe, slots, sold, available)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (event_id, seq, taken_at, region, int(keyframe), size, sold_blob, available_blob))
+
+            changed = [slot for slot in range(size)
+                       if last is None or sold[slot] != previous_sold[slot] or available[slot] != previous_available[slot]]
+            self.conn.executemany("INSERT INTO snapshot_changes (event_id, seq, slot) VALUES (?, ?, ?)",
+                                  [(event_id, seq, slot) for slot in changed])
+        return seq
+
+    def seq_at(self, event_id: str, when: Optional[float] = None) -> Optional[int]:
+        """Last snapshot taken at or before when (latest if when is None)"""
+        if when is None:
+            row = self.conn.execute("SELECT MAX(seq) AS seq FROM snapshots WHERE event_id = ?", (event_id,)).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT MAX(seq) AS seq FROM snapshots WHERE event_id = ? AND taken_at <= ?", (event_id, when)
+            ).fetchone()
+        return row["seq"]
+
+    def values(self, event_id: str, seq: int) -> Dict[str, Dict[str, Any]]:
+        """ticket_type_id -> name/sold/available at a snapshot"""
+        sold, available = self._decode_at(event_id, seq)
+        return {row["ticket_type_id"]: {"name": row["name"], "sold": sold[row["slot"]],
+                                        "available": available[row["slot"]]}
+                for row in self._types(event_id) if row["slot"] < len(sold)}
+
+    def diff(self, event_id: str, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Ticket types whose sold/available differ between two points in time.
+
+        start defaults to the snapshot before end (i.e. "since the last run").
+        """
+        end_seq = self.seq_at(event_id, end)
+        if end_seq is None:
+            return []
+        start_seq = self.seq_at(event_id, start) if start is not None else end_seq - 1
+        if start_seq is None or start_seq < 0:
+            start_seq = -1
+
+        candidates = [row["slot"] for row in self.conn.execute(
+            "SELECT DISTINCT slot FROM snapshot_changes WHERE event_id = ? AND seq > ? AND seq <= ? ORDER BY slot",
+            (event_id, start_seq, end_seq)
+        )]
+        if not candidates:
+            return []
+
+        after_sold, after_available = self._decode_at(event_id, end_seq)
+        if start_seq >= 0:
+            before_sold, before_available = self._decode_at(event_id, start_seq)
+        else:
+            before_sold, before_available = [], []
+        names = {row["slot"]: (row["ticket_type_id"], row["name"]) for row in self._types(event_id)}
+
+        changes = []
+        for slot in candidates:
+            old_sold = before_sold[slot] if slot < len(before_sold) else 0
+            old_available = before_available[slot] if slot < len(before_available) else 0
+            if old_sold == after_sold[slot] and old_available == after_available[slot]:
+                continue  # Changed and changed back
+            type_id, name = names[slot]
+            changes.append({
+                "id": type_id,
+                "name": name,
+                "sold_before": old_sold,
+                "sold_after": after_sold[slot],
+                "sold_delta": after_sold[slot] - old_sold,
+                "available_before": old_available,
+                "available_after": after_available[slot],
+            })
+        return changes
+
+    def series(self, event_id: str, ticket_type_id: str, start: Optional[float] = None,
+               end: Optional[float] = None) -> List[Tuple[float, int, int]]:
+        """(taken_at, sold, available) for one ticket type over a time range"""
+        slot_row = self.conn.execute(
+            "SELECT slot FROM snapshot_types WHERE event_id = ? AND ticket_type_id = ?", (event_id, ticket_type_id)
+        ).fetchone()
+        if slot_row is None:
+            return []
+        slot = slot_row["slot"]
+
+        first_seq = self.conn.execute(
+            "SELECT MIN(seq) AS seq FROM snapshots WHERE event_id = ? AND taken_at >= ?",
+            (event_id, start if start is not None else float("-inf"))
+        ).fetchone()["seq"]
+        last_seq = self.seq_at(event_id, end)
+        if first_seq is None or last_seq is None or last_seq < first_seq:
+            return []
+
+        # Start decoding at the keyframe before the range, then walk deltas for this slot only
+        keyframe_seq = self.conn.execute(
+            "SELECT MAX(seq) AS seq FROM snapshots WHERE event_id = ? AND seq <= ? AND keyframe = 1",
+            (event_id, first_seq)
+        ).fetchone()["seq"]
+        sold = available = 0
+        points = []
+        for row in self.conn.execute("""
+            SELECT seq, taken_at, keyframe, sold, available FROM snapshots
+            WHERE event_id = ? AND seq >= ? AND seq <= ? ORDER BY seq
+        """, (event_id, keyframe_seq, last_seq)):
+            sold_col, available_col = decode_column(row["sold"]), decode_column(row["available"])
+            in_column = slot < len(sold_col)
+            if row["keyframe"]:
+                sold = sold_col[slot] if in_column else 0
+                available = available_col[slot] if in_column else 0
+            elif in_column:
+                sold += sold_col[slot]
+                available += available_col[slot]
+            if row["seq"] >= first_seq:
+                points.append((row["taken_at"], sold, available))
+        return points
+
+    def events(self) -> List[sqlite3.Row]:
+        return self.conn.execute("""
+            SELECT event_id, MAX(region) AS region, COUNT(*) AS snapshots,
+                   MIN(taken_at) AS first_at, MAX(taken_at) AS last_at
+            FROM snapshots GROUP BY event_id ORDER BY event_id
+        """).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        row = self.conn.execute("""
+            SELECT COUNT(*) AS snapshots, COALESCE(SUM(LENGTH(sold) + LENGTH(available)), 0) AS column_bytes,
+                   COALESCE(SUM(slots), 0) AS cells
+            FROM snapshots
+        """).fetchone()
+        changes = self.conn.execute("SELECT COUNT(*) AS n FROM snapshot_changes").fetchone()["n"]
+        return {"snapshots": row["snapshots"], "column_bytes": row["column_bytes"],
+                "cells": row["cells"], "changes": changes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact availability snapshot store')
+    parser.add_argument('--db', default=str(DEFAULT_DB_PATH), help=f'Store file (default: {DEFAULT_DB_PATH})')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = sub.add_parser('record', help='Store a results JSON file as a snapshot')
+    record_parser.add_argument('file')
+    record_parser.add_argument('--event', help='Event ID (default: results["event"]["id"])')
+    record_parser.add_argument('--region')
+    record_parser.add_argument('--at', help='Snapshot time (default: file modification time)')
+
+    sub.add_parser('list', help='Events and snapshot counts')
+    sub.add_parser('stats', help='Storage summary')
+
+    diff_parser = sub.add_parser('diff', help='Changed ticket types between two points in time')
+    diff_parser.add_argument('event_id')
+    diff_parser.add_argument('--from', dest='start', help='Start time (default: previous snapshot)')
+    diff_parser.add_argument('--to', dest='end', help='End time (default: latest snapshot)')
+
+    series_parser = sub.add_parser('series', help='sold/available over time for one ticket type')
+    series_parser.add_argument('event_id')
+    series_parser.add_argument('ticket_type_id')
+    series_parser.add_argument('--from', dest='start')
+    series_parser.add_argument('--to', dest='end')
+
+    args = parser.parse_args()
+    store = SnapshotStore(Path(args.db))
+
+    if args.command == 'record':
+        with open(args.file, 'r') as f:
+            results = json.load(f)
+        event = results.get("event", {})
+        event_id = args.event or event.get("id")
+        if not event_id:
+            print("❌ No event ID in the results file; pass --event")
+            sys.exit(1)
+        taken_at = parse_time(args.at) if args.at else Path(args.file).stat().st_mtime
+        seq = store.record(event_id, results, args.region or event.get("region"), taken_at)
+        print(f"✅ Recorded snapshot #{seq} for {event_id} at {format_time(taken_at)}")
+
+    elif args.command == 'list':
+        rows = store.events()
+        if not rows:
+            print(f"No snapshots in {store.db_path}")
+        for row in rows:
+            print(f"{row['event_id']}  {row['region'] or '-':<10} {row['snapshots']:>6} snapshot(s)  "
+                  f"{format_time(row['first_at'])} → {format_time(row['last_at'])}")
+
+    elif args.command == 'stats':
+        stats = store.stats()
+        raw = stats["cells"] * 2 * 8
+        print(f"Snapshots: {stats['snapshots']:,}")
+        print(f"Column bytes: {stats['column_bytes']:,} (vs {raw:,} as raw int64)")
+        print(f"Indexed changes: {stats['changes']:,}")
+        print(f"File size: {store.db_path.stat().st_size:,} bytes")
+
+    elif args.command == 'diff':
+        start_time = time.time()
+        changes = store.diff(args.event_id, parse_time(args.start), parse_time(args.end))
+        elapsed = (time.time() - start_time) * 1000
+        if not changes:
+            print(f"No changes ({elapsed:.1f}ms)")
+        else:
+            print(f"{'Ticket type':<45} {'Sold':>15} {'Δ':>6} {'Available':>15}")
+            for change in changes:
+                print(f"{(change['name'] or change['id'])[:45]:<45} "
+                      f"{change['sold_before']:>6,} → {change['sold_after']:<6,} {change['sold_delta']:>+6} "
+                      f"{change['available_before']:>6,} → {change['available_after']:<6,}")
+            print(f"\n{len(changes)} changed ticket type(s) ({elapsed:.1f}ms)")
+
+    elif args.command == 'series':
+        points = store.series(args.event_id, args.ticket_type_id, parse_time(args.start), parse_time(args.end))
+        if not points:
+            print("No snapshots for that ticket type and range")
+        for taken_at, sold, available in points:
+            print(f"{format_time(taken_at)}  sold={sold:,}  available={available:,}")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+HYROX Stream Benchmark - Calls, time and peak memory per /tickets page size
+
+Fetches every ticket of an event page by page, once per page size and
+decoder, and reports API calls, total time, time to the first ticket and
+peak Python memory (tracemalloc) of the fetch loop:
+
+    json    response.json() on the buffered page (the old behaviour)
+    stream  RowStream (streaming_json.py): tickets decoded as bytes arrive
+
+Tickets are counted and dropped as they arrive, like availability_engine.py
+and historical_sync.py (which keeps only the charity tickets) do, so the
+memory column is the per-page cost rather than the event size.
+
+By default it runs against a local server (separate process, not traced)
+serving synthetic tickets, with a simple latency model: --latency seconds
+per call plus --per-ticket-ms of server time per ticket, and the body sent
+at --bandwidth MB/s. --live REGION EVENT_ID measures the real API instead
+(through the shared rate limiter).
+
+Usage:
+    python stream_benchmark.py [--tickets N] [--page-sizes 100,250,500,1000,2000]
+                               [--latency S] [--per-ticket-ms MS] [--bandwidth MBPS]
+                               [--live REGION EVENT_ID] [--json FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+import multiprocessing
+from typing import Dict, List, Any, Optional
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+from dotenv import load_dotenv
+
+from rate_limiter import acquire
+from streaming_json import RowStream, CHUNK_SIZE
+
+load_dotenv()
+
+DEFAULT_PAGE_SIZES = [100, 250, 500, 1000, 2000]
+DEFAULT_TICKETS = 10000
+DECODERS = ["json", "stream"]
+SEND_SLICE = 16 * 1024
+
+
+def synthetic_ticket(i: int, rng: random.Random) -> Dict[str, Any]:
+    """A ticket with the fields and rough size of a real /tickets row"""
+    first, last = rng.choice(["Anna", "Lukas", "Marie", "Tom", "Zoë"]), rng.choice(["Müller", "Smith", "Dubois", "Rossi"])
+    price = rng.choice([89.0, 119.0, 149.0, 179.0])
+    return {
+        "_id": f"{i:024x}", "sellerId": "5f0c0a0b0c0d0e0f10111213", "eventId": "68108c20c5c88849372bfb61",
+        "ticketTypeId": f"{rng.randrange(40):024x}", "ticketName": rng.choice(["HYROX PRO MEN", "HYROX WOMEN", "DOUBLES MIXED"]),
+        "categoryName": "Saturday", "status": rng.choice(["VALID", "VALID", "VALID", "INVALID"]),
+        "createdAt": "2025-03-01T10:00:00.000Z", "updatedAt": "2025-03-02T10:00:00.000Z",
+        "name": f"{first} {last}", "firstname": first, "lastname": last, "email": f"{first.lower()}.{i}@example.com",
+        "street": "Hauptstraße 1", "city": "Köln", "postal": "50667", "country": "DE", "currency": "EUR",
+        "regularPrice": price, "realPrice": price, "barcode": f"{rng.getrandbits(64):016X}",
+        "secret": f"{rng.getrandbits(128):032x}", "transactionId": f"{rng.getrandbits(96):024x}",
+        "cartItemId": f"{rng.getrandbits(96):024x}", "triggeredBy": [], "completed": True,
+        "extraFields": {"gender": "female", "tshirt_size": "M", "team_name": "", "charity": rng.random() < 0.05},
+        "history": [{"type": "created", "date": "2025-03-01T10:00:00.000Z"}],
+    }
+
+
+def serve(port: int, total: int, latency: float, per_ticket_ms: float, bandwidth_mbps: float):
+    """Synthetic /tickets endpoint; runs in its own process so it isn't traced"""
+    rng = random.Random(42)
+    rows = [json.dumps(synthetic_ticket(i, rng)).encode() for i in range(total)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            top, skip = int(query.get("top", ["100"])[0]), int(query.get("skip", ["0"])[0])
+            page = rows[skip:skip + top]
+            body = b'{"rows":[' + b",".join(page) + b'],"total":' + str(total).encode() + b'}'
+            time.sleep(latency + per_ticket_ms * len(page) / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            for start in range(0, len(body), SEND_SLICE):
+                piece = body[start:start + SEND_SLICE]
+                self.wfile.write(piece)
+                time.sleep(len(piece) / (bandwidth_mbps * 1e6))
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+def fetch_all(url: str, headers: Dict[str, str], params: Dict[str, Any], page_size: int, decoder: str,
+              api_key: Optional[str] = None) -> Dict[str, Any]:
+    """Page through an event counting tickets; returns calls, seconds, first-ticket time, peak bytes"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_ticket = None
+    calls = fetched = 0
+    expected = None
+    try:
+        while expected is None or fetched < expected:
+            calls += 1
+            if api_key:
+                acquire(api_key, url)
+            query = {**params, "top": page_size, "skip": fetched}
+            page = 0
+            if decoder == "json":
+                response = requests.get(url, headers=headers, params=query, timeout=120)
+                response.raise_for_status()
+                data = response.json()
+                for _ in data.get("rows", []):
+                    page += 1
+                    first_ticket = first_ticket or time.perf_counter() - started
+                expected = data.get("total", 0) if expected is None else expected
+                del data, response
+            else:
+                response = requests.get(url, headers=headers, params=query, timeout=120, stream=True)
+                response.raise_for_status()
+                rows = RowStream(response.iter_content(CHUNK_SIZE))
+                for _ in rows:
+                    page += 1
+                    first_ticket = first_ticket or time.perf_counter() - started
+                expected = rows.meta.get("total", 0) if expected is None else expected
+                del rows, response
+            if page == 0:
+                break
+            fetched += page
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "page_size": page_size,
+        "decoder": decoder,
+        "calls": calls,
+        "tickets": fetched,
+        "seconds": round(time.perf_counter() - started, 3),
+        "first_ticket_s": round(first_ticket or 0.0, 3),
+        "peak_mb": round(peak / 1e6, 2),
+    }
+
+
+def print_table(results: List[Dict[str, Any]]):
+    print(f"\n{'Page size':>9} {'Decoder':<8} {'Calls':>6} {'Tickets':>8} {'Time s':>8} {'1st ticket s':>13} {'Peak MB':>8}")
+    for r in results:
+        print(f"{r['page_size']:>9,} {r['decoder']:<8} {r['calls']:>6,} {r['tickets']:>8,} {r['seconds']:>8.2f} "
+              f"{r['first_ticket_s']:>13.3f} {r['peak_mb']:>8.2f}")
+    streamed = [r for r in results if r["decoder"] == "stream"]
+    if streamed:
+        best = min(streamed, key=lambda r: r["seconds"])
+        print(f"\n🏁 Fastest streamed page size: {best['page_size']:,} ({best['seconds']:.2f}s, {best['calls']} calls, "
+              f"{best['peak_mb']:.2f} MB peak)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /tickets page sizes with buffered vs streaming JSON decoding')
+    parser.add_argument('--tickets', type=int, default=DEFAULT_TICKETS, help=f'Synthetic event size (default: {DEFAULT_TICKETS:,})')
+    parser.add_argument('--page-sizes', default=",".join(map(str, DEFAULT_PAGE_SIZES)),
+                        help='Comma-separated page sizes (default: %(default)s)')
+    parser.add_argument('--decoders', default=",".join(DECODERS), help='json, stream or both (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.3, help='Synthetic: seconds per call (default: 0.3)')
+    parser.add_argument('--per-ticket-ms', type=float, default=0.2, help='Synthetic: server ms per ticket (default: 0.2)')
+    parser.add_argument('--bandwidth', type=float, default=20.0, help='Synthetic: body MB/s (default: 20)')
+    parser.add_argument('--port', type=int, default=8791, help='Synthetic server port (default: 8791)')
+    parser.add_argument('--live', nargs=2, metavar=('REGION', 'EVENT_ID'), help='Benchmark the real Vivenu API instead')
+    parser.add_argument('--json', metavar='FILE', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    page_sizes = [int(size) for size in args.page_sizes.split(",") if size]
+    decoders = [d for d in args.decoders.split(",") if d in DECODERS]
+
+    server = None
+    if args.live:
+        region, event_id = args.live[0].upper(), args.live[1]
+        api_key = os.getenv(f"{region}_API")
+        if not api_key:
+            print(f"❌ No API key found for region {region}")
+            sys.exit(1)
+        base_url = "https://vivenu.dev/api" if region in ["DEV", "TEST"] else "https://vivenu.com/api"
+        url, params = f"{base_url}/tickets", {"event": event_id}
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        print(f"🌐 Benchmarking {region} event {event_id} on the live API")
+    else:
+        api_key = None
+        url, params, headers = f"http://127.0.0.1:{args.port}/tickets", {"event": "synthetic"}, {}
+        server = multiprocessing.Process(target=serve, daemon=True,
+                                         args=(args.port, args.tickets, args.latency, args.per_ticket_ms, args.bandwidth))
+        server.start()
+        for _ in range(100):
+            try:
+                requests.get(url, params={"top": 0}, timeout=1)
+                break
+            except requests.exceptions.RequestException:
+                time.sleep(0.1)
+        print(f"🧪 Synthetic event: {args.tickets:,} tickets, {args.latency}s + {args.per_ticket_ms}ms/ticket per call, "
+              f"{args.bandwidth} MB/s")
+
+    results = []
+    try:
+        for page_size in page_sizes:
+            for decoder in decoders:
+                result = fetch_all(url, headers, params, page_size, decoder, api_key)
+                results.append(result)
+                print(f"   📏 top={page_size:,} {decoder}: {result['calls']} calls, {result['seconds']:.2f}s, "
+                      f"{result['peak_mb']:.2f} MB peak")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Request failed: {e}")
+        sys.exit(1)
+    finally:
+        if server:
+            server.terminate()
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"live": bool(args.live), "results": results}, f, indent=2)
+        print(f"💾 Saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+HYROX Streaming JSON - Pull tickets out of a /tickets response as bytes arrive
+
+response.json() buffers the whole body, decodes it to one string and builds
+the full page before the first ticket can be used, so a 1,000-ticket page
+costs several copies of itself in memory at once. RowStream reads the body
+in chunks and yields each element of the top-level "rows" array as soon as
+it is complete; the other top-level keys ("total", ...) are collected in
+.meta. Only the unconsumed tail of the body is ever held as text.
+
+    response = requests.get(url, params=params, stream=True, timeout=30)
+    rows = RowStream(response.iter_content(CHUNK_SIZE))
+    for ticket in rows:
+        ...
+    total = rows.meta.get("total")
+
+Pure Python (json.JSONDecoder.raw_decode per element), no extra dependency.
+A truncated or malformed body raises json.JSONDecodeError like response.json().
+
+Usage:
+    python streaming_json.py <FILE.json>    # Count rows and print the other keys
+"""
+
+import sys
+import json
+import codecs
+from typing import Dict, Iterable, Iterator, Any
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",]}"
+
+
+class RowStream:
+    """Iterate the elements of one top-level array of a JSON object, incrementally"""
+
+    def __init__(self, chunks: Iterable[bytes], array_key: str = "rows"):
+        self.chunks = iter(chunks)
+        self.array_key = array_key
+        self.meta: Dict[str, Any] = {}
+        self.count = 0
+        self.bytes_read = 0
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False at end of body"""
+        if self.eof:
+            return False
+        if self.pos > CHUNK_SIZE:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        try:
+            for chunk in self.chunks:
+                if chunk:
+                    self.bytes_read += len(chunk)
+                    self.buf += self.utf8.decode(chunk)
+                    return True
+            self.eof = True
+            self.buf += self.utf8.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            # Invalid UTF-8, or a body cut off inside a multibyte character: malformed like any other
+            self._error(f"Invalid UTF-8 in body ({e.reason})")
+        return False
+
+    def _error(self, message: str):
+        raise json.JSONDecodeError(message, self.buf, self.pos)
+
+    def _skip_ws(self) -> str:
+        """Next non-whitespace character (not consumed), or '' at end of body"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        char = self._skip_ws()
+        if not char or char not in chars:
+            self._error(f"Expected one of {chars!r}")
+        self.pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """Decode one complete JSON value, reading more of the body as needed"""
+        self._skip_ws()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number or literal is only complete once a delimiter follows it ("-4." may be "-4.5e3")
+                if (self.eof or self.buf[self.pos] in '{["'
+                        or (end < len(self.buf) and self.buf[end] in DELIMITERS)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                continue  # Buffer is now final: decode once more and succeed or raise
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._skip_ws() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                self._error("Expected an object key")
+            self._expect(":")
+            if key == self.array_key and self._skip_ws() == "[":
+                self.pos += 1
+                if self._skip_ws() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        element = self._value()
+                        self.count += 1
+                        yield element
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                self.meta[key] = self._value()
+            if self._expect(",}") == "}":
+                return
+
+    def read_all(self) -> Dict[str, Any]:
+        """Equivalent of response.json() for callers that want the whole page"""
+        rows = list(self)
+        return {**self.meta, self.array_key: rows}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python streaming_json.py <FILE.json>")
+        sys.exit(1)
+    with open(sys.argv[1], 'rb') as f:
+        rows = RowStream(iter(lambda: f.read(CHUNK_SIZE), b""))
+        count = sum(1 for _ in rows)
+    print(f"📦 {count:,} rows, {rows.bytes_read:,} bytes, other keys: {json.dumps(rows.meta)[:200]}")
+
+
+if __name__ == "__main__":
+    main()
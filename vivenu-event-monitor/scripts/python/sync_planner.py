@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+HYROX Sync Planner - Estimate API calls, webhook posts and duration before a sync
+
+Makes only count requests (top=1, reading `total`): one per event and one per
+charity ticket type (ticketTypeId filter), plus the cached event metadata.
+From those counts it estimates, per event and in total:
+
+    - /tickets calls and fetch time at the chosen page size (0 if a local
+      ticket store would be reused, see ticket_store.py)
+    - webhook posts still to send (charity tickets minus ones already marked
+      sent in the progress file) and the time they take at the webhook pace
+    - historical_sync.py runs needed at the batch size
+
+Fetch time uses the latency measured on the count requests plus
+--per-ticket-ms of transfer/decoding per ticket, bounded by the configured
+API rate (VIVENU_RATE_LIMIT_RPS). Webhook time is posts / webhook rate; the
+rate is shared by every process, so more workers don't make it faster.
+
+Charity counts include every status (the sync only sends VALID and
+DETAILSREQUIRED), so webhook numbers are an upper bound.
+
+Recommendations: page size (largest that keeps a call well inside the
+request timeout), fetch concurrency (enough events in flight to use the API
+rate) and --batch-size (one run per --batch-minutes of webhook sending).
+
+Usage:
+    python sync_planner.py [REGION[:EVENT_ID] ...] [--page-size N] [--batch-minutes M]
+                           [--per-ticket-ms MS] [--api-rps R] [--webhook-rps R] [--refresh] [--json FILE]
+    python historical_sync.py PARIS --plan    # Same plan for one event
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+from statistics import median
+from typing import Dict, List, Any, Optional, Tuple
+
+import requests
+
+from historical_sync import HistoricalSync, TICKET_PAGE_SIZE, WEBHOOK_RATE_LIMIT_RPS
+from ticket_store import TicketStore
+from rate_limiter import DEFAULT_RATE
+from metadata_cache import get_event
+
+TICKET_TYPE_PARAM = "ticketTypeId"
+DEFAULT_PER_TICKET_MS = 0.5
+DEFAULT_BATCH_MINUTES = 30
+FETCH_TIMEOUT = 15          # historical_sync's /tickets timeout
+TIMEOUT_HEADROOM = 3        # Keep an estimated call under a third of the timeout
+MAX_PAGE_SIZE = 1000        # Largest page the worker's TicketScraper uses
+MIN_PAGE_SIZE = 100
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+class SyncPlanner:
+    """Count-only survey of events and the estimates built from it"""
+
+    def __init__(self, page_size: int = TICKET_PAGE_SIZE, per_ticket_ms: float = DEFAULT_PER_TICKET_MS,
+                 api_rps: float = DEFAULT_RATE, webhook_rps: float = WEBHOOK_RATE_LIMIT_RPS,
+                 batch_minutes: float = DEFAULT_BATCH_MINUTES, refresh: bool = False):
+        self.page_size = page_size
+        self.per_ticket_ms = per_ticket_ms
+        self.api_rps = api_rps
+        self.webhook_rps = webhook_rps
+        self.batch_minutes = batch_minutes
+        self.refresh = refresh
+        self.latencies: List[float] = []
+        self.count_calls = 0
+
+    def timed_count(self, sync: HistoricalSync, event_id: str, params: Optional[Dict[str, str]] = None) -> Optional[int]:
+        """total of a top=1 /tickets request, recording its latency (rate-limit wait excluded)"""
+        url = f"{sync.base_url}/tickets"
+        sync.rate_limiter.acquire(sync.api_key, url)
+        self.count_calls += 1
+        started = time.perf_counter()
+        try:
+            response = requests.get(url, headers=sync.headers, params={"event": event_id, "top": 1, **(params or {})},
+                                    timeout=FETCH_TIMEOUT)
+            response.raise_for_status()
+            total = response.json().get("total", 0)
+        except requests.exceptions.RequestException as e:
+            print(f"   ❌ Count request failed for {event_id}: {e}")
+            return None
+        self.latencies.append(time.perf_counter() - started)
+        return total
+
+    def survey(self, sync: HistoricalSync, event_id: str) -> Dict[str, Any]:
+        """Counts for one event: all tickets, charity tickets per type, already sent, local store"""
+        event = sync.get_event_data(event_id) or {}
+        entry: Dict[str, Any] = {
+            "region": sync.region,
+            "event_id": event_id,
+            "event_name": event.get("name", "Unknown"),
+            "tickets": self.timed_count(sync, event_id),
+            "charity_types": [],
+        }
+
+        try:
+            ticket_types = get_event(sync.base_url, event_id, sync.api_key, include_tickets=True).get("tickets", [])
+        except requests.exceptions.RequestException as e:
+            print(f"   ⚠️ Could not load ticket types for {event_id}: {e}")
+            ticket_types = []
+        for ticket_type in ticket_types:
+            if "CHARITY" in (ticket_type.get("name") or "").upper():
+                count = self.timed_count(sync, event_id, {TICKET_TYPE_PARAM: ticket_type.get("_id")})
+                entry["charity_types"].append({"id": ticket_type.get("_id"), "name": ticket_type.get("name"),
+                                               "tickets": count})
+
+        counts = [t["tickets"] for t in entry["charity_types"]]
+        if any(count is None for count in counts):
+            entry["charity_tickets"] = None
+        elif len(counts) > 1 and entry["tickets"] and all(count == entry["tickets"] for count in counts):
+            # Every type reporting the event total means the filter was ignored
+            print(f"   ⚠️ {event_id}: ticket type filter not applied by the API; charity count unknown")
+            entry["charity_tickets"] = None
+        else:
+            entry["charity_tickets"] = sum(counts)
+
+        progress = sync.progress.get("event_progress", {}).get(event_id, {})
+        entry["already_sent"] = len(progress.get("sent_ticket_ids", []))
+        entry["store"] = TicketStore.exists(TicketStore.path_for(sync.region, event_id)) and not self.refresh
+        return entry
+
+    def call_seconds(self, page_size: int) -> float:
+        """Estimated duration of one /tickets call at page_size"""
+        latency = median(self.latencies) if self.latencies else 0.5
+        return latency + page_size * self.per_ticket_ms / 1000
+
+    def recommended_page_size(self, largest_event: int) -> int:
+        """Largest page whose estimated call stays well inside the request timeout"""
+        latency = median(self.latencies) if self.latencies else 0.5
+        budget_ms = (FETCH_TIMEOUT / TIMEOUT_HEADROOM - latency) * 1000
+        fits = int(budget_ms / self.per_ticket_ms) if self.per_ticket_ms > 0 else MAX_PAGE_SIZE
+        size = max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, fits // 100 * 100))
+        return min(size, max(MIN_PAGE_SIZE, math.ceil(largest_event / 100) * 100)) if largest_event else size
+
+    def estimate(self, entry: Dict[str, Any], page_size: int) -> Dict[str, Any]:
+        tickets = entry["tickets"] or 0
+        fetch_calls = 0 if entry["store"] else math.ceil(tickets / page_size) if tickets else 1
+        per_call = max(self.call_seconds(page_size), 1 / self.api_rps)
+        posts = max(0, (entry["charity_tickets"] if entry["charity_tickets"] is not None else tickets) - entry["already_sent"])
+        return {
+            "fetch_calls": fetch_calls,
+            "fetch_seconds": round(fetch_calls * per_call, 1),
+            "webhook_posts": posts,
+            "webhook_seconds": round(posts / self.webhook_rps, 1),
+        }
+
+    def plan(self, targets: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Survey every (region, event_id) and build the plan"""
+        syncs: Dict[str, HistoricalSync] = {}
+        events = []
+        for region, event_id in targets:
+            if region not in syncs:
+                syncs[region] = HistoricalSync(region, index_tickets=False)
+            sync = syncs[region]
+            print(f"🔎 Counting {region} {event_id}...")
+            events.append(self.survey(sync, event_id))
+
+        largest = max((e["tickets"] or 0 for e in events), default=0)
+        page_size = self.recommended_page_size(largest)
+        for entry in events:
+            entry["estimate"] = self.estimate(entry, self.page_size)
+            entry["estimate_recommended"] = self.estimate(entry, page_size)
+
+        totals = {key: sum(e["estimate"][key] for e in events)
+                  for key in ("fetch_calls", "fetch_seconds", "webhook_posts", "webhook_seconds")}
+        fetching = [e for e in events if e["estimate"]["fetch_calls"] > 0]
+        # Events fetched in parallel: enough calls in flight to use the API rate
+        concurrency = max(1, min(len(fetching) or 1, math.ceil(self.api_rps * self.call_seconds(page_size))))
+        batch_size = max(1, int(self.webhook_rps * 60 * self.batch_minutes))
+        largest_posts = max((e["estimate"]["webhook_posts"] for e in events), default=0)
+        if largest_posts:
+            batch_size = min(batch_size, largest_posts)
+
+        return {
+            "events": events,
+            "count_requests": self.count_calls,
+            "measured_latency_s": round(median(self.latencies), 3) if self.latencies else None,
+            "api_rps": self.api_rps,
+            "webhook_rps": round(self.webhook_rps, 4),
+            "page_size": self.page_size,
+            "totals": totals,
+            "recommended": {
+                "page_size": page_size,
+                "fetch_seconds": round(sum(e["estimate_recommended"]["fetch_seconds"] for e in events), 1),
+                "fetch_concurrency": concurrency,
+                "batch_size": batch_size,
+                "runs": sum(math.ceil(e["estimate"]["webhook_posts"] / batch_size) for e in events),
+            },
+        }
+
+
+def print_plan(plan: Dict[str, Any]):
+    print(f"\n{'=' * 60}")
+    print(f"🗺️  SYNC PLAN ({plan['count_requests']} count request(s), median latency "
+          f"{plan['measured_latency_s'] if plan['measured_latency_s'] is not None else '?'}s)")
+    print(f"{'=' * 60}")
+    print(f"{'Region':<10} {'Event':<26} {'Tickets':>8} {'Charity':>8} {'Sent':>6} {'Calls':>6} {'Fetch':>7} "
+          f"{'Posts':>6} {'Webhooks':>9}")
+    for e in plan["events"]:
+        estimate = e["estimate"]
+        charity = "?" if e["charity_tickets"] is None else f"{e['charity_tickets']:,}"
+        calls = "store" if e["store"] else f"{estimate['fetch_calls']:,}"
+        tickets = "?" if e["tickets"] is None else f"{e['tickets']:,}"
+        print(f"{e['region']:<10} {e['event_name'][:26]:<26} {tickets:>8} {charity:>8} {e['already_sent']:>6,} "
+              f"{calls:>6} {format_duration(estimate['fetch_seconds']):>7} {estimate['webhook_posts']:>6,} "
+              f"{format_duration(estimate['webhook_seconds']):>9}")
+        for ticket_type in e["charity_types"]:
+            count = "?" if ticket_type["tickets"] is None else f"{ticket_type['tickets']:,}"
+            print(f"{'':<12}↳ {ticket_type['name'][:32]:<32} {count:>8}")
+
+    totals = plan["totals"]
+    recommended = plan["recommended"]
+    print(f"\n📞 API calls: {totals['fetch_calls']:,} page fetches at top={plan['page_size']} "
+          f"(~{format_duration(totals['fetch_seconds'])} sequential at ≤{plan['api_rps']:g} req/s)")
+    print(f"📬 Webhook posts: ≤{totals['webhook_posts']:,} at {plan['webhook_rps'] * 60:.0f}/min "
+          f"(~{format_duration(totals['webhook_seconds'])})")
+    print(f"⏱️  Expected duration: ~{format_duration(totals['fetch_seconds'] + totals['webhook_seconds'])} "
+          f"(webhook pacing is shared, extra workers don't shorten it)")
+    print(f"\n💡 Recommended:")
+    print(f"   --page-size {recommended['page_size']} (fetch ~{format_duration(recommended['fetch_seconds'])})")
+    print(f"   fetch concurrency {recommended['fetch_concurrency']} "
+          f"(availability_engine.py --concurrency, events fetched in parallel)")
+    print(f"   --batch-size {recommended['batch_size']} → {recommended['runs']} historical_sync.py run(s) "
+          f"of ≤{format_duration(recommended['batch_size'] / plan['webhook_rps'])} each, with --resume")
+
+
+def main():
+    from availability_engine import parse_targets
+
+    parser = argparse.ArgumentParser(description='Estimate API calls, webhook posts and duration before a sync')
+    parser.add_argument('targets', nargs='*', help='REGION or REGION:EVENT_ID (default: every region in .env)')
+    parser.add_argument('--page-size', type=int, default=TICKET_PAGE_SIZE, help=f'Page size to estimate (default: {TICKET_PAGE_SIZE})')
+    parser.add_argument('--per-ticket-ms', type=float, default=DEFAULT_PER_TICKET_MS,
+                        help=f'Transfer/decode time per ticket (default: {DEFAULT_PER_TICKET_MS}; measure with stream_benchmark.py)')
+    parser.add_argument('--api-rps', type=float, default=DEFAULT_RATE, help=f'Vivenu API rate (default: VIVENU_RATE_LIMIT_RPS={DEFAULT_RATE:g})')
+    parser.add_argument('--webhook-rps', type=float, default=WEBHOOK_RATE_LIMIT_RPS, help='Webhook rate (default: one per 1.8s)')
+    parser.add_argument('--batch-minutes', type=float, default=DEFAULT_BATCH_MINUTES,
+                        help=f'Target length of one historical_sync.py run (default: {DEFAULT_BATCH_MINUTES})')
+    parser.add_argument('--refresh', action='store_true', help='Assume tickets are refetched even if a local store exists')
+    parser.add_argument('--json', metavar='FILE', help='Also write the plan as JSON')
+    args = parser.parse_args()
+
+    try:
+        targets = parse_targets(args.targets)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not targets:
+        print("❌ No regions configured. Set <REGION>_API and <REGION>_EVENT in .env")
+        sys.exit(1)
+
+    planner = SyncPlanner(args.page_size, args.per_ticket_ms, args.api_rps, args.webhook_rps,
+                          args.batch_minutes, args.refresh)
+    plan = planner.plan(targets)
+    print_plan(plan)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(plan, f, indent=2)
+        print(f"\n💾 Saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
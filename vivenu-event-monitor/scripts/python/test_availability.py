@@ -10,6 +10,8 @@ import json
 import time
 from datetime import datetime
 
+from phase_profiler import phase, enable_from_argv
+
 # Configuration for local testing
 BASE_URL = "http://localhost:8787"  # Default Wrangler dev server
 TIMEOUT = 30
@@ -158,7 +160,8 @@ def run_all_tests():
     
     for test_name, test_func in tests:
         print(f"\n🧪 Running {test_name}...")
-        results[test_name] = test_func()
+        with phase(test_name):
+            results[test_name] = test_func()
         print_test_result(test_name, results[test_name])
         time.sleep(1)  # Small delay between tests
     
@@ -194,6 +197,7 @@ def run_all_tests():
 
 def interactive_menu():
     """Interactive test menu"""
+    global BASE_URL
     while True:
         print(f"\n{'='*60}")
         print(f"VIVENU AVAILABILITY DASHBOARD - TEST MENU")
@@ -224,7 +228,6 @@ def interactive_menu():
         elif choice == '6':
             run_all_tests()
         elif choice == '7':
-            global BASE_URL
             new_url = input("Enter new base URL (e.g., http://localhost:8787): ").strip()
             if new_url:
                 BASE_URL = new_url
@@ -245,6 +248,7 @@ if __name__ == "__main__":
     
     # Check if we should run all tests or interactive menu
     import sys
+    enable_from_argv("test_availability")  # --profile[=DIR] [--profile-cpu] [--profile-memory]
     if len(sys.argv) > 1 and sys.argv[1] == "--all":
         run_all_tests()
     else:
@@ -2,6 +2,9 @@
 """
 Test vVenue Data Fields API for Atlanta25 Event
 This script tests the data fields configured for checkout on specific ticket types
+
+For every charity ticket type across all configured regions at once, use
+data_fields_matrix.py.
 """
 
 import os
@@ -10,6 +13,9 @@ import requests
 from pathlib import Path
 from dotenv import load_dotenv
 
+from metadata_cache import get_event, get_data_fields, resolve_data_fields, shared_cache
+from phase_profiler import phase, enable_from_argv
+
 # Load environment variables
 env_path = Path(__file__).parent / '.env'
 load_dotenv(env_path)
@@ -22,25 +28,15 @@ USA_API_KEY = os.getenv('USA_API')
 ATLANTA25_EVENT_ID = "6894f94a097ce9a51c15cef4"
 TICKET_TYPE_ID = "6894f94a097ce9a51c15cf20"
 
-def get_headers():
-    """Get authorization headers for API requests"""
-    return {
-        'Authorization': f'Bearer {USA_API_KEY}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
-
 def get_seller_id():
     """Get seller ID from the event"""
-    url = f"{BASE_URL}/events/{ATLANTA25_EVENT_ID}"
-    response = requests.get(url, headers=get_headers())
-    
-    if response.status_code == 200:
-        event_data = response.json()
+    # Same cached lookup as get_ticket_type_details, so the event is fetched once
+    try:
+        event_data = get_event(BASE_URL, ATLANTA25_EVENT_ID, USA_API_KEY, include_tickets=True)
         return event_data.get('sellerId')
-    else:
-        print(f"❌ Failed to get event data: {response.status_code}")
-        print(response.text)
+    except requests.exceptions.HTTPError as e:
+        print(f"❌ Failed to get event data: {e.response.status_code}")
+        print(e.response.text)
         return None
 
 def test_data_fields_resolve(seller_id):
@@ -95,45 +91,40 @@ def test_data_fields_resolve(seller_id):
         url = f"{BASE_URL}/data-fields/resolve"
         
         try:
-            response = requests.get(url, params=test_case['params'], headers=get_headers())
+            print(f"URL: {requests.Request('GET', url, params=test_case['params']).prepare().url}")
             
-            print(f"URL: {response.url}")
-            print(f"Status Code: {response.status_code}")
+            data_fields = resolve_data_fields(BASE_URL, USA_API_KEY, test_case['params'])
             
-            if response.status_code == 200:
-                data_fields = response.json()
+            if not data_fields:
+                print("✅ No data fields configured for this scope/context")
+            else:
+                print(f"\n✅ Found {len(data_fields)} data field(s):")
                 
-                if not data_fields:
-                    print("✅ No data fields configured for this scope/context")
-                else:
-                    print(f"\n✅ Found {len(data_fields)} data field(s):")
+                for idx, field in enumerate(data_fields, 1):
+                    print(f"\n  Field #{idx}:")
+                    print(f"    ID: {field.get('_id', 'N/A')}")
+                    print(f"    Name: {field.get('name', 'N/A')}")
+                    print(f"    Type: {field.get('type', 'N/A')}")
+                    print(f"    Slug: {field.get('slug', 'N/A')}")
                     
-                    for idx, field in enumerate(data_fields, 1):
-                        print(f"\n  Field #{idx}:")
-                        print(f"    ID: {field.get('_id', 'N/A')}")
-                        print(f"    Name: {field.get('name', 'N/A')}")
-                        print(f"    Type: {field.get('type', 'N/A')}")
-                        print(f"    Slug: {field.get('slug', 'N/A')}")
-                        
-                        if field.get('description'):
-                            print(f"    Description: {field.get('description')}")
-                        
-                        if field.get('options'):
-                            print(f"    Options: {', '.join(field.get('options'))}")
-                        
-                        if field.get('title'):
-                            print(f"    Title: {field.get('title')}")
-                        
-                        # Check for any additional fields
-                        known_fields = {'_id', 'name', 'type', 'slug', 'description', 'options', 'title'}
-                        additional = {k: v for k, v in field.items() if k not in known_fields}
-                        if additional:
-                            print(f"    Additional Properties: {json.dumps(additional, indent=6)}")
-                
-            else:
-                print(f"❌ Request failed: {response.status_code}")
-                print(f"Response: {response.text}")
+                    if field.get('description'):
+                        print(f"    Description: {field.get('description')}")
+                    
+                    if field.get('options'):
+                        print(f"    Options: {', '.join(field.get('options'))}")
+                    
+                    if field.get('title'):
+                        print(f"    Title: {field.get('title')}")
+                    
+                    # Check for any additional fields
+                    known_fields = {'_id', 'name', 'type', 'slug', 'description', 'options', 'title'}
+                    additional = {k: v for k, v in field.items() if k not in known_fields}
+                    if additional:
+                        print(f"    Additional Properties: {json.dumps(additional, indent=6)}")
                 
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Request failed: {e.response.status_code}")
+            print(f"Response: {e.response.text}")
         except Exception as e:
             print(f"❌ Error: {str(e)}")
 
@@ -143,56 +134,51 @@ def get_ticket_type_details():
     print(f"TICKET TYPE DETAILS (ID: {TICKET_TYPE_ID})")
     print("="*80)
     
-    url = f"{BASE_URL}/events/{ATLANTA25_EVENT_ID}?include=tickets"
-    
     try:
-        response = requests.get(url, headers=get_headers())
+        event_data = get_event(BASE_URL, ATLANTA25_EVENT_ID, USA_API_KEY, include_tickets=True)
+        tickets = event_data.get('tickets', [])
         
-        if response.status_code == 200:
-            event_data = response.json()
-            tickets = event_data.get('tickets', [])
+        # Find our specific ticket type
+        ticket_type = None
+        for ticket in tickets:
+            if ticket.get('_id') == TICKET_TYPE_ID:
+                ticket_type = ticket
+                break
+        
+        if ticket_type:
+            print(f"\n✅ Found Ticket Type:")
+            print(f"  Name: {ticket_type.get('name', 'N/A')}")
+            print(f"  Price: ${ticket_type.get('price', 0)}")
+            print(f"  Amount/Capacity: {ticket_type.get('amount', 'N/A')}")
+            print(f"  Status: {ticket_type.get('status', 'N/A')}")
             
-            # Find our specific ticket type
-            ticket_type = None
-            for ticket in tickets:
-                if ticket.get('_id') == TICKET_TYPE_ID:
-                    ticket_type = ticket
-                    break
+            # Check if there are data field references
+            if 'dataFields' in ticket_type:
+                print(f"\n  Data Fields References:")
+                print(f"    {json.dumps(ticket_type['dataFields'], indent=6)}")
             
-            if ticket_type:
-                print(f"\n✅ Found Ticket Type:")
-                print(f"  Name: {ticket_type.get('name', 'N/A')}")
-                print(f"  Price: ${ticket_type.get('price', 0)}")
-                print(f"  Amount/Capacity: {ticket_type.get('amount', 'N/A')}")
-                print(f"  Status: {ticket_type.get('status', 'N/A')}")
+            # Check for any field configuration
+            if 'fields' in ticket_type:
+                print(f"\n  Fields Configuration:")
+                print(f"    {json.dumps(ticket_type['fields'], indent=6)}")
                 
-                # Check if there are data field references
-                if 'dataFields' in ticket_type:
-                    print(f"\n  Data Fields References:")
-                    print(f"    {json.dumps(ticket_type['dataFields'], indent=6)}")
-                
-                # Check for any field configuration
-                if 'fields' in ticket_type:
-                    print(f"\n  Fields Configuration:")
-                    print(f"    {json.dumps(ticket_type['fields'], indent=6)}")
-                    
-                # Look for any other field-related properties
-                field_related = {k: v for k, v in ticket_type.items() 
-                               if 'field' in k.lower() or 'data' in k.lower() or 'question' in k.lower()}
-                if field_related:
-                    print(f"\n  Other Field-Related Properties:")
-                    for key, value in field_related.items():
-                        print(f"    {key}: {value}")
-                
-            else:
-                print(f"❌ Ticket type {TICKET_TYPE_ID} not found in event")
-                print(f"\n📋 Available ticket types in this event:")
-                for ticket in tickets:
-                    print(f"  - {ticket.get('name')} (ID: {ticket.get('_id')})")
-        else:
-            print(f"❌ Failed to get event details: {response.status_code}")
-            print(response.text)
+            # Look for any other field-related properties
+            field_related = {k: v for k, v in ticket_type.items() 
+                           if 'field' in k.lower() or 'data' in k.lower() or 'question' in k.lower()}
+            if field_related:
+                print(f"\n  Other Field-Related Properties:")
+                for key, value in field_related.items():
+                    print(f"    {key}: {value}")
             
+        else:
+            print(f"❌ Ticket type {TICKET_TYPE_ID} not found in event")
+            print(f"\n📋 Available ticket types in this event:")
+            for ticket in tickets:
+                print(f"  - {ticket.get('name')} (ID: {ticket.get('_id')})")
+        
+    except requests.exceptions.HTTPError as e:
+        print(f"❌ Failed to get event details: {e.response.status_code}")
+        print(e.response.text)
     except Exception as e:
         print(f"❌ Error: {str(e)}")
 
@@ -202,45 +188,39 @@ def get_all_data_fields(seller_id):
     print("ALL DATA FIELDS FOR SELLER")
     print("="*80)
     
-    url = f"{BASE_URL}/data-fields"
-    
     try:
-        response = requests.get(url, headers=get_headers())
+        all_fields = get_data_fields(BASE_URL, USA_API_KEY)
         
-        if response.status_code == 200:
-            all_fields = response.json()
-            
-            if not all_fields:
-                print("No data fields found for this seller")
-            else:
-                print(f"\n✅ Found {len(all_fields)} total data field(s) for seller:")
-                
-                for idx, field in enumerate(all_fields, 1):
-                    print(f"\n  Field #{idx}:")
-                    print(f"    ID: {field.get('_id', 'N/A')}")
-                    print(f"    Name: {field.get('name', 'N/A')}")
-                    print(f"    Type: {field.get('type', 'N/A')}")
-                    print(f"    Slug: {field.get('slug', 'N/A')}")
-                    
-                    if field.get('title'):
-                        print(f"    Title: {field.get('title')}")
-                    
-                    if field.get('description'):
-                        print(f"    Description: {field.get('description')}")
-                    
-                    if field.get('isPersonalData'):
-                        print(f"    Is Personal Data: {field.get('isPersonalData')}")
-                    
-                    if field.get('options'):
-                        print(f"    Options: {', '.join(field.get('options'))}")
-                    
-                    if field.get('settings'):
-                        print(f"    Settings: {json.dumps(field.get('settings'), indent=6)}")
-                        
+        if not all_fields:
+            print("No data fields found for this seller")
         else:
-            print(f"❌ Failed to get all data fields: {response.status_code}")
-            print(response.text)
+            print(f"\n✅ Found {len(all_fields)} total data field(s) for seller:")
             
+            for idx, field in enumerate(all_fields, 1):
+                print(f"\n  Field #{idx}:")
+                print(f"    ID: {field.get('_id', 'N/A')}")
+                print(f"    Name: {field.get('name', 'N/A')}")
+                print(f"    Type: {field.get('type', 'N/A')}")
+                print(f"    Slug: {field.get('slug', 'N/A')}")
+                
+                if field.get('title'):
+                    print(f"    Title: {field.get('title')}")
+                
+                if field.get('description'):
+                    print(f"    Description: {field.get('description')}")
+                
+                if field.get('isPersonalData'):
+                    print(f"    Is Personal Data: {field.get('isPersonalData')}")
+                
+                if field.get('options'):
+                    print(f"    Options: {', '.join(field.get('options'))}")
+                
+                if field.get('settings'):
+                    print(f"    Settings: {json.dumps(field.get('settings'), indent=6)}")
+        
+    except requests.exceptions.HTTPError as e:
+        print(f"❌ Failed to get all data fields: {e.response.status_code}")
+        print(e.response.text)
     except Exception as e:
         print(f"❌ Error: {str(e)}")
 
@@ -258,7 +238,8 @@ def main():
     
     # Get seller ID first
     print("\n📡 Getting seller ID from event...")
-    seller_id = get_seller_id()
+    with phase("seller_id"):
+        seller_id = get_seller_id()
     
     if not seller_id:
         print("❌ Could not retrieve seller ID. Exiting.")
@@ -267,13 +248,18 @@ def main():
     print(f"✅ Seller ID: {seller_id}")
     
     # Run tests
-    get_ticket_type_details()
-    test_data_fields_resolve(seller_id)
-    get_all_data_fields(seller_id)
+    with phase("ticket_type_details"):
+        get_ticket_type_details()
+    with phase("data_fields_resolve"):
+        test_data_fields_resolve(seller_id)
+    with phase("all_data_fields"):
+        get_all_data_fields(seller_id)
     
+    print(f"\n📦 Metadata cache: {shared_cache().summary()}")
     print("\n" + "="*80)
     print("✅ All tests completed!")
     print("="*80)
 
 if __name__ == "__main__":
+    enable_from_argv("test_data_fields")  # --profile[=DIR] [--profile-cpu] [--profile-memory]
     main()
\ No newline at end of file
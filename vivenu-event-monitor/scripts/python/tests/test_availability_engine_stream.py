@@ -0,0 +1,67 @@
+import json
+
+import requests
+
+import availability_engine
+from availability_engine import stream_tickets
+
+TICKETS = [{"_id": f"t{i:03d}", "ticketName": "HYROX MEN" if i % 3 else "HYROX CHARITY MEN"} for i in range(25)]
+
+
+class FakeResponse:
+    def __init__(self, body, fail_after=None, progress=None):
+        self.status_code = 200
+        self.body = body
+        self.fail_after = fail_after
+        self.progress = progress
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for pos in range(0, len(self.body), 40):
+            if self.fail_after is not None and pos >= self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection broken")
+            if self.progress is not None:
+                self.progress.append(pos)
+            yield self.body[pos:pos + 40]
+
+
+def fake_api(monkeypatch, break_page_at=None):
+    requested, progress = [], []
+    broken = {"done": False}
+
+    def get(url, headers=None, params=None, timeout=None, stream=False):
+        requested.append((params["skip"], params["top"]))
+        page = TICKETS[params["skip"]:params["skip"] + params["top"]]
+        body = json.dumps({"rows": page, "total": len(TICKETS)}).encode()
+        if params["skip"] == break_page_at and not broken["done"]:
+            broken["done"] = True
+            return FakeResponse(body, fail_after=len(body) // 2)
+        return FakeResponse(body, progress=progress)
+
+    monkeypatch.setattr(availability_engine.requests, "get", get)
+    monkeypatch.setattr(availability_engine, "acquire", lambda *args: 0.0)
+    monkeypatch.setattr(availability_engine.time, "sleep", lambda seconds: None)
+    return requested, progress
+
+
+def test_tickets_are_handed_on_before_the_page_is_read(monkeypatch):
+    _, progress = fake_api(monkeypatch)
+    tickets = stream_tickets("https://vivenu.test/api", "key", "e1", page_size=25, quiet=True)
+    assert next(tickets) == TICKETS[0]
+    # Only the first chunks of the only page have been read so far
+    assert len(progress) < 5
+    assert len(list(tickets)) == len(TICKETS) - 1
+
+
+def test_interrupted_page_resumes_without_duplicates(monkeypatch):
+    requested, _ = fake_api(monkeypatch, break_page_at=10)
+    stats, pages = {}, []
+    fetched = list(stream_tickets("https://vivenu.test/api", "key", "e1", page_size=10, stats=stats,
+                                  quiet=True, on_page=lambda: pages.append(stats["fetched"])))
+    assert [t["_id"] for t in fetched] == [t["_id"] for t in TICKETS]
+    assert stats["complete"] and stats["fetched"] == len(TICKETS)
+    assert requested[:2] == [(0, 10), (10, 10)] and 10 < requested[2][0] < 20
+    # The resumed page runs on to the end of the event
+    assert pages == [10, 25]
@@ -0,0 +1,46 @@
+import re
+import json
+from pathlib import Path
+from collections import Counter
+
+import pytest
+
+from availability_engine import SECONDARY_INDICATORS, is_secondary_ticket, build_results, parity_report
+
+FIXTURE = json.loads((Path(__file__).parent / "fixtures" / "parity_event.json").read_text())
+TICKET_SCRAPER = Path(__file__).resolve().parents[3] / "src" / "services" / "ticket-scraper.ts"
+
+
+def ticket_scraper_indicators():
+    source = TICKET_SCRAPER.read_text()
+    block = re.search(r"const secondaryIndicators = \[(.*?)\];", source, re.S).group(1)
+    return re.findall(r"'([^']*)'", block)
+
+
+def test_indicators_match_ticket_scraper():
+    assert SECONDARY_INDICATORS == ticket_scraper_indicators()
+
+
+@pytest.mark.parametrize("name,secondary", sorted(FIXTURE["expected"]["secondary"].items()))
+def test_is_secondary_ticket(name, secondary):
+    assert is_secondary_ticket(name) is secondary
+
+
+def test_build_results_matches_ticket_scraper():
+    counts = Counter(t["ticketName"] for t in FIXTURE["tickets"])
+    results = build_results(FIXTURE["event"], counts)
+    expected = FIXTURE["expected"]
+    assert results["ticket_types"] == expected["ticket_types"]
+    assert results["totals"] == expected["totals"]
+    assert results["charity_validation"] == expected["charity_validation"]
+
+
+def test_parity_report_flags_secondary_types_in_reference():
+    counts = Counter(t["ticketName"] for t in FIXTURE["tickets"])
+    results = build_results(FIXTURE["event"], counts)
+    assert parity_report(results, FIXTURE["expected"]) == []
+
+    stale = json.loads(json.dumps(FIXTURE["expected"]))
+    stale["ticket_types"].append({"id": "t-spectator", "name": "SPECTATOR | Saturday", "capacity": 2000,
+                                  "sold": 6, "available": 1994, "percent_sold": 0.3, "is_secondary": False})
+    assert parity_report(results, stale) == ["SPECTATOR | Saturday: only in reference"]
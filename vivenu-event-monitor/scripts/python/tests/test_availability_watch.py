@@ -0,0 +1,111 @@
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import availability_watch
+from availability_watch import EventWatch, iso_utc
+from ticket_merkle import CREATED_FROM_PARAM
+
+EVENT = {
+    "_id": "event-1",
+    "name": "HYROX Test",
+    "tickets": [
+        {"_id": "type-pro", "name": "HYROX PRO MEN", "amount": 500},
+        {"_id": "type-open", "name": "HYROX WOMEN", "amount": 500},
+        {"_id": "type-spec", "name": "SPECTATOR", "amount": 1000},
+    ],
+}
+TYPE_NAMES = {t["_id"]: t["name"] for t in EVENT["tickets"]}
+
+
+class FakeVivenu:
+    """Just enough of GET /tickets: event filter, ticketTypeId, created-from, top/skip and total"""
+
+    def __init__(self):
+        self.tickets = []
+        self.calls = 0
+        self.next_id = 0
+
+    def sell(self, ticket_type_id, n, seconds_ago=0):
+        created = iso_utc(datetime.now(timezone.utc) - timedelta(seconds=seconds_ago))
+        for _ in range(n):
+            self.next_id += 1
+            self.tickets.append({
+                "_id": f"t{self.next_id:06d}",
+                "ticketTypeId": ticket_type_id,
+                "ticketName": TYPE_NAMES[ticket_type_id],
+                "createdAt": created,
+            })
+
+    def get(self, params):
+        self.calls += 1
+        rows = sorted(self.tickets, key=lambda t: t["createdAt"])
+        if "ticketTypeId" in params:
+            rows = [t for t in rows if t["ticketTypeId"] == params["ticketTypeId"]]
+        if CREATED_FROM_PARAM in params:
+            rows = [t for t in rows if t["createdAt"] >= params[CREATED_FROM_PARAM]]
+        skip, top = params.get("skip", 0), params.get("top", 100)
+        return {"rows": rows[skip:skip + top], "total": len(rows)}
+
+
+@pytest.fixture
+def watch(monkeypatch):
+    monkeypatch.setattr(availability_watch, "get_event", lambda *args, **kwargs: EVENT)
+    server = FakeVivenu()
+    watch = EventWatch("TEST", "event-1", min_interval=15, max_interval=900, target_change=5)
+    watch._get = server.get
+    watch.server = server
+    baselines = []
+    original = watch.baseline
+
+    def counting_baseline():
+        baselines.append(1)
+        original()
+
+    watch.baseline = counting_baseline
+    watch.baselines = baselines
+    return watch
+
+
+def expected_counts(server):
+    return Counter(t["ticketName"] for t in server.tickets if t["ticketTypeId"] != "type-spec")
+
+
+def test_continuous_sales_do_not_rebaseline(watch):
+    server = watch.server
+    # Sold inside the overlap window just before the baseline
+    server.sell("type-pro", 20, seconds_ago=30)
+    server.sell("type-open", 10, seconds_ago=5)
+    assert watch.poll() == []
+    assert watch.counts == expected_counts(server)
+
+    for _ in range(6):
+        server.sell("type-pro", 3)
+        server.sell("type-open", 2)
+        changes = watch.poll()
+        assert {c["ticket_type"]: c["sold"] - c["sold_before"] for c in changes} == {
+            "HYROX PRO MEN": 3, "HYROX WOMEN": 2}
+        assert watch.counts == expected_counts(server)
+
+    assert len(watch.baselines) == 1
+
+
+def test_idle_poll_is_a_single_count(watch):
+    watch.server.sell("type-pro", 5, seconds_ago=10)
+    watch.poll()
+    calls = watch.server.calls
+    assert watch.poll() == []
+    assert watch.server.calls == calls + 1
+    assert len(watch.baselines) == 1
+
+
+def test_deletion_rebaselines(watch):
+    server = watch.server
+    server.sell("type-pro", 10, seconds_ago=10)
+    watch.poll()
+    server.tickets.pop(0)
+    server.sell("type-open", 2)
+    watch.poll()
+    assert len(watch.baselines) == 2
+    assert watch.counts == expected_counts(server)
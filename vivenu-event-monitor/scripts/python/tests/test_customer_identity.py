@@ -0,0 +1,51 @@
+import pytest
+
+from customer_identity import IdentityIndex
+from ticket_index import TicketIndex
+
+
+def ticket(ticket_id, event_id, status="VALID", email="Runner+Paris@Gmail.com",
+           ticket_name="HYROX CHARITY MEN | Saturday", price=150):
+    return {"_id": ticket_id, "eventId": event_id, "email": email, "name": "Zoë Runner",
+            "ticketName": ticket_name, "status": status, "realPrice": price}
+
+
+@pytest.fixture
+def index(tmp_path):
+    db_path = tmp_path / "ticket_index.db"
+    tickets = TicketIndex(db_path)
+    tickets.upsert_tickets([
+        ticket("t1", "e1"),
+        ticket("t2", "e1", status="INVALID", email="r.unner@gmail.com"),
+        ticket("t3", "e2", status="DETAILSREQUIRED", email="runner@googlemail.com"),
+        ticket("t4", "e3", status="CANCELED", email="runner@gmail.com"),
+        ticket("t5", "e1", email="other@example.com", ticket_name="HYROX MEN | Saturday", price=90),
+    ], "e1", "PARIS")
+    tickets.close()
+    identities = IdentityIndex(db_path)
+    identities.build()
+    yield identities
+    identities.close()
+
+
+def test_counts_only_valid_tickets_by_default(index):
+    donors = index.repeat_donors(min_events=2)
+    assert len(donors) == 1
+    assert donors[0]["events"] == 2 and donors[0]["charity_tickets"] == 2
+    # The invalid second ticket at e1 is not a duplicate purchase
+    assert index.duplicates() == []
+    assert sum(row["tickets"] for row in index.totals()) == 3
+
+
+def test_all_statuses_counts_every_ticket(index):
+    donors = index.repeat_donors(min_events=2, all_statuses=True)
+    assert donors[0]["events"] == 3 and donors[0]["charity_tickets"] == 4
+    found = index.duplicates(all_statuses=True)
+    assert [sorted(row["ticket_ids"]) for row in found] == [["t1", "t2"]]
+    assert sum(row["tickets"] for row in index.totals(all_statuses=True)) == 5
+
+
+def test_identity_table_holds_no_plaintext(index):
+    rows = index.conn.execute("SELECT * FROM customer_identities").fetchall()
+    values = {str(value) for row in rows for value in tuple(row)}
+    assert not any("@" in value or "Runner" in value for value in values)
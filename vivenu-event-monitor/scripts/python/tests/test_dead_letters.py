@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import dead_letters
+import historical_sync
+from dead_letters import resolve_ticket, retry_dead_letters
+from historical_sync import HistoricalSync
+from ticket_index import TicketIndex
+from webhook_payload import WebhookPayloads
+
+TICKET = {"_id": "t1", "eventId": "e1", "ticketName": "HYROX CHARITY MEN", "name": "Zoë Müller",
+          "email": "zoe@example.com", "status": "VALID", "history": [{"type": "created"}]}
+
+
+@pytest.fixture
+def sync(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TEST_API", "key")
+    sync = HistoricalSync("TEST")
+    monkeypatch.setattr(sync.rate_limiter, "acquire", lambda *args, **kwargs: 0.0)
+    return sync
+
+
+def capture_posts(monkeypatch):
+    posted = []
+
+    class Response:
+        status_code = 200
+        text = "ok"
+
+    def post(url, data=None, headers=None, timeout=None):
+        posted.append(json.loads(data))
+        return Response()
+
+    monkeypatch.setattr(historical_sync.requests, "post", post)
+    return posted
+
+
+def test_retry_uses_the_live_projection(sync, monkeypatch, tmp_path):
+    manifest = tmp_path / "fields.json"
+    manifest.write_text(json.dumps({"ticket": ["_id", "eventId", "ticketName", "name", "status"]}))
+    sync.payloads = WebhookPayloads(project=True, manifest=manifest)
+    posted = capture_posts(monkeypatch)
+
+    sync.send_webhook(sync.transform_to_webhook(TICKET))
+    sync.dead_letters.record_failure("TEST", TICKET, "timeout", None, "timed out", event_id="e1")
+    results = retry_dead_letters(sync, concurrency=1, tries=1)
+
+    assert results["sent"] == 1 and sync.dead_letters.count("TEST") == 0
+    live, retried = posted
+    assert retried["data"]["ticket"] == live["data"]["ticket"] == sync.payloads.project(TICKET)
+    assert "email" not in retried["data"]["ticket"]
+
+
+def test_legacy_entries_resolve_from_the_default_ticket_index(sync, monkeypatch, tmp_path):
+    index_path = tmp_path / "index" / "tickets.db"
+    index_path.parent.mkdir()
+    with TicketIndex(index_path) as index:
+        index.upsert_tickets([TICKET], "e1", "TEST")
+    monkeypatch.setattr(dead_letters, "TICKET_INDEX_PATH", index_path)
+
+    assert resolve_ticket({"ticket": None, "ticket_id": "t1"}) == TICKET
+    assert resolve_ticket({"ticket": None, "ticket_id": "missing"}) is None
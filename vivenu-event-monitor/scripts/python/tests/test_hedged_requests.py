@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+import hedged_requests
+from hedged_requests import HedgedGetter, MIN_SAMPLES
+
+
+class FakeResponse:
+    def __init__(self, name, body_seconds=0.0):
+        self.name = name
+        self.body_seconds = body_seconds
+        self.closed = threading.Event()
+        self.status_code = 200
+
+    @property
+    def content(self):
+        time.sleep(self.body_seconds)
+        return b"{}"
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture
+def getter():
+    getter = HedgedGetter(budget=0.5)
+    # Enough fast samples that hedging starts after MIN_HEDGE_DELAY
+    getter.window.extend([0.001] * MIN_SAMPLES)
+    yield getter
+    getter.close()
+
+
+def fake_get(monkeypatch, responses):
+    calls = iter(responses)
+    lock = threading.Lock()
+
+    def get(url, **kwargs):
+        with lock:
+            response = next(calls)
+        return response
+
+    monkeypatch.setattr(hedged_requests.requests, "get", get)
+
+
+def test_slow_body_is_hedged_and_the_loser_closed(monkeypatch, getter):
+    # Headers arrive at once for both; only the original's body stalls
+    slow, fast = FakeResponse("original", body_seconds=0.5), FakeResponse("hedge")
+    fake_get(monkeypatch, [slow, fast])
+    getter.requests = 1  # Budget allows a hedge on the next request
+    hedges = []
+
+    assert getter.get("https://vivenu.test/tickets", acquire=lambda: hedges.append(1), stream=True) is fast
+    assert getter.hedges == 1 and getter.hedge_wins == 1 and hedges == [1]
+    assert slow.closed.wait(2) and not fast.closed.is_set()
+
+
+def test_fast_original_wins_without_a_hedge(monkeypatch, getter):
+    fast = FakeResponse("original")
+    fake_get(monkeypatch, [fast])
+    assert getter.get("https://vivenu.test/tickets", stream=True) is fast
+    assert getter.hedges == 0 and not fast.closed.is_set()
+
+
+def test_hedges_stay_within_budget(monkeypatch, getter):
+    responses = [FakeResponse(str(i), body_seconds=0.1) for i in range(20)]
+    fake_get(monkeypatch, responses)
+    # Keep the hedge delay below the body time even as slow samples are learned
+    monkeypatch.setattr(getter, "hedge_delay", lambda: 0.02)
+    for _ in range(6):
+        getter.get("https://vivenu.test/tickets", stream=True)
+    # budget 0.5 of 6 requests: the first request alone can't afford a hedge
+    assert getter.hedges == 3
+    assert getter.summary()["hedge_rate"] == 0.5
@@ -0,0 +1,34 @@
+import sys
+
+import pytest
+
+import historical_sync
+import sync_planner
+
+
+@pytest.mark.parametrize("flags, refresh", [
+    ([], True),
+    (["--refresh"], True),
+    (["--resume"], False),
+    (["--test-batch", "3"], False),
+    (["--resume", "--refresh"], True),
+])
+def test_plan_assumes_a_refetch_unless_the_run_reads_the_store(tmp_path, monkeypatch, flags, refresh):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TEST_API", "key")
+    planners = []
+
+    class FakePlanner:
+        def __init__(self, **kwargs):
+            planners.append(kwargs)
+
+        def plan(self, events):
+            return events
+
+    monkeypatch.setattr(sync_planner, "SyncPlanner", FakePlanner)
+    monkeypatch.setattr(sync_planner, "print_plan", lambda plan: None)
+    monkeypatch.setattr(sys, "argv", ["historical_sync.py", "TEST", "event-1", "--plan", *flags])
+    with pytest.raises(SystemExit) as exit_info:
+        historical_sync.main()
+    assert exit_info.value.code == 0
+    assert planners[0]["refresh"] is refresh
@@ -0,0 +1,72 @@
+from http_trace import TraceRecorder, redact, pseudonym
+
+SALT = b"test-salt"
+
+TICKET = {
+    "_id": "t1",
+    "eventId": "e1",
+    "ticketName": "HYROX CHARITY MEN | Saturday",
+    "categoryName": "Saturday",
+    "status": "VALID",
+    "realPrice": 150,
+    "name": "Zoë Müller",
+    "firstname": "Zoë",
+    "lastname": "Müller",
+    "email": "zoe@example.com",
+    "barcode": "ABC123",
+    "address": {"street": "Hauptstraße 1", "city": "Frankfurt", "postal": "60311"},
+    "birthYear": 1990,
+    "extraFields": {"phone_number": "+49 123", "team_name": "Team Z", "charity": True, "emergency": None},
+}
+
+
+def test_tickets_rows_keep_only_listed_fields():
+    body = {"rows": [TICKET], "total": 1}
+    row = redact(body, "/api/tickets", SALT)["rows"][0]
+    for key in ["_id", "eventId", "ticketName", "categoryName", "status", "realPrice"]:
+        assert row[key] == TICKET[key]
+    assert row["name"] == pseudonym("Zoë Müller", SALT)
+    assert row["email"] == pseudonym("zoe@example.com", SALT)
+    assert row["barcode"] == pseudonym("ABC123", SALT)
+    assert redact(body, "/api/tickets", SALT)["total"] == 1
+
+
+def test_nested_and_unlisted_fields_are_redacted():
+    row = redact({"rows": [TICKET]}, "/api/tickets", SALT)["rows"][0]
+    assert row["address"] == {key: pseudonym(value, SALT) for key, value in TICKET["address"].items()}
+    assert row["birthYear"] == pseudonym(1990, SALT)
+    assert row["extraFields"]["phone_number"] == pseudonym("+49 123", SALT)
+    assert row["extraFields"]["team_name"] == pseudonym("Team Z", SALT)
+    assert row["extraFields"]["charity"] == pseudonym(True, SALT)
+    assert row["extraFields"]["emergency"] is None
+    serialized = repr(row)
+    for secret in ["Hauptstraße", "Frankfurt", "+49", "zoe@", "1990"]:
+        assert secret not in serialized
+
+
+def test_single_ticket_is_redacted():
+    assert redact(TICKET, "/api/tickets/t1", SALT)["email"] == pseudonym("zoe@example.com", SALT)
+
+
+def test_event_and_ticket_type_names_are_kept():
+    event = {
+        "_id": "e1",
+        "name": "HYROX Frankfurt",
+        "tickets": [{"_id": "tt1", "name": "HYROX PRO MEN | Saturday", "amount": 100}],
+        "address": {"city": "Frankfurt"},
+    }
+    assert redact(event, "/api/events/e1", SALT) == event
+    assert redact({"rows": [event], "total": 1}, "/api/events", SALT) == {"rows": [event], "total": 1}
+
+
+def test_pseudonyms_are_stable_within_a_trace_and_salted_per_trace(tmp_path):
+    rows = redact({"rows": [TICKET, TICKET]}, "/api/tickets", SALT)["rows"]
+    assert rows[0]["email"] == rows[1]["email"]
+    assert pseudonym("zoe@example.com", b"other-salt") != rows[0]["email"]
+
+    first = TraceRecorder(tmp_path / "a.jsonl")
+    second = TraceRecorder(tmp_path / "b.jsonl")
+    first.close()
+    second.close()
+    assert first.salt != second.salt
+    assert first.salt.hex() not in (tmp_path / "a.jsonl").read_text()
@@ -0,0 +1,61 @@
+import os
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+from psycopg.conninfo import make_conninfo
+
+from postgres_loader import PostgresLoader
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL not set")
+
+
+def ticket(ticket_id, status="VALID", updated_at="2025-10-01T10:00:00Z"):
+    return {"_id": ticket_id, "eventId": "e1", "ticketTypeId": "tt1", "ticketName": "HYROX CHARITY MEN",
+            "status": status, "name": "Zoë Runner", "email": "zoe@example.com", "realPrice": 150,
+            "createdAt": "2025-09-01T10:00:00Z", "updatedAt": updated_at}
+
+
+@pytest.fixture
+def database_url():
+    # Each test gets its own schema so it never touches real tables
+    schema = f"test_loader_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+    yield make_conninfo(DATABASE_URL, options=f"-c search_path={schema}")
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def rows(database_url, query):
+    with psycopg.connect(database_url) as conn:
+        return conn.execute(query).fetchall()
+
+
+def test_copy_merge_and_idempotent_rerun(database_url):
+    loader = PostgresLoader(database_url)
+    tickets = [
+        ticket("t1"),
+        ticket("t2"),
+        ticket("t3", status="DETAILSREQUIRED"),
+        # Same ticket twice in one load: the latest update wins
+        ticket("t3", status="VALID", updated_at="2025-10-02T10:00:00Z"),
+    ]
+
+    assert loader.load_tickets(iter(tickets), "e1", "PARIS") == {"staged": 4, "merged": 3, "ticket_types": 1}
+    assert rows(database_url, "SELECT ticket_id, status, region FROM tickets ORDER BY ticket_id") == [
+        ("t1", "VALID", "PARIS"), ("t2", "VALID", "PARIS"), ("t3", "VALID", "PARIS")]
+    assert rows(database_url, "SELECT raw->>'email' FROM tickets WHERE ticket_id = 't1'") == [("zoe@example.com",)]
+
+    # Re-running the same load changes nothing
+    assert loader.load_tickets(tickets, "e1", "PARIS")["merged"] == 0
+    assert rows(database_url, "SELECT count(*) FROM tickets") == [(3,)]
+
+    # A changed ticket is updated in place
+    changed = tickets[:1] + [ticket("t2", status="CANCELED", updated_at="2025-10-03T10:00:00Z")]
+    assert loader.load_tickets(changed, "e1", "PARIS")["merged"] == 1
+    assert rows(database_url, "SELECT status FROM tickets WHERE ticket_id = 't2'") == [("CANCELED",)]
+    assert rows(database_url, "SELECT ticket_type_id, ticket_type_name FROM ticket_types") == [
+        ("tt1", "HYROX CHARITY MEN")]
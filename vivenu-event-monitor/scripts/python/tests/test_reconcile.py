@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from reconcile import sorted_merge, check_sorted, reads_loader_table
+
+
+def merge(expected, recorded):
+    missing, extra = [], []
+    for kind, ticket_id in sorted_merge(expected, recorded):
+        (missing if kind == "missing" else extra).append(ticket_id)
+    return missing, extra
+
+
+def test_sorted_merge_matches_set_difference():
+    rng = random.Random(7)
+    for _ in range(200):
+        universe = [f"{rng.getrandbits(48):012x}" for _ in range(rng.randrange(0, 60))]
+        expected = sorted({t for t in universe if rng.random() < 0.7})
+        recorded = sorted({t for t in universe if rng.random() < 0.7})
+        missing, extra = merge(expected, recorded)
+        assert missing == sorted(set(expected) - set(recorded))
+        assert extra == sorted(set(recorded) - set(expected))
+
+
+def test_sorted_merge_empty_sides():
+    assert merge([], []) == ([], [])
+    assert merge(["a", "b"], []) == (["a", "b"], [])
+    assert merge([], ["a", "b"]) == ([], ["a", "b"])
+    assert merge(["a", "b"], ["a", "b"]) == ([], [])
+
+
+def test_check_sorted_passes_sorted_ids_through():
+    ids = ["0a", "0b", "0b", "1c"]
+    assert list(check_sorted(ids, "test")) == ids
+
+
+def test_check_sorted_rejects_out_of_order_ids():
+    with pytest.raises(ValueError, match="out of order"):
+        list(check_sorted(["0a", "1c", "0b"], "test"))
+
+
+def test_check_sorted_uses_bytewise_order():
+    # Postgres' default collation puts "a" before "B"; the merge needs COLLATE "C" order
+    with pytest.raises(ValueError):
+        list(check_sorted(["a", "B"], "test"))
+
+
+@pytest.mark.parametrize("query", [
+    'SELECT ticket_id FROM tickets WHERE event_id = %(event_id)s ORDER BY ticket_id COLLATE "C"',
+    'select ticket_id from public.tickets where event_id = %(event_id)s',
+    'SELECT t.ticket_id FROM webhook_tickets w JOIN "tickets" t USING (ticket_id)',
+    'SELECT ticket_id FROM tickets',
+])
+def test_reads_loader_table(query):
+    assert reads_loader_table(query)
+
+
+@pytest.mark.parametrize("query", [
+    'SELECT ticket_id FROM webhook_tickets WHERE event_id = %(event_id)s ORDER BY ticket_id COLLATE "C"',
+    'SELECT ticket_id FROM tickets_received WHERE event_id = %(event_id)s',
+    'SELECT ticket_id FROM charity_tickets',
+])
+def test_other_tables_are_allowed(query):
+    assert not reads_loader_table(query)
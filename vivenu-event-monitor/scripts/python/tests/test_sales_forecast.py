@@ -0,0 +1,95 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sales_forecast import forecast, load_sales, sales_matrix
+from ticket_index import TicketIndex
+
+BUCKET = 6 * 3600
+EPOCH = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def sold(tmp_path):
+    rng = random.Random(7)
+    tickets = []
+    for i in range(400):
+        created = EPOCH + timedelta(seconds=rng.randrange(30 * 86400))
+        event_id = rng.choice(["e1", "e2"])
+        tickets.append({
+            "_id": f"t{i}", "eventId": event_id, "ticketName": rng.choice(["HYROX MEN", "HYROX CHARITY WOMEN"]),
+            "status": "VALID", "createdAt": created.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        })
+    index = TicketIndex(tmp_path / "ticket_index.db")
+    index.upsert_tickets(tickets, "e1", "PARIS")
+    index.close()
+    return tmp_path / "ticket_index.db", tickets
+
+
+def epoch(ticket):
+    return int(datetime.strptime(ticket["createdAt"][:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+
+
+def test_matrix_matches_per_ticket_counts(sold):
+    db_path, tickets = sold
+    as_of = int((EPOCH + timedelta(days=20)).timestamp())
+    groups, group_ids, bucket_ids, counts = load_sales(db_path, BUCKET, as_of)
+    matrix, start = sales_matrix(group_ids, bucket_ids, counts, len(groups), BUCKET, as_of)
+
+    expected = Counter((t["eventId"], t["ticketName"], epoch(t) // BUCKET) for t in tickets if epoch(t) <= as_of)
+    assert matrix.sum() == sum(expected.values()) < len(tickets)
+    assert start == min(bucket for _, _, bucket in expected) * BUCKET
+    assert matrix.shape[1] == as_of // BUCKET - start // BUCKET + 1
+    for row, (region, event_id, name) in enumerate(groups):
+        assert region == "PARIS"
+        for column in range(matrix.shape[1]):
+            assert matrix[row, column] == expected[(event_id, name, start // BUCKET + column)]
+
+
+def test_filters_by_event(sold):
+    db_path, tickets = sold
+    as_of = int((EPOCH + timedelta(days=40)).timestamp())
+    groups, _, _, counts = load_sales(db_path, BUCKET, as_of, region="paris", event_id="e2")
+    assert {event_id for _, event_id, _ in groups} == {"e2"}
+    assert counts.sum() == sum(1 for t in tickets if t["eventId"] == "e2")
+    assert load_sales(db_path, BUCKET, as_of, region="FRANKFURT")[3].size == 0
+
+
+DAY = 86400
+
+
+def test_forecast_linear_zero_velocity_and_sold_out():
+    start = int(EPOCH.timestamp())
+    as_of = start + 10 * DAY - 1  # During the last of ten daily buckets
+    matrix = np.array([
+        [10] * 10,              # steady 10/day, half of capacity sold
+        [5, 5] + [0] * 8,       # stopped selling
+        [10] * 10,              # crossed capacity 35 on day 4
+        [3] * 10,               # no capacity known
+    ])
+    capacities = np.array([200, 100, 35, 0])
+    result = forecast(matrix, capacities, start, DAY, window_buckets=7, as_of=as_of)
+
+    assert result["sold"].tolist() == [100, 10, 100, 30]
+    assert result["velocity"].tolist() == pytest.approx([10, 0, 10, 3])
+    assert result["peak_velocity"].tolist() == pytest.approx([10, 10 / 7, 10, 3])
+    assert result["remaining"].tolist() == [100, 90, -65, -30]
+    assert result["sold_out"].tolist() == [False, False, True, False]
+
+    # 100 left at 10/day: ten days after as_of
+    assert result["projected"][0] == pytest.approx(as_of + 10 * DAY)
+    assert np.isnan(result["projected"][1])
+    assert result["projected"][2] == start + 4 * DAY
+    assert np.isnan(result["projected"][3])
+
+
+def test_forecast_window_longer_than_history():
+    start = int(EPOCH.timestamp())
+    result = forecast(np.array([[4, 4]]), np.array([10]), start, DAY, window_buckets=7, as_of=start + 2 * DAY - 1)
+    # The window is clipped to the two buckets there are
+    assert result["velocity"].tolist() == pytest.approx([4])
+    assert result["projected"][0] == pytest.approx(start + 2 * DAY - 1 + 0.5 * DAY)
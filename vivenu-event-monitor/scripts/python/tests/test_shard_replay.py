@@ -0,0 +1,83 @@
+import pytest
+
+from historical_sync import HistoricalSync
+from shard_replay import LeaseStore, finalize, ticket_set_key
+from ticket_store import TicketStore
+
+
+class FakeLeaseStore:
+    def __init__(self, sent):
+        self.sent = set(sent)
+
+    def sent_ids(self, run_id, shard=None):
+        return set(self.sent)
+
+
+@pytest.fixture
+def sync(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TEST_API", "key")
+    return HistoricalSync("TEST")
+
+
+def test_finalize_merges_sent_ids_once(sync):
+    sync.progress["event_progress"]["e1"] = {
+        "total_tickets": 5, "processed_tickets": 2, "sent_ticket_ids": ["t1", "t2"],
+        "last_processed_index": 1, "status": "in_progress", "batches_completed": 0,
+    }
+    sync.progress["tickets_sent"] = 2
+    sync.save_progress()
+    for ticket_id in ["t2", "t3", "t9"]:
+        sync.dead_letters.record_failure("TEST", {"_id": ticket_id}, "timeout", None, "timed out", event_id="e1")
+
+    finalize(sync, FakeLeaseStore(["t2", "t3", "t4", "t5"]), "run-1", "e1", total=5)
+
+    progress = sync.load_progress()
+    event = progress["event_progress"]["e1"]
+    assert event["sent_ticket_ids"] == ["t1", "t2", "t3", "t4", "t5"]
+    assert event["processed_tickets"] == 5
+    assert event["status"] == "completed"
+    assert progress["tickets_sent"] == 5
+    # Sent tickets leave the dead-letter queue; the unrelated failure stays
+    assert [row["ticket_id"] for row in sync.dead_letters.pending("TEST")] == ["t9"]
+
+    # Finalizing the same run again changes nothing
+    finalize(sync, FakeLeaseStore(["t2", "t3", "t4", "t5"]), "run-1", "e1", total=5)
+    assert sync.load_progress()["event_progress"]["e1"]["processed_tickets"] == 5
+
+
+def test_finalize_creates_missing_event_progress(sync):
+    finalize(sync, FakeLeaseStore(["b", "a"]), "run-1", "e2", total=3)
+    event = sync.load_progress()["event_progress"]["e2"]
+    assert event["sent_ticket_ids"] == ["a", "b"]
+    assert event["processed_tickets"] == 2
+    assert event["status"] == "in_progress"
+
+
+def test_changed_ticket_set_reopens_finished_shards(tmp_path):
+    store = LeaseStore(str(tmp_path / "leases.db"))
+    store.init_run("run", "TEST", "e1", {0: 2, 1: 3})
+    for _ in range(2):
+        shard = store.claim("run", "w1", 60)
+        store.complete("run", shard, "w1")
+    assert store.claim_finalize("run")
+    assert store.is_finalized("run")
+
+    # Same ticket set: nothing to reopen, the run stays finished
+    assert store.reopen_changed("run", {0: 2, 1: 3}) == []
+    assert store.claim("run", "w1", 60) is None
+
+    # A new ticket in shard 1 reopens only that shard and the run can finalize again
+    assert store.reopen_changed("run", {0: 2, 1: 4}) == [1]
+    assert not store.is_finalized("run")
+    assert store.claim("run", "w1", 60) == 1
+    assert [row[1] for row in store.shards("run")] == [2, 4]
+    assert store.latest_run("TEST", "e1") == "run"
+
+
+def test_run_key_follows_the_ticket_set(tmp_path):
+    first = TicketStore.write(tmp_path / "a", [{"_id": "t1"}, {"_id": "t2"}])
+    same = TicketStore.write(tmp_path / "b", [{"_id": "t1"}, {"_id": "t2"}])
+    more = TicketStore.write(tmp_path / "c", [{"_id": "t1"}, {"_id": "t2"}, {"_id": "t3"}])
+    with first, same, more:
+        assert ticket_set_key(first) == ticket_set_key(same) != ticket_set_key(more)
@@ -0,0 +1,128 @@
+import json
+import random
+
+import pytest
+import requests
+
+import historical_sync
+from historical_sync import HistoricalSync
+from streaming_json import RowStream
+
+
+def sample_body(rng, rows=60):
+    tickets = [
+        {
+            "_id": f"{i:024x}",
+            "name": rng.choice(["Zoë Müller", "Łukasz Kowalski", "Jean-René Dubois", "佐藤 花子", "Anna 🏋️"]),
+            "realPrice": rng.choice([0, 89.5, -1.25e2, 149]),
+            "completed": rng.random() < 0.5,
+            "refund": None,
+            "extraFields": {"team_name": 'Team "Quotes" \\ backslash', "charity": [1, 2.5, {"nested": []}]},
+        }
+        for i in range(rows)
+    ]
+    body = {"rows": tickets, "total": rows, "docs": {"page": 1}}
+    return json.dumps(body, ensure_ascii=False, indent=rng.choice([None, 1])).encode("utf-8"), body
+
+
+def random_chunks(data, rng):
+    chunks, pos = [], 0
+    while pos < len(data):
+        size = rng.choice([1, 2, 3, 7, 64, 500, 4096])
+        chunks.append(data[pos:pos + size])
+        pos += size
+    return chunks
+
+
+def test_random_chunking_matches_json_loads():
+    rng = random.Random(1)
+    for _ in range(50):
+        data, body = sample_body(rng)
+        rows = RowStream(random_chunks(data, rng))
+        assert list(rows) == body["rows"]
+        assert rows.meta == {"total": body["total"], "docs": body["docs"]}
+        assert rows.bytes_read == len(data)
+
+
+def test_read_all_matches_json_loads():
+    data, body = sample_body(random.Random(2))
+    assert RowStream([data]).read_all() == json.loads(data)
+
+
+def test_rows_after_other_keys_and_empty_rows():
+    assert RowStream([b'{"total": 2, "rows": [1, {"a": 2}]}']).read_all() == {"total": 2, "rows": [1, {"a": 2}]}
+    rows = RowStream([b'{"rows": [], "total": 0}'])
+    assert list(rows) == [] and rows.meta == {"total": 0}
+    assert list(RowStream([b"{}"])) == []
+
+
+def test_numbers_split_across_chunks():
+    rows = RowStream([b'{"rows": [-4', b'.5e', b'3, 12', b'0]}'])
+    assert list(rows) == [-4.5e3, 120]
+
+
+def test_every_truncation_raises_json_decode_error():
+    data, body = sample_body(random.Random(3), rows=5)
+    for cut in range(len(data)):
+        rng = random.Random(cut)
+        rows = RowStream(random_chunks(data[:cut], rng))
+        with pytest.raises(json.JSONDecodeError):
+            for _ in rows:
+                pass
+
+
+def test_cut_inside_multibyte_character_raises_json_decode_error():
+    data = '{"rows": [{"name": "Zoë"}], "total": 1}'.encode("utf-8")
+    cut = data.index("ë".encode("utf-8")) + 1
+    with pytest.raises(json.JSONDecodeError):
+        list(RowStream([data[:cut]]))
+
+
+def test_invalid_utf8_raises_json_decode_error():
+    with pytest.raises(json.JSONDecodeError):
+        list(RowStream([b'{"rows": ["\xff\xfe"], "total": 1}']))
+
+
+class FakeResponse:
+    def __init__(self, body, fail_after=None):
+        self.status_code = 200
+        self.body = body
+        self.fail_after = fail_after
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for pos in range(0, len(self.body), 40):
+            if self.fail_after is not None and pos >= self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection broken")
+            yield self.body[pos:pos + 40]
+
+
+def test_interrupted_page_resumes_without_duplicates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TEST_API", "key")
+    monkeypatch.setattr(historical_sync.time, "sleep", lambda seconds: None)
+    sync = HistoricalSync("TEST")
+    monkeypatch.setattr(sync.rate_limiter, "acquire", lambda *args, **kwargs: 0.0)
+    sync.page_size = 10
+
+    tickets = [{"_id": f"t{i:03d}", "ticketName": "HYROX MEN"} for i in range(25)]
+    requested = []
+    broken = {"done": False}
+
+    def fake_get(url, headers=None, params=None, timeout=None, stream=False):
+        requested.append((params["skip"], params["top"]))
+        page = tickets[params["skip"]:params["skip"] + params["top"]]
+        body = json.dumps({"rows": page, "total": len(tickets)}).encode()
+        if params["skip"] == 10 and not broken["done"]:
+            broken["done"] = True
+            return FakeResponse(body, fail_after=len(body) // 2)
+        return FakeResponse(body)
+
+    monkeypatch.setattr(historical_sync.requests, "get", fake_get)
+    fetched = list(sync.iter_tickets_for_event("event-1"))
+    assert [t["_id"] for t in fetched] == [t["_id"] for t in tickets]
+    # The retry of the second page starts after the tickets it had already handed on
+    assert requested[0] == (0, 10) and requested[1] == (10, 10)
+    assert 10 < requested[2][0] < 20
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone, timedelta
+
+from ticket_merkle import (
+    TicketMerkleTree, verify_tree, CREATED_FROM_PARAM, CREATED_UNTIL_PARAM, UPDATED_FROM_PARAM,
+)
+
+BUILT_AT = "2025-06-01T00:00:00.000Z"
+VERIFIED_AT = "2025-06-02T00:00:00.000Z"
+
+
+def make_tickets(days=40, per_day=5):
+    """per_day tickets a day from 1 April 2025, none updated since"""
+    start = datetime(2025, 4, 1, 10, tzinfo=timezone.utc)
+    return [
+        {"_id": f"{day:02d}-{i}", "status": "VALID", "updatedAt": "2025-04-01T10:00:00.000Z",
+         "createdAt": (start + timedelta(days=day)).strftime('%Y-%m-%dT%H:%M:%S.000Z')}
+        for day in range(days) for i in range(per_day)
+    ]
+
+
+class FakeVivenu:
+    def __init__(self, tickets, honour_filters=True):
+        self.tickets = tickets
+        self.honour_filters = honour_filters
+        self.counts = 0
+        self.fetches = 0
+
+    def matching(self, params):
+        if not self.honour_filters:
+            return list(self.tickets)
+        rows = self.tickets
+        if CREATED_FROM_PARAM in params:
+            rows = [t for t in rows if t["createdAt"] >= params[CREATED_FROM_PARAM]]
+        if CREATED_UNTIL_PARAM in params:
+            rows = [t for t in rows if t["createdAt"] <= params[CREATED_UNTIL_PARAM]]
+        if UPDATED_FROM_PARAM in params:
+            rows = [t for t in rows if t["updatedAt"] >= params[UPDATED_FROM_PARAM]]
+        return rows
+
+    def count(self, params):
+        self.counts += 1
+        return len(self.matching(params))
+
+    def fetch(self, params):
+        self.fetches += 1
+        return self.matching(params)
+
+
+def test_unchanged_event_costs_six_requests():
+    tickets = make_tickets()
+    tree = TicketMerkleTree.build("event-1", tickets, BUILT_AT)
+    server = FakeVivenu(tickets)
+    stats = verify_tree(tree, server.count, server.fetch, VERIFIED_AT)
+    assert not stats["failed"]
+    assert stats["changed_leaves"] == []
+    assert server.counts == 6 and server.fetches == 0
+    assert tree.built_at == VERIFIED_AT
+
+
+def test_changed_bucket_is_refetched():
+    tickets = make_tickets()
+    tree = TicketMerkleTree.build("event-1", tickets, BUILT_AT)
+    tickets[7] = {**tickets[7], "status": "INVALID", "updatedAt": "2025-06-01T12:00:00.000Z"}
+    server = FakeVivenu(tickets)
+    stats = verify_tree(tree, server.count, server.fetch, VERIFIED_AT)
+    assert not stats["failed"]
+    assert server.fetches == 1
+    assert [leaf["start"][:10] for leaf in stats["changed_leaves"]] == ["2025-04-02"]
+    assert tree.root["hash"] == TicketMerkleTree.build("event-1", tickets, VERIFIED_AT).root["hash"]
+
+
+def test_ignored_filters_abort_before_descending():
+    tickets = make_tickets()
+    tree = TicketMerkleTree.build("event-1", tickets, BUILT_AT)
+    root = dict(tree.root)
+    server = FakeVivenu(tickets, honour_filters=False)
+    stats = verify_tree(tree, server.count, server.fetch, VERIFIED_AT)
+    assert stats["failed"]
+    assert "ignored the range filter" in stats["error"]
+    assert server.counts == 2 and server.fetches == 0
+    assert tree.root == root and tree.built_at == BUILT_AT
+
+
+def test_range_counting_more_than_total_aborts():
+    tickets = make_tickets()
+    tree = TicketMerkleTree.build("event-1", tickets, BUILT_AT)
+    tickets.append({"_id": "new", "status": "VALID", "createdAt": "2025-05-30T10:00:00.000Z",
+                    "updatedAt": "2025-06-01T12:00:00.000Z"})
+    server = FakeVivenu(tickets)
+    honest = server.count
+
+    def inflated(params):
+        # Empty ranges behave, but ranged counts come back too large
+        count = honest(params)
+        return count * 2 if count and params else count
+
+    stats = verify_tree(tree, inflated, server.fetch, VERIFIED_AT)
+    assert stats["failed"]
+    assert "filters not applied" in stats["error"]
+    assert server.fetches == 0
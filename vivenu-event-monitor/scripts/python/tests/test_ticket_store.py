@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from ticket_store import TicketStore, encode_ticket, META_FILE, DATA_FILE
+
+TICKETS = [
+    {"_id": f"{i:024x}", "ticketName": "HYROX CHARITY MEN", "name": "Zoë Müller", "createdAt": f"2025-06-{i + 1:02d}"}
+    for i in range(10)
+] + [{"_id": "x" * 40, "ticketName": "oversized id"}]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with TicketStore.write(tmp_path / "PARIS" / "e1", TICKETS, meta={"region": "PARIS"}) as store:
+        yield store
+
+
+def test_write_and_read(store):
+    assert len(store) == len(TICKETS)
+    assert store.meta["count"] == len(TICKETS) and store.meta["region"] == "PARIS"
+    assert store[0] == TICKETS[0] and store[-1] == TICKETS[-1]
+    assert list(store) == TICKETS
+    assert store.raw_line(3) == encode_ticket(TICKETS[3])
+    with pytest.raises(IndexError):
+        store.raw_line(len(TICKETS))
+
+
+def test_slices(store):
+    assert store[2:5] == TICKETS[2:5]
+    assert store[::3] == TICKETS[::3]
+    assert store.read(8) == TICKETS[8:]
+    assert store.read_raw(4, 2) == []
+    assert store.read_raw(1, 3) == [encode_ticket(t) for t in TICKETS[1:3]]
+
+
+def test_ticket_ids_come_from_the_index(store):
+    assert [store.ticket_id(i) for i in range(len(store))] == [t["_id"] for t in TICKETS]
+
+
+def test_empty_store(tmp_path):
+    with TicketStore.write(tmp_path / "empty", []) as store:
+        assert len(store) == 0 and list(store) == [] and store[0:5] == []
+
+
+def test_rewrite_replaces_the_whole_store(tmp_path):
+    path = tmp_path / "PARIS" / "e1"
+    TicketStore.write(path, TICKETS).close()
+    with TicketStore.write(path, TICKETS[:2]) as store:
+        assert list(store) == TICKETS[:2]
+    assert sorted(p.name for p in path.parent.iterdir()) == ["e1"]
+
+
+def test_mismatched_files_are_refused(tmp_path):
+    path = tmp_path / "e1"
+    TicketStore.write(path, TICKETS).close()
+    # New data next to an old index, as a crash between separate renames would leave
+    (path / DATA_FILE).write_bytes(b"".join(encode_ticket(t) + b"\n" for t in TICKETS[:3]))
+    with pytest.raises(ValueError):
+        TicketStore(path)
+
+    TicketStore.write(path, TICKETS).close()
+    meta = json.loads((path / META_FILE).read_text())
+    (path / META_FILE).write_text(json.dumps({**meta, "count": 3}))
+    with pytest.raises(ValueError):
+        TicketStore(path)
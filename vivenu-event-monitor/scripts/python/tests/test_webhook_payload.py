@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import hmac
+import json
+import threading
+
+import pytest
+
+import historical_sync
+from historical_sync import HistoricalSync
+from ticket_store import encode_ticket
+from webhook_payload import WebhookPayloads
+
+SECRET = "webhook-secret"
+TICKET = {
+    "_id": "t1", "eventId": "e1", "sellerId": "s1", "ticketName": "HYROX CHARITY MEN", "name": "Zoë Müller",
+    "email": "zoe@example.com", "status": "VALID", "realPrice": 150,
+    "history": [{"type": "created"}] * 20, "cartItemId": "c1", "deliveryMethod": "email",
+}
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    path = tmp_path / "webhook_fields.json"
+    path.write_text(json.dumps({"ticket": ["_id", "eventId", "sellerId", "ticketName", "name", "email", "status"]}))
+    return path
+
+
+def test_projection_keeps_manifest_fields_only(manifest):
+    payloads = WebhookPayloads(project=True, manifest=manifest)
+    projected = payloads.project(TICKET)
+    assert list(projected) == ["_id", "eventId", "sellerId", "ticketName", "name", "email", "status"]
+    assert json.loads(payloads.project_raw(encode_ticket(TICKET))) == projected
+    # Without projection the stored bytes go out untouched
+    assert WebhookPayloads().project_raw(encode_ticket(TICKET)) == encode_ticket(TICKET)
+
+
+def test_gzip_encoding_and_byte_counts():
+    payload = json.dumps({"data": {"ticket": TICKET}}).encode()
+    body, headers = WebhookPayloads(compress=True).encode(payload)
+    assert headers == {"Content-Encoding": "gzip"}
+    assert gzip.decompress(body) == payload
+
+    payloads = WebhookPayloads()
+    assert payloads.encode(payload, full_size=2 * len(payload)) == (payload, {})
+    summary = payloads.summary()
+    assert summary["tickets"] == 1 and summary["wire_bytes_total"] == len(payload)
+    assert summary["saved_percent"] == 50.0
+
+
+def test_signature_covers_the_uncompressed_json(tmp_path, monkeypatch, manifest):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TEST_API", "key")
+    sync = HistoricalSync("TEST")
+    sync.vivenu_secret = SECRET
+    sync.payloads = WebhookPayloads(project=True, compress=True, manifest=manifest)
+    monkeypatch.setattr(sync.rate_limiter, "acquire", lambda *args, **kwargs: 0.0)
+    posted = []
+
+    class Response:
+        status_code = 200
+        text = "ok"
+
+    def post(url, data=None, headers=None, timeout=None):
+        posted.append((data, headers))
+        return Response()
+
+    monkeypatch.setattr(historical_sync.requests, "post", post)
+    assert sync.send_raw_webhook(encode_ticket(TICKET), TICKET)
+
+    body, headers = posted[0]
+    assert headers["Content-Encoding"] == "gzip"
+    # What the worker does: decompress, then verify the HMAC over the JSON it got
+    payload = gzip.decompress(body)
+    expected = hmac.new(SECRET.encode(), payload, hashlib.sha256).hexdigest()
+    assert hmac.compare_digest(headers["x-vivenu-signature"], expected)
+    webhook = json.loads(payload)
+    assert webhook["type"] == "ticket.created" and webhook["sellerId"] == "s1"
+    assert webhook["data"]["ticket"] == sync.payloads.project(TICKET)
+
+
+def test_counters_are_exact_across_threads():
+    payloads = WebhookPayloads()
+    payload = b'{"data":{}}'
+
+    def send():
+        for _ in range(500):
+            payloads.encode(payload, 100)
+
+    threads = [threading.Thread(target=send) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert payloads.tickets == 4000
+    assert payloads.full_bytes == 400000 and payloads.wire_bytes == 4000 * len(payload)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+HYROX Ticket Index - Local SQLite lookup for fetched tickets
+
+historical_sync.py upserts every ticket it fetches (charity or not) into
+ticket_index.db together with the reason it was or wasn't sent. Support
+questions like "why wasn't my charity ticket counted?" can then be answered
+locally in milliseconds instead of rerunning a full fetch.
+
+Usage:
+    python ticket_index.py email <EMAIL>
+    python ticket_index.py barcode <BARCODE>
+    python ticket_index.py name <NAME>              # Substring match
+    python ticket_index.py ticket-type <TICKET_NAME> [--event EVENT_ID]
+    python ticket_index.py id <TICKET_ID>
+    python ticket_index.py not-sent <EVENT_ID>      # Charity tickets never sent
+    python ticket_index.py stats
+
+Sent/not-sent status is read from historical_sync_progress_<REGION>.json
+files in the current directory on every query.
+"""
+
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+DEFAULT_DB_PATH = Path("ticket_index.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id TEXT PRIMARY KEY,
+    event_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    email TEXT,
+    barcode TEXT,
+    name TEXT,
+    ticket_name TEXT,
+    status TEXT,
+    created_at TEXT,
+    rejection_reason TEXT,
+    indexed_at TEXT NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_email ON tickets (email COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_tickets_barcode ON tickets (barcode);
+CREATE INDEX IF NOT EXISTS idx_tickets_name ON tickets (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_tickets_ticket_name ON tickets (ticket_name);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status);
+CREATE INDEX IF NOT EXISTS idx_tickets_event_created ON tickets (event_id, created_at);
+
+CREATE TABLE IF NOT EXISTS sent_tickets (
+    ticket_id TEXT PRIMARY KEY,
+    event_id TEXT NOT NULL,
+    region TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sent_region ON sent_tickets (region);
+"""
+
+SELECT_COLUMNS = """
+    t.ticket_id, t.event_id, t.region, t.email, t.barcode, t.name, t.ticket_name,
+    t.status, t.created_at, t.rejection_reason, t.indexed_at,
+    s.ticket_id IS NOT NULL AS sent
+"""
+
+
+class TicketIndex:
+    """Indexed SQLite mirror of fetched tickets plus the sent_ticket_ids progress"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        # WAL keeps lookups fast while a sync is writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> "TicketIndex":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert_tickets(self, tickets: Iterable[Dict[str, Any]], event_id: str, region: str,
+                       rejection_reason: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None) -> int:
+        """Insert or refresh tickets for an event in a single transaction"""
+        indexed_at = datetime.utcnow().isoformat()
+        rows = []
+        for ticket in tickets:
+            rows.append((
+                ticket.get('_id', ''),
+                ticket.get('eventId') or event_id,
+                region.upper(),
+                ticket.get('email'),
+                ticket.get('barcode'),
+                ticket.get('name'),
+                ticket.get('ticketName'),
+                ticket.get('status'),
+                ticket.get('createdAt'),
+                rejection_reason(ticket) if rejection_reason else None,
+                indexed_at,
+                json.dumps(ticket, separators=(',', ':'))
+            ))
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO tickets (
+                    ticket_id, event_id, region, email, barcode, name, ticket_name,
+                    status, created_at, rejection_reason, indexed_at, raw
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ticket_id) DO UPDATE SET
+                    event_id = excluded.event_id,
+                    region = excluded.region,
+                    email = excluded.email,
+                    barcode = excluded.barcode,
+                    name = excluded.name,
+                    ticket_name = excluded.ticket_name,
+                    status = excluded.status,
+                    created_at = excluded.created_at,
+                    rejection_reason = excluded.rejection_reason,
+                    indexed_at = excluded.indexed_at,
+                    raw = excluded.raw
+            """, rows)
+        return len(rows)
+
+    def sync_sent_ids(self, progress_file: Path) -> int:
+        """Replace the sent set for a region with the ids in its progress file"""
+        progress_file = Path(progress_file)
+        region = progress_file.stem.replace("historical_sync_progress_", "").upper()
+        with open(progress_file, 'r') as f:
+            progress = json.load(f)
+
+        rows = []
+        for event_id, event_progress in progress.get("event_progress", {}).items():
+            for ticket_id in event_progress.get("sent_ticket_ids", []):
+                rows.append((ticket_id, event_id, region))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM sent_tickets WHERE region = ?", (region,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sent_tickets (ticket_id, event_id, region) VALUES (?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def sync_all_progress(self, directory: Path = Path(".")) -> int:
+        """Load sent ids from every historical_sync_progress_<REGION>.json in directory"""
+        total = 0
+        for progress_file in sorted(Path(directory).glob("historical_sync_progress_*.json")):
+            total += self.sync_sent_ids(progress_file)
+        return total
+
+    def _query(self, where: str, params: tuple) -> List[sqlite3.Row]:
+        return self.conn.execute(f"""
+            SELECT {SELECT_COLUMNS}
+            FROM tickets t
+            LEFT JOIN sent_tickets s ON s.ticket_id = t.ticket_id
+            WHERE {where}
+            ORDER BY t.event_id, t.created_at
+        """, params).fetchall()
+
+    def by_id(self, ticket_id: str) -> List[sqlite3.Row]:
+        return self._query("t.ticket_id = ?", (ticket_id,))
+
+    def raw_ticket(self, ticket_id: str) -> Optional[str]:
+        """Full ticket JSON as last fetched, or None if not indexed"""
+        row = self.conn.execute("SELECT raw FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        return row["raw"] if row else None
+
+    def by_email(self, email: str) -> List[sqlite3.Row]:
+        return self._query("t.email = ? COLLATE NOCASE", (email.strip(),))
+
+    def by_barcode(self, barcode: str) -> List[sqlite3.Row]:
+        return self._query("t.barcode = ?", (barcode.strip(),))
+
+    def by_name(self, name: str) -> List[sqlite3.Row]:
+        return self._query("t.name LIKE ? COLLATE NOCASE", (f"%{name.strip()}%",))
+
+    def by_ticket_type(self, ticket_name: str, event_id: Optional[str] = None) -> List[sqlite3.Row]:
+        if event_id:
+            return self._query("t.ticket_name = ? AND t.event_id = ?", (ticket_name, event_id))
+        return self._query("t.ticket_name = ?", (ticket_name,))
+
+    def not_sent(self, event_id: str) -> List[sqlite3.Row]:
+        """Charity tickets that passed the filters but are missing from sent_ticket_ids"""
+        return self._query(
+            "t.event_id = ? AND t.rejection_reason IS NULL AND s.ticket_id IS NULL",
+            (event_id,)
+        )
+
+    def stats(self) -> List[sqlite3.Row]:
+        return self.conn.execute("""
+            SELECT t.region, t.event_id,
+                   COUNT(*) AS total,
+                   SUM(t.rejection_reason IS NULL) AS eligible,
+                   SUM(s.ticket_id IS NOT NULL) AS sent,
+                   MAX(t.indexed_at) AS indexed_at
+            FROM tickets t
+            LEFT JOIN sent_tickets s ON s.ticket_id = t.ticket_id
+            GROUP BY t.region, t.event_id
+            ORDER BY t.region, t.event_id
+        """).fetchall()
+
+
+def print_rows(rows: List[sqlite3.Row]):
+    """Print matching tickets with their sync verdict"""
+    if not rows:
+        print("❌ No matching tickets in the local index")
+        print("   (Tickets are indexed whenever historical_sync.py fetches an event)")
+        return
+
+    print(f"✅ Found {len(rows)} ticket(s):")
+    for row in rows:
+        if row["sent"]:
+            verdict = "✅ SENT"
+        elif row["rejection_reason"]:
+            verdict = f"⚠️  NOT SENT - {row['rejection_reason']}"
+        else:
+            verdict = "⏳ NOT SENT YET - passes filters"
+        print(f"\n  {row['ticket_name']} - {row['name']}")
+        print(f"    ID: {row['ticket_id']}  Barcode: {row['barcode']}")
+        print(f"    Email: {row['email']}")
+        print(f"    Status: {row['status']}  Created: {row['created_at']}")
+        print(f"    Event: {row['event_id']} ({row['region']})  Indexed: {row['indexed_at']}")
+        print(f"    Sync: {verdict}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HYROX local ticket index lookup')
+    parser.add_argument('command', choices=['email', 'barcode', 'name', 'ticket-type', 'id', 'not-sent', 'stats'])
+    parser.add_argument('value', nargs='?', help='Value to look up (event ID for not-sent)')
+    parser.add_argument('--event', help='Restrict ticket-type lookups to one event')
+    parser.add_argument('--db', default=str(DEFAULT_DB_PATH), help=f'Index database (default: {DEFAULT_DB_PATH})')
+    args = parser.parse_args()
+
+    if args.command != 'stats' and not args.value:
+        parser.error(f"{args.command} needs a value")
+
+    if not Path(args.db).exists():
+        print(f"❌ No ticket index at {args.db}")
+        print("Run historical_sync.py for an event first to build it")
+        sys.exit(1)
+
+    with TicketIndex(Path(args.db)) as index:
+        index.sync_all_progress()
+
+        if args.command == 'stats':
+            print(f"{'Region':<12} {'Event':<26} {'Total':>8} {'Eligible':>9} {'Sent':>8}  Indexed")
+            for row in index.stats():
+                print(f"{row['region']:<12} {row['event_id']:<26} {row['total']:>8,} "
+                      f"{row['eligible']:>9,} {row['sent']:>8,}  {row['indexed_at']}")
+            return
+
+        lookups = {
+            'email': index.by_email,
+            'barcode': index.by_barcode,
+            'name': index.by_name,
+            'id': index.by_id,
+            'not-sent': index.not_sent,
+        }
+        if args.command == 'ticket-type':
+            rows = index.by_ticket_type(args.value, args.event)
+        else:
+            rows = lookups[args.command](args.value)
+        print_rows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+HYROX Ticket Hash Tree - Detect what changed in an event since the last sync
+
+historical_sync.py builds a hash tree over every ticket it fetches:
+
+    - Leaves are createdAt day buckets. Each leaf hashes the sorted
+      "_id|status|updatedAt" lines of its tickets and records its count.
+    - Branches hash their two children and cover the union of their ranges.
+      Leaves partition the whole timeline, so every ticket belongs to one.
+
+Verify mode walks the tree top-down with lightweight `top=1` probes: for a
+node's createdAt range it asks Vivenu for the ticket count and the number of
+tickets updated since the tree was built. A node whose count matches and has
+no updates is unchanged and its subtree is skipped, so an untouched event
+costs two requests after the filter check below. Only leaves that still differ
+are fetched in full and rehashed.
+
+The range parameters below aren't documented, so before descending verify
+checks that Vivenu applies them: a future createdAt / updatedAt range and a
+createdAt range ending in 1970 must all count 0, and no range may count more
+than the unfiltered total. If a filter is ignored every probe would return
+the full event and every leaf would be refetched, so verify aborts instead.
+
+Usage:
+    python historical_sync.py <REGION> [EVENT_ID] --verify
+"""
+
+import json
+import hashlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Tuple, Iterable
+
+TREE_ROOT = Path("ticket_trees")
+
+# Vivenu "Get all Tickets" query parameters used for range probes
+CREATED_FROM_PARAM = "from"
+CREATED_UNTIL_PARAM = "until"
+UPDATED_FROM_PARAM = "updatedAt.$gte"
+
+# Ranges no ticket can fall in, to check the filters above are applied
+FAR_FUTURE = "2999-01-01T00:00:00.000Z"
+EPOCH = "1970-01-01T00:00:00.000Z"
+
+
+def ticket_fingerprint(ticket: Dict[str, Any]) -> str:
+    """The fields whose change we care about: identity, refunds/status flips, edits"""
+    return f"{ticket.get('_id', '')}|{ticket.get('status', '')}|{ticket.get('updatedAt', '')}"
+
+
+def hash_fingerprints(fingerprints: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for line in sorted(fingerprints):
+        digest.update(line.encode('utf-8'))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def hash_leaf(tickets: List[Dict[str, Any]]) -> str:
+    return hash_fingerprints(ticket_fingerprint(t) for t in tickets)
+
+
+def hash_branch(left: str, right: str) -> str:
+    return hashlib.sha256(f"{left}{right}".encode('utf-8')).hexdigest()
+
+
+def day_start(created_at: str) -> str:
+    """ISO start of the UTC day a createdAt timestamp falls in"""
+    return f"{created_at[:10]}T00:00:00.000Z"
+
+
+def just_before(iso_timestamp: str) -> str:
+    """The last millisecond before an ISO timestamp (range ends are inclusive)"""
+    moment = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00')) - timedelta(milliseconds=1)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+
+
+class LeafBuckets:
+    """Day-bucketed fingerprints of tickets as they stream in; only the fingerprints are kept"""
+
+    def __init__(self):
+        self.buckets: Dict[str, List[str]] = {}
+
+    def add(self, ticket: Dict[str, Any]):
+        created_at = ticket.get('createdAt') or ''
+        key = day_start(created_at) if created_at else ''
+        self.buckets.setdefault(key, []).append(ticket_fingerprint(ticket))
+
+    def tree(self, event_id: str, built_at: str) -> "TicketMerkleTree":
+        leaves = [
+            {"start": start, "count": len(bucket), "hash": hash_fingerprints(bucket)}
+            for start, bucket in sorted(self.buckets.items())
+        ]
+        return TicketMerkleTree(event_id, built_at, leaves)
+
+
+class TicketMerkleTree:
+    """Hash tree over createdAt day buckets of one event's tickets"""
+
+    def __init__(self, event_id: str, built_at: str, leaves: List[Dict[str, Any]]):
+        self.event_id = event_id
+        self.built_at = built_at
+        # Each leaf: {"start": ISO day start, "count": int, "hash": str}
+        self.leaves = leaves
+        self.levels: List[List[Dict[str, Any]]] = []
+        self.rebuild()
+
+    @classmethod
+    def build(cls, event_id: str, tickets: Iterable[Dict[str, Any]], built_at: str) -> "TicketMerkleTree":
+        """Bucket tickets by createdAt day and hash each bucket"""
+        leaves = LeafBuckets()
+        for ticket in tickets:
+            leaves.add(ticket)
+        return leaves.tree(event_id, built_at)
+
+    def leaf_range(self, index: int) -> Tuple[Optional[str], Optional[str]]:
+        """createdAt range a leaf covers; the first and last leaves are open-ended"""
+        start = self.leaves[index]["start"] if index > 0 else None
+        until = just_before(self.leaves[index + 1]["start"]) if index + 1 < len(self.leaves) else None
+        return start, until
+
+    def rebuild(self):
+        """Recompute branch hashes and counts from the leaves"""
+        level = [
+            {"hash": leaf["hash"], "count": leaf["count"], "first": i, "last": i}
+            for i, leaf in enumerate(self.leaves)
+        ]
+        self.levels = [level]
+        while len(level) > 1:
+            parent = []
+            for i in range(0, len(level), 2):
+                left = level[i]
+                right = level[i + 1] if i + 1 < len(level) else None
+                if right is None:
+                    parent.append(dict(left))
+                    continue
+                parent.append({
+                    "hash": hash_branch(left["hash"], right["hash"]),
+                    "count": left["count"] + right["count"],
+                    "first": left["first"],
+                    "last": right["last"]
+                })
+            level = parent
+            self.levels.append(level)
+
+    @property
+    def root(self) -> Optional[Dict[str, Any]]:
+        return self.levels[-1][0] if self.leaves else None
+
+    def node_range(self, node: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        start, _ = self.leaf_range(node["first"])
+        _, until = self.leaf_range(node["last"])
+        return start, until
+
+    def children(self, depth: int, index: int) -> List[Tuple[int, int]]:
+        """(level, index) of a node's children - level 0 holds the leaves"""
+        child_depth = depth - 1
+        if child_depth < 0:
+            return []
+        first = index * 2
+        return [(child_depth, i) for i in (first, first + 1) if i < len(self.levels[child_depth])]
+
+    @staticmethod
+    def path_for(region: str, event_id: str, root: Path = TREE_ROOT) -> Path:
+        return root / region.upper() / f"{event_id}.json"
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                "event_id": self.event_id,
+                "built_at": self.built_at,
+                "root": self.root["hash"] if self.root else None,
+                "leaves": self.leaves
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: Path) -> "TicketMerkleTree":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data["event_id"], data["built_at"], data["leaves"])
+
+
+def range_params(start: Optional[str], until: Optional[str]) -> Dict[str, str]:
+    params = {}
+    if start:
+        params[CREATED_FROM_PARAM] = start
+    if until:
+        params[CREATED_UNTIL_PARAM] = until
+    return params
+
+
+def range_filter_problem(count_tickets: Callable[[Dict[str, str]], Optional[int]]) -> Optional[str]:
+    """Why the range filters can't be trusted (None if they behave), from three empty-range probes"""
+    probes = {
+        f"{CREATED_FROM_PARAM}={FAR_FUTURE}": {CREATED_FROM_PARAM: FAR_FUTURE},
+        f"{CREATED_UNTIL_PARAM}={EPOCH}": {CREATED_UNTIL_PARAM: EPOCH},
+        f"{UPDATED_FROM_PARAM}={FAR_FUTURE}": {UPDATED_FROM_PARAM: FAR_FUTURE},
+    }
+    for label, params in probes.items():
+        count = count_tickets(params)
+        if count is None:
+            return f"filter check request failed ({label})"
+        if count != 0:
+            return f"Vivenu ignored the range filter: {label} counted {count:,} tickets instead of 0"
+    return None
+
+
+def verify_tree(tree: TicketMerkleTree,
+                count_tickets: Callable[[Dict[str, str]], Optional[int]],
+                fetch_tickets: Callable[[Dict[str, str]], List[Dict[str, Any]]],
+                verified_at: str) -> Dict[str, Any]:
+    """Compare a stored tree with Vivenu using range probes, refetching only differing leaves.
+
+    count_tickets(params) returns the `total` of a top=1 request for the event
+    with params applied (None on failure); fetch_tickets(params) returns every
+    ticket of the event matching params. The tree is updated in place.
+    On failure stats["failed"] is set and stats["error"] says why.
+    """
+    stats = {"probes": 0, "branches_checked": 0, "leaves_refetched": 0, "changed_leaves": [],
+             "failed": False, "error": None}
+    if tree.root is None:
+        return stats
+
+    total = count_tickets({})
+    problem = range_filter_problem(count_tickets) if total is not None else "count request failed"
+    stats["probes"] += 4
+    if problem:
+        stats["failed"] = True
+        stats["error"] = problem
+        return stats
+
+    suspect_leaves: List[int] = []
+    stack = [(len(tree.levels) - 1, 0)]
+    while stack:
+        depth, index = stack.pop()
+        node = tree.levels[depth][index]
+        params = range_params(*tree.node_range(node))
+
+        count = count_tickets(params)
+        changed = count_tickets({**params, UPDATED_FROM_PARAM: tree.built_at})
+        stats["probes"] += 2
+        stats["branches_checked"] += 1
+
+        if count is None or changed is None:
+            stats["failed"] = True
+            stats["error"] = "probe request failed"
+            return stats
+        if count > total or changed > count:
+            stats["failed"] = True
+            stats["error"] = f"range {params} counted {count:,} ({changed:,} updated) of {total:,} tickets - filters not applied"
+            return stats
+
+        if count == node["count"] and changed == 0:
+            continue
+
+        if depth == 0:
+            suspect_leaves.append(index)
+        else:
+            stack.extend(tree.children(depth, index))
+
+    for index in sorted(suspect_leaves):
+        tickets = fetch_tickets(range_params(*tree.leaf_range(index)))
+        stats["leaves_refetched"] += 1
+        leaf = tree.leaves[index]
+        new_hash = hash_leaf(tickets)
+        if new_hash != leaf["hash"] or len(tickets) != leaf["count"]:
+            stats["changed_leaves"].append({
+                "start": leaf["start"],
+                "old_count": leaf["count"],
+                "new_count": len(tickets)
+            })
+            leaf["hash"] = new_hash
+            leaf["count"] = len(tickets)
+
+    tree.rebuild()
+    tree.built_at = verified_at
+    return stats
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+HYROX Ticket Store - Memory-mapped NDJSON store for sorted ticket sets
+
+Writes the filtered, chronologically sorted ticket set of an event once as
+NDJSON (one compact JSON ticket per line) together with a fixed-width offset
+index. Both files are opened with mmap so any index range can be read without
+parsing the rest of the file - this is what lets --resume and --test-batch
+jump straight to last_processed_index without refetching from Vivenu.
+
+Layout (ticket_store/<REGION>/<EVENT_ID>/):
+    tickets.ndjson  # one ticket per line, json.dumps(separators=(',', ':'))
+    tickets.idx     # header + one (offset, ticket_id) record per line
+    meta.json       # region, event id, count, written_at
+
+Usage:
+    python ticket_store.py <REGION> <EVENT_ID>              # Show store summary
+    python ticket_store.py <REGION> <EVENT_ID> <START> [END] # Print raw lines
+"""
+
+import os
+import sys
+import json
+import mmap
+import shutil
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Union
+
+STORE_ROOT = Path("ticket_store")
+
+DATA_FILE = "tickets.ndjson"
+INDEX_FILE = "tickets.idx"
+META_FILE = "meta.json"
+
+# Index header: magic, version, record count
+INDEX_MAGIC = b"VTIX"
+INDEX_HEADER = struct.Struct("<4sHQ")
+# Index record: byte offset of the line, ticket _id (Vivenu ObjectIds are 24 chars)
+INDEX_RECORD = struct.Struct("<Q32s")
+INDEX_VERSION = 1
+
+
+def encode_ticket(ticket: Dict[str, Any]) -> bytes:
+    """Serialize a ticket exactly as send_webhook does, so raw lines can be forwarded as-is"""
+    return json.dumps(ticket, separators=(',', ':')).encode('utf-8')
+
+
+class TicketStore:
+    """Read-only, memory-mapped view over a written ticket set.
+
+    Behaves like a sequence of ticket dicts (len(), indexing, slicing), but
+    only the requested lines are ever parsed.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._data_file = None
+        self._index_file = None
+        self._data: Optional[mmap.mmap] = None
+        self._index: Optional[mmap.mmap] = None
+        self._count = 0
+        self._data_size = 0
+        self.meta: Dict[str, Any] = {}
+        self.open()
+
+    @staticmethod
+    def path_for(region: str, event_id: str, root: Path = STORE_ROOT) -> Path:
+        """Directory holding the store for one region/event"""
+        return root / region.upper() / event_id
+
+    @staticmethod
+    def exists(path: Union[str, Path]) -> bool:
+        """Check whether a complete store has been written at path"""
+        path = Path(path)
+        return all((path / name).exists() for name in (DATA_FILE, INDEX_FILE, META_FILE))
+
+    @classmethod
+    def write(cls, path: Union[str, Path], tickets: Iterable[Dict[str, Any]],
+              meta: Optional[Dict[str, Any]] = None) -> "TicketStore":
+        """Write tickets (already filtered and sorted) and return an opened store.
+
+        All three files are written into a sibling temporary directory that
+        then replaces the store directory. A crash mid-write leaves either the
+        old store or no store at path, never new data with an old index; open()
+        also checks the files against meta.json.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+
+        data_tmp = staging / DATA_FILE
+        index_tmp = staging / INDEX_FILE
+        meta_tmp = staging / META_FILE
+
+        count = 0
+        offset = 0
+        with open(data_tmp, 'wb') as data_f, open(index_tmp, 'wb') as index_f:
+            index_f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0))
+            for ticket in tickets:
+                line = encode_ticket(ticket) + b"\n"
+                ticket_id = str(ticket.get('_id', '')).encode('utf-8')
+                if len(ticket_id) > INDEX_RECORD.size - 8:
+                    # Oversized ids are left blank and resolved from the line itself
+                    ticket_id = b""
+                index_f.write(INDEX_RECORD.pack(offset, ticket_id))
+                data_f.write(line)
+                offset += len(line)
+                count += 1
+            # Patch the record count into the header now that we know it
+            index_f.seek(0)
+            index_f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, count))
+
+        store_meta = dict(meta or {})
+        store_meta.update({
+            "count": count,
+            "bytes": offset,
+            "written_at": datetime.utcnow().isoformat()
+        })
+        with open(meta_tmp, 'w') as f:
+            json.dump(store_meta, f, indent=2)
+
+        # Directory renames are atomic; in between there is briefly no store, which reads as "refetch"
+        retired = path.with_name(f"{path.name}.old-{os.getpid()}")
+        if path.exists():
+            os.replace(path, retired)
+        os.replace(staging, path)
+        shutil.rmtree(retired, ignore_errors=True)
+
+        return cls(path)
+
+    def open(self):
+        """Map the data and index files into memory"""
+        with open(self.path / META_FILE, 'r') as f:
+            self.meta = json.load(f)
+
+        self._index_file = open(self.path / INDEX_FILE, 'rb')
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Unrecognised ticket store index at {self.path / INDEX_FILE}")
+        self._count = count
+
+        self._data_file = open(self.path / DATA_FILE, 'rb')
+        self._data_size = os.fstat(self._data_file.fileno()).st_size
+        # Files from different writes would silently return the wrong slices
+        index_size = INDEX_HEADER.size + count * INDEX_RECORD.size
+        if (self.meta.get("count") != count or self.meta.get("bytes") != self._data_size
+                or len(self._index) != index_size):
+            self.close()
+            raise ValueError(f"Ticket store at {self.path} is inconsistent (meta.json, index and data "
+                             f"disagree) - refetch with --refresh")
+        # mmap refuses zero-length files, an empty store simply has no mapping
+        if self._data_size > 0:
+            self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """Release the memory maps and file handles"""
+        for handle in (self._data, self._index, self._data_file, self._index_file):
+            if handle is not None:
+                handle.close()
+        self._data = self._index = None
+        self._data_file = self._index_file = None
+
+    def __enter__(self) -> "TicketStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, i: int):
+        return INDEX_RECORD.unpack_from(self._index, INDEX_HEADER.size + i * INDEX_RECORD.size)
+
+    def _offset(self, i: int) -> int:
+        if i >= self._count:
+            return self._data_size
+        return self._record(i)[0]
+
+    def _normalize(self, i: int) -> int:
+        if i < 0:
+            i += self._count
+        if i < 0 or i >= self._count:
+            raise IndexError(f"Ticket index {i} out of range (store has {self._count})")
+        return i
+
+    def raw_line(self, i: int) -> bytes:
+        """Raw JSON bytes of ticket i (without the trailing newline)"""
+        i = self._normalize(i)
+        start = self._offset(i)
+        end = self._offset(i + 1) - 1
+        return self._data[start:end]
+
+    def read_raw(self, start: int, stop: Optional[int] = None) -> List[bytes]:
+        """Raw JSON bytes for tickets [start, stop) - O(slice), nothing else is touched"""
+        start, stop, _ = slice(start, stop).indices(self._count)
+        if start >= stop:
+            return []
+        # One contiguous read for the whole range, split on the known offsets
+        base = self._offset(start)
+        block = self._data[base:self._offset(stop)]
+        lines = []
+        for i in range(start, stop):
+            line_start = self._offset(i) - base
+            line_end = self._offset(i + 1) - base - 1
+            lines.append(block[line_start:line_end])
+        return lines
+
+    def read(self, start: int, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Parsed tickets for [start, stop)"""
+        return [json.loads(line) for line in self.read_raw(start, stop)]
+
+    def ticket_id(self, i: int) -> str:
+        """Ticket _id of ticket i straight from the index"""
+        i = self._normalize(i)
+        ticket_id = self._record(i)[1].rstrip(b"\x00").decode('utf-8')
+        if not ticket_id:
+            ticket_id = json.loads(self.raw_line(i)).get('_id', '')
+        return ticket_id
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self.read(start, stop)
+        return json.loads(self.raw_line(key))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._count):
+            yield self[i]
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python ticket_store.py <REGION> <EVENT_ID> [START] [END]")
+        sys.exit(1)
+
+    region, event_id = sys.argv[1], sys.argv[2]
+    path = TicketStore.path_for(region, event_id)
+    if not TicketStore.exists(path):
+        print(f"❌ No ticket store found at {path}")
+        print(f"Run 'python historical_sync.py {region.upper()} {event_id} --dry-run' to build it")
+        sys.exit(1)
+
+    with TicketStore(path) as store:
+        if len(sys.argv) < 4:
+            print(f"📦 Ticket store: {path}")
+            print(f"   Tickets: {len(store):,}")
+            print(f"   Size: {store.meta.get('bytes', 0):,} bytes")
+            print(f"   Written at: {store.meta.get('written_at', 'unknown')}")
+            return
+
+        start = int(sys.argv[3])
+        end = int(sys.argv[4]) if len(sys.argv) > 4 else start + 1
+        for i, line in enumerate(store.read_raw(start, end), start):
+            print(f"[{i}] {line.decode('utf-8')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+HYROX Webhook Payload - Field projection and gzip for replayed webhooks
+
+By default every replayed webhook carries the full Vivenu ticket object,
+uncompressed. Two opt-in reductions, usable separately or together:
+
+    - Projection: only the ticket fields listed in webhook_fields.json (the
+      manifest of what the worker's ticket.created handler reads) are sent.
+      The envelope (id, sellerId, webhookId, type, mode) is unchanged.
+    - Gzip: the request body is gzip-compressed and sent with
+      Content-Encoding: gzip. The x-vivenu-signature HMAC is still computed
+      over the uncompressed JSON, so the worker must decompress first and
+      then verify.
+
+historical_sync.py and shard_replay.py take --project / --gzip (or
+WEBHOOK_PROJECTION=1 / WEBHOOK_GZIP=1 in .env) and print bytes per ticket
+before and after at the end of a run. This script estimates the same numbers
+from a local ticket store without sending anything.
+
+Usage:
+    python webhook_payload.py <REGION> <EVENT_ID> [--manifest FILE] [--sample N]
+"""
+
+import os
+import sys
+import gzip
+import json
+import uuid
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from ticket_store import TicketStore
+
+MANIFEST_PATH = Path(__file__).parent / "webhook_fields.json"
+GZIP_LEVEL = 6
+
+
+def sample_payload(raw_ticket: bytes, seller_id: str = "") -> bytes:
+    """A webhook body shaped like HistoricalSync.build_raw_webhook_payload, for size estimates"""
+    webhook_id = str(uuid.uuid4())
+    envelope = json.dumps({"id": webhook_id, "sellerId": seller_id, "webhookId": f"historical-sync-{webhook_id[:8]}",
+                           "type": "ticket.created", "mode": "prod"}, separators=(',', ':'))
+    return envelope[:-1].encode('utf-8') + b',"data":{"ticket":' + raw_ticket + b'}}'
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> List[str]:
+    with open(path, 'r') as f:
+        return json.load(f)["ticket"]
+
+
+def env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+class WebhookPayloads:
+    """Shapes webhook bodies (projection, gzip) and counts bytes per ticket"""
+
+    def __init__(self, project: bool = False, compress: bool = False, manifest: Path = MANIFEST_PATH):
+        self.fields = load_manifest(manifest) if project else None
+        self.compress = compress
+        # shard_replay.py and the priority queue send from worker threads
+        self.lock = threading.Lock()
+        self.tickets = 0
+        self.full_bytes = 0
+        self.json_bytes = 0
+        self.wire_bytes = 0
+
+    def project(self, ticket: Dict[str, Any]) -> Dict[str, Any]:
+        if self.fields is None:
+            return ticket
+        return {field: ticket[field] for field in self.fields if field in ticket}
+
+    def project_raw(self, raw_ticket: bytes) -> bytes:
+        """Projected ticket bytes from a stored NDJSON line (unchanged without projection)"""
+        if self.fields is None:
+            return raw_ticket
+        return json.dumps(self.project(json.loads(raw_ticket)), separators=(',', ':')).encode('utf-8')
+
+    def encode(self, payload: bytes, full_size: Optional[int] = None) -> Tuple[bytes, Dict[str, str]]:
+        """Wire body and extra headers for a signed JSON payload; records byte counts"""
+        body = gzip.compress(payload, compresslevel=GZIP_LEVEL) if self.compress else payload
+        with self.lock:
+            self.tickets += 1
+            self.full_bytes += full_size if full_size is not None else len(payload)
+            self.json_bytes += len(payload)
+            self.wire_bytes += len(body)
+        return body, ({"Content-Encoding": "gzip"} if self.compress else {})
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            tickets, full_bytes, json_bytes, wire_bytes = self.tickets, self.full_bytes, self.json_bytes, self.wire_bytes
+        per_ticket = lambda total: round(total / tickets) if tickets else 0
+        return {
+            "tickets": tickets,
+            "projection": self.fields is not None,
+            "gzip": self.compress,
+            "full_bytes_per_ticket": per_ticket(full_bytes),
+            "json_bytes_per_ticket": per_ticket(json_bytes),
+            "wire_bytes_per_ticket": per_ticket(wire_bytes),
+            "wire_bytes_total": wire_bytes,
+            "saved_percent": round(100 * (1 - wire_bytes / full_bytes), 1) if full_bytes else 0.0,
+        }
+
+    def print_report(self):
+        if not self.tickets:
+            return
+        s = self.summary()
+        modes = " + ".join(m for m, on in (("projection", s["projection"]), ("gzip", s["gzip"])) if on) or "full payload"
+        print(f"\n📦 Webhook bytes per ticket ({modes}, {s['tickets']:,} sent):")
+        print(f"   Full payload: {s['full_bytes_per_ticket']:,} B")
+        if s["projection"]:
+            print(f"   Projected:    {s['json_bytes_per_ticket']:,} B")
+        print(f"   On the wire:  {s['wire_bytes_per_ticket']:,} B ({s['saved_percent']:.1f}% less, {s['wire_bytes_total']:,} B total)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate webhook bytes per ticket with projection and gzip')
+    parser.add_argument('region', help='Region code (e.g., PARIS, FRANKFURT)')
+    parser.add_argument('event_id', help='Event ID with a local ticket store')
+    parser.add_argument('--manifest', default=str(MANIFEST_PATH), help='Field manifest (default: webhook_fields.json)')
+    parser.add_argument('--sample', type=int, help='Only the first N tickets')
+    args = parser.parse_args()
+
+    path = TicketStore.path_for(args.region, args.event_id)
+    if not TicketStore.exists(path):
+        print(f"❌ No ticket store found at {path}")
+        print(f"Run 'python historical_sync.py {args.region.upper()} {args.event_id} --dry-run' to build it")
+        sys.exit(1)
+
+    modes = {
+        "full": WebhookPayloads(),
+        "gzip": WebhookPayloads(compress=True),
+        "projection": WebhookPayloads(project=True, manifest=Path(args.manifest)),
+        "projection + gzip": WebhookPayloads(project=True, compress=True, manifest=Path(args.manifest)),
+    }
+    with TicketStore(path) as store:
+        count = min(len(store), args.sample or len(store))
+        for raw in store.read_raw(0, count):
+            full_size = len(sample_payload(raw))
+            for payloads in modes.values():
+                payloads.encode(sample_payload(payloads.project_raw(raw)), full_size)
+
+    if not count:
+        print("No tickets in the store")
+        return
+    print(f"📦 Webhook bytes per ticket, {args.region.upper()} {args.event_id} ({count:,} tickets)")
+    for mode, payloads in modes.items():
+        s = payloads.summary()
+        print(f"   {mode:<18} {s['wire_bytes_per_ticket']:>7,} B  {s['wire_bytes_total']:>12,} B total  "
+              f"({s['saved_percent']:.1f}% less)")
+
+
+if __name__ == "__main__":
+    main()
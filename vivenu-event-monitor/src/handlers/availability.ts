@@ -265,6 +265,38 @@ async function handleDashboardData(
   }
 }
 
+/**
+ * Comprehensive availability (full ticket scraping) for one event.
+ *
+ * Shared by the one-shot dashboard export and chunked export jobs.
+ *
+ * @throws {Error} If the region isn't configured or scraping fails
+ */
+export async function scrapeEventAvailability(env: Env, region: string, eventId: string): Promise<EventAvailability> {
+  // Get the API key from environment for this region
+  const regionConfig = REGIONS.find(r => r.name === region && r.enabled);
+  if (!regionConfig) {
+    throw new Error(`No region configuration found for ${region}`);
+  }
+
+  const apiKey = env[regionConfig.apiKey as keyof Env] as string;
+  if (!apiKey) {
+    throw new Error(`No API key configured for region ${region} (missing ${regionConfig.apiKey})`);
+  }
+
+  // Create AvailabilityService for this region to get comprehensive scraping
+  const availabilityService = new AvailabilityService(
+    region,
+    apiKey,
+    regionConfig.baseUrl,
+    env.KV || null,
+    env
+  );
+
+  // Get comprehensive availability with ticket scraping
+  return await availabilityService.getEventAvailability(eventId, false);
+}
+
 async function handleDashboardExport(
   request: Request,
   env: Env,
@@ -310,29 +342,7 @@ async function handleDashboardExport(
         // Use comprehensive ticket scraping for accurate data
         const eventsPromises = allKVEvents.map(async ({ event, region, client }) => {
           try {
-            // Get the API key from environment for this region
-            const regionConfig = REGIONS.find(r => r.name === region && r.enabled);
-            if (!regionConfig) {
-              throw new Error(`No region configuration found for ${region}`);
-            }
-            
-            const apiKey = env[regionConfig.apiKey as keyof Env] as string;
-            if (!apiKey) {
-              throw new Error(`No API key configured for region ${region} (missing ${regionConfig.apiKey})`);
-            }
-            
-            // Create AvailabilityService for this region to get comprehensive scraping
-            const availabilityService = new AvailabilityService(
-              region, 
-              apiKey, 
-              regionConfig.baseUrl,
-              env.KV || null,
-              env
-            );
-            
-            // Get comprehensive availability with ticket scraping
-            const availability = await availabilityService.getEventAvailability(event._id, false);
-            return availability;
+            return await scrapeEventAvailability(env, region, event._id);
           } catch (error) {
             const errorMsg = `Comprehensive ticket scraping FAILED for ${event.name} (${event._id}) in ${region}: ${(error as Error).message}`;
             log('error', errorMsg, {
@@ -0,0 +1,201 @@
+import { Env } from '../types/env';
+import { EventAvailability } from '../types/availability';
+import { PostgresClient } from '../services/postgres';
+import { ExportJobStore, ExportJobStatus, DEFAULT_CHUNK_SIZE } from '../services/export-jobs';
+import { discoverKVEventsAcrossRegions } from '../services/vivenu';
+import { log } from '../services/validation';
+import { scrapeEventAvailability } from './availability';
+
+const MAX_CHUNK_SIZE = 25;
+
+/**
+ * Handles chunked PostgreSQL export jobs.
+ *
+ * Unlike /api/dashboard/export-to-sheets?format=postgres, which scrapes every
+ * event inside one request, a job is submitted once and processed a chunk of
+ * events at a time. Each chunk is committed separately, so one slow or failing
+ * event doesn't lose the rest of the export.
+ *
+ * Routes:
+ *   POST /api/export-jobs?chunkSize=N      Discover events and create a job (202)
+ *   GET  /api/export-jobs/{jobId}          Job progress
+ *   POST /api/export-jobs/{jobId}/chunk    Process the next chunk, then return progress
+ *
+ * Clients (scripts/python/export_job.py) call /chunk until the job completes;
+ * several callers may run in parallel since chunks are claimed atomically.
+ */
+export async function handleExportJobRequest(
+  request: Request,
+  env: Env,
+  ctx: ExecutionContext
+): Promise<Response> {
+  const url = new URL(request.url);
+  const pathParts = url.pathname.split('/').filter(Boolean);
+  const jobId = pathParts[2];
+
+  if (!env.DATABASE_URL) {
+    return jsonResponse({ status: 'failed', error: 'DATABASE_URL not configured' }, 500);
+  }
+  const store = new ExportJobStore(env.DATABASE_URL);
+
+  try {
+    if (!jobId) {
+      if (request.method !== 'POST') {
+        return jsonResponse({ error: 'Method not allowed', message: 'POST /api/export-jobs to submit a job' }, 405);
+      }
+      const requested = parseInt(url.searchParams.get('chunkSize') || '', 10);
+      const chunkSize = Math.min(MAX_CHUNK_SIZE, requested > 0 ? requested : DEFAULT_CHUNK_SIZE);
+      const newJobId = await submitExportJob(env, store, chunkSize);
+      const status = await store.getStatus(newJobId);
+      return jsonResponse({
+        ...status,
+        statusUrl: `/api/export-jobs/${newJobId}`,
+        chunkUrl: `/api/export-jobs/${newJobId}/chunk`
+      }, 202);
+    }
+
+    const status = await store.getStatus(jobId);
+    if (!status) {
+      return jsonResponse({ error: 'Job not found', jobId }, 404);
+    }
+
+    if (pathParts[3] === 'chunk') {
+      if (request.method !== 'POST') {
+        return jsonResponse({ error: 'Method not allowed', message: 'POST to process the next chunk' }, 405);
+      }
+      const chunk = await processNextChunk(env, store, jobId, status.chunkSize);
+      return jsonResponse({ ...(await store.getStatus(jobId)), chunk });
+    }
+
+    return jsonResponse(status);
+  } catch (error) {
+    log('error', 'Export job request failed', {
+      jobId,
+      error: (error as Error).message
+    });
+    return jsonResponse({ status: 'failed', error: (error as Error).message }, 500);
+  }
+}
+
+/**
+ * Discovers every KV-listed event across regions and records a job for them.
+ *
+ * @returns The new job ID
+ */
+export async function submitExportJob(env: Env, store: ExportJobStore, chunkSize: number = DEFAULT_CHUNK_SIZE): Promise<string> {
+  const discovered = await discoverKVEventsAcrossRegions(env);
+  if (discovered.length === 0) {
+    log('warn', 'No events found from KV store in any region - export job will be empty');
+  }
+  return await store.createJob(
+    discovered.map(({ event, region }) => ({ eventId: event._id, region, eventName: event.name })),
+    chunkSize
+  );
+}
+
+/**
+ * Claims, scrapes and commits one chunk of a job.
+ *
+ * Events are scraped in parallel; the ones that succeed are written with a
+ * single PostgresClient.writeSnapshot transaction. Failed events go back to
+ * the queue until they run out of attempts. A chunk where every event shows
+ * 0 sold is deferred until the job has exported sales, and fails only if the
+ * whole job has none.
+ */
+export async function processNextChunk(
+  env: Env,
+  store: ExportJobStore,
+  jobId: string,
+  chunkSize: number
+): Promise<{ claimed: number; exported: number; failed: number; deferred: number }> {
+  const events = await store.claimChunk(jobId, chunkSize);
+  if (events.length === 0) {
+    return { claimed: 0, exported: 0, failed: 0, deferred: 0 };
+  }
+
+  const results = await Promise.allSettled(
+    events.map(({ region, eventId }) => scrapeEventAvailability(env, region, eventId))
+  );
+
+  const scraped: EventAvailability[] = [];
+  const failures: { eventId: string; error: string }[] = [];
+  results.forEach((result, i) => {
+    const { eventId, region, eventName } = events[i];
+    if (result.status === 'fulfilled') {
+      scraped.push(result.value);
+    } else {
+      const error = `Comprehensive ticket scraping FAILED for ${eventName} (${eventId}) in ${region}: ${(result.reason as Error).message}`;
+      log('error', error, { jobId, eventId, region });
+      failures.push({ eventId, error });
+    }
+  });
+
+  // Same guard as the one-shot export, across the whole job: if no event in the job shows any sales,
+  // scraping fell back to the basic API. New events with no sales yet are normal, so an all-zero chunk
+  // waits at the back of the queue until the rest of the job shows whether anything sold.
+  let exported: EventAvailability[] = scraped;
+  let deferred = 0;
+  if (scraped.length > 0 && scraped.every(event => event.totals.sold === 0) && !(await store.hasExportedSales(jobId))) {
+    const deferredIds = await store.deferEvents(jobId, scraped.map(event => event.eventId));
+    deferred = deferredIds.length;
+    const undeferrable = scraped.filter(event => !deferredIds.includes(event.eventId));
+    if (undeferrable.length > 0) {
+      const error = `CRITICAL: No event in this export job shows any tickets sold. Comprehensive ticket scraping has failed. Events not exported to prevent misleading data.`;
+      log('error', error, { jobId, events: undeferrable.length });
+      failures.push(...undeferrable.map(event => ({ eventId: event.eventId, error })));
+    }
+    if (deferred > 0) {
+      log('info', `Export job ${jobId}: ${deferred} events with 0 sold deferred until the job shows sales`);
+    }
+    exported = [];
+  }
+
+  if (exported.length > 0) {
+    try {
+      const postgres = new PostgresClient(env.DATABASE_URL as string);
+      await postgres.writeSnapshot(exported);
+      await store.markDone(jobId, exported.map(event => ({
+        eventId: event.eventId,
+        ticketTypes: event.ticketTypes.length,
+        totalSold: event.totals.sold
+      })));
+    } catch (error) {
+      const message = `PostgreSQL write failed: ${(error as Error).message}`;
+      failures.push(...exported.map(event => ({ eventId: event.eventId, error: message })));
+      exported = [];
+    }
+  }
+
+  for (const failure of failures) {
+    await store.markFailed(jobId, failure.eventId, failure.error);
+  }
+
+  log('info', `Export job ${jobId}: chunk of ${events.length} events processed`, {
+    exported: exported.length,
+    failed: failures.length,
+    deferred
+  });
+  return { claimed: events.length, exported: exported.length, failed: failures.length, deferred };
+}
+
+/**
+ * Runs a job to completion in this invocation, one committed chunk at a time.
+ *
+ * Used by the cron trigger, which has enough wall time to work through every chunk.
+ */
+export async function runExportJob(env: Env, store: ExportJobStore, jobId: string): Promise<ExportJobStatus | null> {
+  const status = await store.getStatus(jobId);
+  if (!status) return null;
+
+  while ((await processNextChunk(env, store, jobId, status.chunkSize)).claimed > 0) {
+    // Keep claiming until no pending (or retryable) events remain
+  }
+  return await store.getStatus(jobId);
+}
+
+function jsonResponse(body: unknown, status: number = 200): Response {
+  return new Response(JSON.stringify(body, null, 2), {
+    status,
+    headers: { 'Content-Type': 'application/json' }
+  });
+}
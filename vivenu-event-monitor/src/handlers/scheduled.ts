@@ -1,5 +1,6 @@
 import { Env } from '../types/env';
-import { handleAvailabilityRequest } from './availability';
+import { ExportJobStore } from '../services/export-jobs';
+import { submitExportJob, runExportJob } from './export-jobs';
 
 /**
  * Handles scheduled cron triggers for automated event data collection.
@@ -10,6 +11,9 @@ import { handleAvailabilityRequest } from './availability';
  * Uses comprehensive ticket scraping for accurate sold counts rather than
  * basic API calls that return misleading zero values.
  * 
+ * The export runs as a chunked job (handlers/export-jobs.ts): each chunk of
+ * events is committed on its own, so one failing event doesn't lose the rest.
+ * 
  * @param controller - Cloudflare scheduled controller
  * @param env - Environment variables and secrets
  * @param ctx - Execution context
@@ -19,18 +23,24 @@ export async function handleScheduled(controller: ScheduledController, env: Env,
   console.log(JSON.stringify({ level: 'info', message: 'Scheduled trigger executed', scheduledTime: when }));
 
   try {
-    // Primary export: PostgreSQL database using comprehensive ticket scraping
-    const request = new Request('http://internal/api/dashboard/export-to-sheets?source=vivenu&format=postgres', { method: 'POST' });
-    const response = await handleAvailabilityRequest(request, env, ctx);
+    // Primary export: PostgreSQL database using comprehensive ticket scraping, one chunk at a time
+    if (!env.DATABASE_URL) {
+      throw new Error('DATABASE_URL not configured');
+    }
+    const store = new ExportJobStore(env.DATABASE_URL);
+    const jobId = await submitExportJob(env, store);
+    const status = await runExportJob(env, store, jobId);
 
-    const text = await response.text();
     console.log(JSON.stringify({ 
-      level: 'info', 
-      message: 'Scheduled PostgreSQL export response', 
-      status: response.status, 
+      level: status?.status === 'completed' ? 'info' : 'error', 
+      message: 'Scheduled PostgreSQL export job finished', 
       source: 'vivenu',
       format: 'postgres',
-      body: text 
+      jobId,
+      status: status?.status,
+      done: status?.done,
+      failed: status?.failed,
+      failures: status?.failures
     }));
   } catch (error) {
     console.log(JSON.stringify({ 
@@ -1,6 +1,7 @@
 import { Env } from './types/env';
 import { handleScheduled } from './handlers/scheduled';
 import { handleAvailabilityRequest } from './handlers/availability';
+import { handleExportJobRequest } from './handlers/export-jobs';
 import { EventTracker } from './services/tracking';
 import { GoogleSheetsClient } from './services/sheets';
 import { createVivenuClients, getEventIdsFromKV, discoverKVEventsAcrossRegions } from './services/vivenu';
@@ -68,6 +69,11 @@ export default {
 						return await handleAvailabilityRequest(request, env, ctx);
 					}
 					
+					// Chunked PostgreSQL export jobs
+					if (url.pathname === '/api/export-jobs' || url.pathname.startsWith('/api/export-jobs/')) {
+						return await handleExportJobRequest(request, env, ctx);
+					}
+					
 					// Check for dashboard HTML route
 					if (url.pathname === '/dashboard' || url.pathname === '/') {
 						return await serveDashboard(env);
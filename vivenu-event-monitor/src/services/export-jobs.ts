@@ -0,0 +1,298 @@
+import { neon } from '@neondatabase/serverless';
+import { log } from './validation';
+
+/**
+ * PostgreSQL-backed state for chunked export jobs.
+ *
+ * A job is submitted once with the list of discovered events; each event is a
+ * row in export_job_events. Workers claim a chunk of pending events, scrape
+ * them and commit the chunk with PostgresClient.writeSnapshot, so a slow or
+ * failing event only costs its own chunk instead of the whole export.
+ *
+ * Job state lives in PostgreSQL rather than KV because KV is read-only in
+ * production (READ_ONLY_KV) and the database is already required.
+ */
+
+export const DEFAULT_CHUNK_SIZE = 5;
+export const MAX_EVENT_ATTEMPTS = 3;
+/** A claimed chunk not finished within this many minutes is handed out again */
+export const CLAIM_TIMEOUT_MINUTES = 10;
+
+export type ExportJobState = 'pending' | 'running' | 'completed' | 'completed_with_errors';
+export type ExportEventState = 'pending' | 'running' | 'done' | 'failed';
+
+export interface ExportJobEvent {
+  eventId: string;
+  region: string;
+  eventName: string;
+}
+
+export interface ExportJobStatus {
+  jobId: string;
+  status: ExportJobState;
+  chunkSize: number;
+  totalEvents: number;
+  pending: number;
+  running: number;
+  done: number;
+  failed: number;
+  ticketTypesExported: number;
+  createdAt: string;
+  updatedAt: string;
+  finishedAt: string | null;
+  failures: { eventId: string; region: string; eventName: string; attempts: number; error: string | null }[];
+}
+
+export class ExportJobStore {
+  private sql: ReturnType<typeof neon>;
+
+  /**
+   * @param databaseUrl - Neon PostgreSQL connection string (required)
+   * @throws {Error} If DATABASE_URL is not provided
+   */
+  constructor(databaseUrl: string) {
+    if (!databaseUrl) {
+      throw new Error('DATABASE_URL is required');
+    }
+    this.sql = neon(databaseUrl);
+  }
+
+  /**
+   * Creates the job tables if they don't exist yet.
+   */
+  async ensureSchema(): Promise<void> {
+    await this.sql`
+      CREATE TABLE IF NOT EXISTS export_jobs (
+        job_id VARCHAR PRIMARY KEY,
+        status VARCHAR NOT NULL,
+        chunk_size INTEGER NOT NULL,
+        total_events INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        finished_at TIMESTAMP
+      )
+    `;
+    await this.sql`
+      CREATE TABLE IF NOT EXISTS export_job_events (
+        job_id VARCHAR NOT NULL REFERENCES export_jobs (job_id) ON DELETE CASCADE,
+        event_id VARCHAR NOT NULL,
+        position INTEGER NOT NULL,
+        region VARCHAR NOT NULL,
+        event_name VARCHAR,
+        status VARCHAR NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        claimed_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        ticket_types INTEGER,
+        total_sold INTEGER,
+        error TEXT,
+        PRIMARY KEY (job_id, event_id)
+      )
+    `;
+  }
+
+  /**
+   * Records a new job and one pending row per event, in a single transaction.
+   *
+   * @param events - Events to export, in processing order
+   * @param chunkSize - Events per chunk (one writeSnapshot transaction each)
+   * @returns The new job ID
+   */
+  async createJob(events: ExportJobEvent[], chunkSize: number = DEFAULT_CHUNK_SIZE): Promise<string> {
+    await this.ensureSchema();
+    const jobId = crypto.randomUUID();
+    const status: ExportJobState = events.length === 0 ? 'completed' : 'pending';
+
+    const queries = [
+      this.sql`
+        INSERT INTO export_jobs (job_id, status, chunk_size, total_events, finished_at)
+        VALUES (${jobId}, ${status}, ${chunkSize}, ${events.length}, ${events.length === 0 ? new Date().toISOString() : null})
+      `
+    ];
+    events.forEach((event, position) => {
+      queries.push(
+        this.sql`
+          INSERT INTO export_job_events (job_id, event_id, position, region, event_name)
+          VALUES (${jobId}, ${event.eventId}, ${position}, ${event.region}, ${event.eventName})
+          ON CONFLICT (job_id, event_id) DO NOTHING
+        `
+      );
+    });
+    await this.sql.transaction(queries);
+
+    log('info', `Created export job ${jobId}`, { totalEvents: events.length, chunkSize });
+    return jobId;
+  }
+
+  /**
+   * Claims the next chunk of pending events (or events whose claim timed out).
+   *
+   * A timed-out claim counts as an attempt: events whose request was killed
+   * MAX_EVENT_ATTEMPTS times are marked failed instead of being claimed again,
+   * so a job with an event that always times out still completes.
+   * SKIP LOCKED lets concurrent callers (cron, client polls) claim disjoint chunks.
+   *
+   * @returns The claimed events; empty when nothing is left to process
+   */
+  async claimChunk(jobId: string, chunkSize: number): Promise<ExportJobEvent[]> {
+    await this.sql`
+      UPDATE export_job_events
+      SET status = 'failed', finished_at = NOW(),
+          error = COALESCE(error, ${`Claim timed out after ${CLAIM_TIMEOUT_MINUTES} minutes on all ${MAX_EVENT_ATTEMPTS} attempts`})
+      WHERE job_id = ${jobId} AND status = 'running' AND attempts >= ${MAX_EVENT_ATTEMPTS}
+        AND claimed_at < NOW() - make_interval(mins => ${CLAIM_TIMEOUT_MINUTES})
+    `;
+
+    const rows = await this.sql`
+      UPDATE export_job_events
+      SET status = 'running', attempts = attempts + 1, claimed_at = NOW()
+      WHERE job_id = ${jobId} AND event_id IN (
+        SELECT event_id FROM export_job_events
+        WHERE job_id = ${jobId}
+          AND (status = 'pending'
+               OR (status = 'running' AND attempts < ${MAX_EVENT_ATTEMPTS}
+                   AND claimed_at < NOW() - make_interval(mins => ${CLAIM_TIMEOUT_MINUTES})))
+        ORDER BY position
+        LIMIT ${chunkSize}
+        FOR UPDATE SKIP LOCKED
+      )
+      RETURNING event_id, region, event_name
+    ` as Record<string, any>[];
+
+    if (rows.length > 0) {
+      await this.sql`
+        UPDATE export_jobs SET status = 'running', updated_at = NOW()
+        WHERE job_id = ${jobId} AND status = 'pending'
+      `;
+    }
+    return rows.map(row => ({ eventId: row.event_id, region: row.region, eventName: row.event_name }));
+  }
+
+  /**
+   * Marks events as exported after their chunk was committed.
+   */
+  async markDone(jobId: string, results: { eventId: string; ticketTypes: number; totalSold: number }[]): Promise<void> {
+    if (results.length === 0) return;
+    await this.sql.transaction(results.map(result => this.sql`
+      UPDATE export_job_events
+      SET status = 'done', finished_at = NOW(), error = NULL,
+          ticket_types = ${result.ticketTypes}, total_sold = ${result.totalSold}
+      WHERE job_id = ${jobId} AND event_id = ${result.eventId}
+    `));
+  }
+
+  /**
+   * Whether any event of the job was exported with at least one ticket sold.
+   */
+  async hasExportedSales(jobId: string): Promise<boolean> {
+    const rows = await this.sql`
+      SELECT EXISTS (
+        SELECT 1 FROM export_job_events
+        WHERE job_id = ${jobId} AND status = 'done' AND total_sold > 0
+      ) AS has_sales
+    ` as Record<string, any>[];
+    return rows[0].has_sales === true;
+  }
+
+  /**
+   * Moves claimed events to the back of the queue without using up an attempt.
+   *
+   * Each event can be deferred once (its position moves past total_events), so
+   * a deferred event comes back only after the rest of the job was claimed.
+   *
+   * @returns IDs of the events that were deferred; the others had been deferred before
+   */
+  async deferEvents(jobId: string, eventIds: string[]): Promise<string[]> {
+    if (eventIds.length === 0) return [];
+    const rows = await this.sql`
+      UPDATE export_job_events AS e
+      SET status = 'pending', attempts = e.attempts - 1, claimed_at = NULL, position = e.position + j.total_events
+      FROM export_jobs AS j
+      WHERE j.job_id = e.job_id AND e.job_id = ${jobId}
+        AND e.event_id = ANY(${eventIds}) AND e.position < j.total_events
+      RETURNING e.event_id
+    ` as Record<string, any>[];
+    return rows.map(row => row.event_id);
+  }
+
+  /**
+   * Records a failed event. It goes back to pending until MAX_EVENT_ATTEMPTS is reached.
+   */
+  async markFailed(jobId: string, eventId: string, error: string): Promise<void> {
+    await this.sql`
+      UPDATE export_job_events
+      SET status = CASE WHEN attempts >= ${MAX_EVENT_ATTEMPTS} THEN 'failed' ELSE 'pending' END,
+          error = ${error}, claimed_at = NULL,
+          finished_at = CASE WHEN attempts >= ${MAX_EVENT_ATTEMPTS} THEN NOW() ELSE NULL END
+      WHERE job_id = ${jobId} AND event_id = ${eventId}
+    `;
+  }
+
+  /**
+   * Current job progress, closing the job once no events are pending or running.
+   *
+   * @returns Job status, or null if the job doesn't exist
+   */
+  async getStatus(jobId: string): Promise<ExportJobStatus | null> {
+    const jobs = await this.sql`
+      SELECT job_id, status, chunk_size, total_events, created_at, updated_at, finished_at
+      FROM export_jobs WHERE job_id = ${jobId}
+    ` as Record<string, any>[];
+    if (jobs.length === 0) return null;
+    const job = jobs[0];
+
+    const counts = await this.sql`
+      SELECT status, COUNT(*)::int AS count, COALESCE(SUM(ticket_types), 0)::int AS ticket_types
+      FROM export_job_events WHERE job_id = ${jobId}
+      GROUP BY status
+    ` as Record<string, any>[];
+    const byStatus: Record<string, number> = { pending: 0, running: 0, done: 0, failed: 0 };
+    let ticketTypesExported = 0;
+    for (const row of counts) {
+      byStatus[row.status] = row.count;
+      ticketTypesExported += row.status === 'done' ? row.ticket_types : 0;
+    }
+
+    const failures = await this.sql`
+      SELECT event_id, region, event_name, attempts, error
+      FROM export_job_events
+      WHERE job_id = ${jobId} AND error IS NOT NULL AND status <> 'done'
+      ORDER BY position
+    ` as Record<string, any>[];
+
+    let status = job.status as ExportJobState;
+    let finishedAt = job.finished_at;
+    if (byStatus.pending === 0 && byStatus.running === 0 && (status === 'pending' || status === 'running')) {
+      status = byStatus.failed > 0 ? 'completed_with_errors' : 'completed';
+      const finished = await this.sql`
+        UPDATE export_jobs SET status = ${status}, updated_at = NOW(), finished_at = NOW()
+        WHERE job_id = ${jobId} AND finished_at IS NULL
+        RETURNING finished_at
+      ` as Record<string, any>[];
+      finishedAt = finished.length > 0 ? finished[0].finished_at : finishedAt;
+      log('info', `Export job ${jobId} finished`, { status, done: byStatus.done, failed: byStatus.failed });
+    }
+
+    return {
+      jobId,
+      status,
+      chunkSize: job.chunk_size,
+      totalEvents: job.total_events,
+      pending: byStatus.pending,
+      running: byStatus.running,
+      done: byStatus.done,
+      failed: byStatus.failed,
+      ticketTypesExported,
+      createdAt: new Date(job.created_at).toISOString(),
+      updatedAt: new Date(job.updated_at).toISOString(),
+      finishedAt: finishedAt ? new Date(finishedAt).toISOString() : null,
+      failures: failures.map(row => ({
+        eventId: row.event_id,
+        region: row.region,
+        eventName: row.event_name,
+        attempts: row.attempts,
+        error: row.error
+      }))
+    };
+  }
+}
@@ -4,6 +4,9 @@ Vivenu Event Monitor - Endpoint Testing Script
 
 This script provides easy testing of the worker endpoints without requiring
 approval for each curl command. Run with: python test_endpoints.py
+
+For a parallel, non-interactive run with latency gates (e.g. before deploying)
+use scripts/python/endpoint_suite.py.
 """
 
 import requests